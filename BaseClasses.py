@@ -10,7 +10,7 @@ from collections import Counter, deque
 from collections.abc import Collection, MutableSequence
 from enum import IntEnum, IntFlag
 from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING)
+                    Optional, Protocol, Set, TextIO, Tuple, Union, TYPE_CHECKING)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -75,6 +75,10 @@ class MultiWorld():
     regions: RegionManager
     itempool: List[Item]
     is_race: bool = False
+    copy_on_write_state: bool = False
+    """CollectionState.copy shares data between copies until first access, see CollectionState.share_attribute"""
+    stage_threads: int = 1
+    """threads to run generation stages of worlds with World.thread_safe_stages in, see AutoWorld.call_all"""
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
 
@@ -572,16 +576,14 @@ class MultiWorld():
                 return True
 
         base_locations = self.get_locations() if locations is None else locations
-        prog_locations = {location for location in base_locations if location.item
-                          and location.item.advancement and location not in state.locations_checked}
+        prog_locations = SphereSearch(state, [location for location in base_locations if location.item
+                                              and location.item.advancement
+                                              and location not in state.locations_checked])
 
         while prog_locations:
-            sphere: Set[Location] = set()
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-            for location in prog_locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere = prog_locations.next_sphere()
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
@@ -589,7 +591,6 @@ class MultiWorld():
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            prog_locations -= sphere
 
             if self.has_beaten_game(state):
                 return True
@@ -605,23 +606,17 @@ class MultiWorld():
         unreachable locations.
         """
         state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        locations = SphereSearch(state, self.get_filled_locations())
 
         while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere = set(locations.next_sphere())
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield locations.remaining()  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -631,40 +626,33 @@ class MultiWorld():
         and then a set of all of the unreachable locations.
         """
         state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
+        sendable_locations: List[Location] = []
+        event_locations: List[Location] = []
         for location in self.get_filled_locations():
             if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
+                sendable_locations.append(location)
             else:
-                events.add(location)
+                event_locations.append(location)
+        locations = SphereSearch(state, sendable_locations)
+        events = SphereSearch(state, event_locations)
 
         while locations:
-            sphere: Set[Location] = set()
-
             # cull events out
-            done_events: Set[Union[Location, None]] = {None}
+            done_events = events.next_sphere()
             while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
+                for event in done_events:
+                    state.collect(event.item, True, event)
+                done_events = events.next_sphere()
 
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere = set(locations.next_sphere())
 
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield locations.remaining()  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
@@ -693,25 +681,26 @@ class MultiWorld():
             """Check if all access rules are fulfilled"""
             if not beatable_fulfilled:
                 return False
-            if any(location_condition(location) for location in locations):
+            if required_locations:
                 return False  # still locations required to be collected
             return True
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
+        relevant_locations = [location for location in self.get_locations() if location_relevant(location)]
+        required_locations = sum(1 for location in relevant_locations if location_condition(location))
+        locations = SphereSearch(state, relevant_locations)
 
         while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+            sphere = locations.next_sphere()
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
                 logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
+                                f" Missing: {list(locations.remaining())}")
                 return False
 
             for location in sphere:
+                if location_condition(location):
+                    required_locations -= 1
                 if location.item:
                     state.collect(location.item, True, location)
 
@@ -727,6 +716,74 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+def _refuse_change(self: Any, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError("Tried to change a container shared by copy-on-write CollectionStates, call "
+                    "CollectionState.own_player_containers or own_attribute before changing it.")
+
+
+class _StateSet(set):
+    """A set of a copy-on-write CollectionState, which can be made read-only in place once it gets shared."""
+    __slots__ = ()
+
+
+class _StateDict(dict):
+    """A dict of a copy-on-write CollectionState, which can be made read-only in place once it gets shared."""
+    __slots__ = ()
+
+
+class _SharedCounter(Counter):
+    """A Counter shared by copy-on-write CollectionStates, refusing changes. Copies are regular Counters."""
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = subtract = _refuse_change
+
+    def copy(self) -> Counter:
+        return Counter(self)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return Counter, (dict(self),)
+
+
+class _SharedSet(_StateSet):
+    """A set shared by copy-on-write CollectionStates, refusing changes. Copies are regular sets."""
+    __slots__ = ()
+    add = discard = remove = pop = clear = update = difference_update = intersection_update = \
+        symmetric_difference_update = __ior__ = __iand__ = __isub__ = __ixor__ = _refuse_change
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return set, (list(self),)
+
+
+class _SharedDict(_StateDict):
+    """A dict shared by copy-on-write CollectionStates, refusing changes. Copies are regular dicts."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _refuse_change
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return dict, (dict(self),)
+
+
+_shared_types: Dict[type, type] = {
+    Counter: _SharedCounter,
+    _StateSet: _SharedSet,
+    _StateDict: _SharedDict,
+    set: _SharedSet,
+    dict: _SharedDict,
+}
+"""container type -> its read-only type for sharing between copy-on-write CollectionStates"""
+
+
+def _make_read_only(container: Any) -> Any:
+    """Turns a container that gets shared between copy-on-write CollectionStates read-only, so changing it without
+    taking ownership first fails instead of changing every state sharing it. Plain sets and dicts can't change their
+    type in place and get replaced by a read-only copy. Containers of other types are shared as they are."""
+    shared_type = _shared_types.get(type(container))
+    if shared_type is None:
+        return container
+    if type(container) in (set, dict):
+        return shared_type(container)
+    container.__class__ = shared_type
+    return container
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -739,6 +796,26 @@ class CollectionState():
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
+    additional_lazy_copy_functions: Dict[Callable[[CollectionState, CollectionState], CollectionState],
+                                         Callable[[CollectionState, CollectionState], CollectionState]] = {}
+    """replacements for additional_copy_functions in copy-on-write copies, keyed by the function they replace"""
+    player_containers: ClassVar[Dict[str, Callable[[Any], Any]]] = {
+        "prog_items": Counter,
+        "reachable_regions": _StateSet,
+        "blocked_connections": _StateSet,
+    }
+    """per-player attributes and how to copy a player's container, shared by copy-on-write copies"""
+    shared_attributes: ClassVar[Dict[str, Callable[[Any], Any]]] = {
+        "advancements": _StateSet,
+        "path": _StateDict,
+        "locations_checked": _StateSet,
+    }
+    """attributes that are shared as a whole by copy-on-write copies"""
+    _shared_containers: Dict[str, Tuple[Callable[[Any], Any], Set[int]]]
+    """per-player attribute -> how to copy a player's container and the players whose container is still shared with
+    another copy-on-write state"""
+    _shared_attributes: Dict[str, Callable[[Any], Any]]
+    """attribute -> how to copy it, for the attributes still shared as a whole with another copy-on-write state"""
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
@@ -751,6 +828,8 @@ class CollectionState():
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
+        self._shared_containers = {}
+        self._shared_attributes = {}
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -759,6 +838,7 @@ class CollectionState():
 
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        self.own_player_containers(player)
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
         queue = deque(self.blocked_connections[player])
@@ -792,7 +872,7 @@ class CollectionState():
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
-                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                self.own_attribute("path")[new_region] = (new_region.name, self.path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
                 for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
@@ -819,12 +899,14 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
-                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    self.own_attribute("path")[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
+        if self.multiworld.copy_on_write_state:
+            return self._copy_on_write()
         ret = CollectionState(self.multiworld)
         ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
         ret.reachable_regions = {player: region_set.copy() for player, region_set in
@@ -839,6 +921,85 @@ class CollectionState():
             ret = function(self, ret)
         return ret
 
+    def _copy_on_write(self) -> CollectionState:
+        # skip __init__, everything it sets up gets replaced by shared data anyway
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        # the containers start out identical, so what was up-to-date here is up-to-date there
+        ret.stale = self.stale.copy()
+        ret._shared_containers = {}
+        ret._shared_attributes = {}
+        for name, copy_function in self.player_containers.items():
+            self.share_player_containers(ret, name, copy_function)
+        for name, copy_function in self.shared_attributes.items():
+            self.share_attribute(ret, name, copy_function)
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
+        for function in self.additional_copy_functions:
+            ret = self.additional_lazy_copy_functions.get(function, function)(self, ret)
+        return ret
+
+    def share_player_containers(self, ret: CollectionState, name: str, copy_function: Callable[[Any], Any]) -> None:
+        """
+        Shares the per-player containers of an attribute between this state and a copy-on-write copy of it.
+        Both states read the shared containers, each state copies a player's container only before changing it,
+        see own_player_containers. Until then, Counters, sets and dicts refuse changes with a TypeError.
+        Intended to be used by LogicMixin.lazy_copy_mixin.
+
+        :param ret: The copy being created.
+        :param name: Name of the attribute, a mapping of player to container that has an entry for every player.
+        :param copy_function: Creates an independent copy of one player's container.
+        """
+        containers = getattr(self, name)
+        for player, container in containers.items():
+            containers[player] = _make_read_only(container)
+        setattr(ret, name, dict(containers))
+        self._shared_containers[name] = copy_function, set(containers)
+        ret._shared_containers[name] = copy_function, set(containers)
+
+    def share_attribute(self, ret: CollectionState, name: str, copy_function: Callable[[Any], Any]) -> None:
+        """
+        Shares an attribute as a whole between this state and a copy-on-write copy of it.
+        Each state copies it only before changing it, see own_attribute. Until then, Counters, sets and dicts refuse
+        changes with a TypeError.
+
+        :param ret: The copy being created.
+        :param name: Name of the attribute.
+        :param copy_function: Creates an independent copy of the attribute's value.
+        """
+        value = _make_read_only(getattr(self, name))
+        setattr(self, name, value)
+        setattr(ret, name, value)
+        self._shared_attributes[name] = ret._shared_attributes[name] = copy_function
+
+    def own_player_containers(self, player: int) -> None:
+        """
+        Copies the containers of a player that are still shared with another copy-on-write state, so they can change.
+        collect, remove, add_item, remove_item, set_item and update_reachable_regions call this first, so overrides of
+        World.collect and World.remove can change them. Other code changing a player's containers directly has to call
+        it before doing so.
+
+        :param player: The player whose containers are about to change.
+        """
+        for name, (copy_function, players) in self._shared_containers.items():
+            if player in players:
+                players.remove(player)
+                containers = getattr(self, name)
+                containers[player] = copy_function(containers[player])
+
+    def own_attribute(self, name: str) -> Any:
+        """
+        Copies an attribute that is still shared as a whole with another copy-on-write state, so it can change.
+
+        :param name: Name of the attribute that is about to change.
+        :return: The attribute's value, which can be changed now.
+        """
+        copy_function = self._shared_attributes.pop(name, None)
+        if copy_function:
+            setattr(self, name, copy_function(getattr(self, name)))
+        return getattr(self, name)
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -880,7 +1041,7 @@ class CollectionState():
             reachable_advancements = {location for location in locations if location.can_reach(self)}
             locations -= reachable_advancements
             for advancement in reachable_advancements:
-                self.advancements.add(advancement)
+                self.own_attribute("advancements").add(advancement)
                 assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
                 self.collect(advancement.item, True, advancement)
 
@@ -1007,8 +1168,10 @@ class CollectionState():
     # Item related
     def collect(self, item: Item, prevent_sweep: bool = False, location: Optional[Location] = None) -> bool:
         if location:
-            self.locations_checked.add(location)
+            self.own_attribute("locations_checked").add(location)
 
+        # World.collect overrides may change the player's containers directly
+        self.own_player_containers(item.player)
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
@@ -1027,9 +1190,11 @@ class CollectionState():
         :param count: How many of the item to add.
         """
         assert count > 0
+        self.own_player_containers(player)
         self.prog_items[player][item] += count
 
     def remove(self, item: Item):
+        self.own_player_containers(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
@@ -1046,6 +1211,7 @@ class CollectionState():
         :param count: How many of the item to remove.
         """
         assert count > 0
+        self.own_player_containers(player)
         self.prog_items[player][item] -= count
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
@@ -1059,6 +1225,7 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        self.own_player_containers(player)
         if count == 0:
             del (self.prog_items[player][item])
         else:
@@ -1092,7 +1259,8 @@ class Entrance:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
         if self.parent_region.can_reach(state) and self.access_rule(state):
             if not self.hide_path and self not in state.path:
-                state.path[self] = (self.name, state.path.get(self.parent_region, (self.parent_region.name, None)))
+                parent_path = state.path.get(self.parent_region, (self.parent_region.name, None))
+                state.own_attribute("path")[self] = (self.name, parent_path)
             return True
 
         return False
@@ -1535,6 +1703,84 @@ class Item:
         return f"{self.name} (Player {self.player})"
 
 
+class SphereSearch:
+    """
+    Finds which of a set of locations become reachable in a CollectionState, one sphere at a time, while the caller
+    collects items between spheres.
+
+    Pending locations in regions that are not yet reachable are grouped by region and only get tested once their region
+    becomes reachable. Everything else pending is tested every sphere, like a plain scan would.
+    """
+    state: CollectionState
+    pending: Set[Location]
+    """locations that were not yet found reachable"""
+    unreached_regions: Dict[int, Dict[Region, List[Location]]]
+    """player -> region not yet reachable -> its pending locations"""
+    retest: List[Location]
+    """pending locations to test again next sphere"""
+
+    def __init__(self, state: CollectionState, locations: Iterable[Location]) -> None:
+        self.state = state
+        self.pending = set()
+        self.unreached_regions = {}
+        self.retest = []
+        for location in locations:
+            self.pending.add(location)
+            region = location.parent_region
+            if region is not None and type(region).can_reach is Region.can_reach \
+                    and type(location).can_reach is Location.can_reach:
+                self.unreached_regions.setdefault(location.player, {}).setdefault(region, []).append(location)
+            else:
+                # locations that bring their own can_reach can't be grouped by region
+                self.retest.append(location)
+
+    def __bool__(self) -> bool:
+        return bool(self.pending)
+
+    def copy(self, state: CollectionState) -> SphereSearch:
+        """Returns an independent search over the same pending locations, continuing in state, which has to be a copy
+        of this search's state."""
+        ret = SphereSearch.__new__(SphereSearch)
+        ret.state = state
+        ret.pending = self.pending.copy()
+        ret.unreached_regions = {player: regions.copy() for player, regions in self.unreached_regions.items()}
+        ret.retest = self.retest.copy()
+        return ret
+
+    def remaining(self) -> Set[Location]:
+        """Locations that were not yet found reachable."""
+        return self.pending.copy()
+
+    def discard(self, location: Location) -> None:
+        """Stops looking for a location."""
+        self.pending.discard(location)
+
+    def next_sphere(self) -> List[Location]:
+        """Returns the pending locations that are reachable in the current state and stops looking for them."""
+        state = self.state
+        candidates = self.retest
+        self.retest = []
+        for player, regions in self.unreached_regions.items():
+            if state.stale[player]:
+                state.update_reachable_regions(player)
+            reachable_regions = state.reachable_regions[player]
+            # in the order the regions were first seen, so spheres come out in the same order every run
+            for region in [region for region in regions if region in reachable_regions]:
+                candidates += regions.pop(region)
+
+        sphere: List[Location] = []
+        pending = self.pending
+        for location in candidates:
+            if location not in pending:
+                continue
+            if location.can_reach(state):
+                sphere.append(location)
+            else:
+                self.retest.append(location)
+        pending.difference_update(sphere)
+        return sphere
+
+
 class EntranceInfo(TypedDict, total=False):
     player: int
     entrance: str
@@ -1575,19 +1821,18 @@ class Spoiler:
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
         state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
+        sphere_search = SphereSearch(state, prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
+        while sphere_search:
 
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
+            sphere = set(sphere_search.next_sphere())
 
             for location in sphere:
                 state.collect(location.item, True, location)
 
-            sphere_candidates -= sphere
             collection_spheres.append(sphere)
             state_cache.append(state.copy())
 
@@ -1595,6 +1840,7 @@ class Spoiler:
                           len(sphere),
                           len(prog_locations))
             if not sphere:
+                sphere_candidates = sphere_search.remaining()
                 logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
                     location.item.name, location.item.player, location.name, location.player) for location in
                                                                                sphere_candidates])
@@ -1648,11 +1894,12 @@ class Spoiler:
         # used to access it was deemed not required.) So we need to do one final sphere collection pass
         # to build up the correct spheres
 
-        required_locations = {item for sphere in collection_spheres for item in sphere}
         state = CollectionState(multiworld)
+        required_locations = SphereSearch(state, [item for sphere in collection_spheres for item in sphere])
+        required_count = len(required_locations.pending)
         collection_spheres = []
         while required_locations:
-            sphere = set(filter(state.can_reach, required_locations))
+            sphere = set(required_locations.next_sphere())
 
             for location in sphere:
                 state.collect(location.item, True, location)
@@ -1660,11 +1907,12 @@ class Spoiler:
             collection_spheres.append(sphere)
 
             logging.debug('Calculated final sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere), len(required_locations))
+                          len(sphere), required_count)
+            required_count -= len(sphere)
 
-            required_locations -= sphere
             if not sphere:
-                raise RuntimeError(f'Not all required items reachable. Unreachable locations: {required_locations}')
+                raise RuntimeError(f'Not all required items reachable. '
+                                   f'Unreachable locations: {required_locations.remaining()}')
 
         # we can finally output our playthrough
         self.playthrough = {"0": sorted([self.multiworld.get_name_string_for_object(item) for item in
@@ -1718,6 +1966,11 @@ class Spoiler:
                             get_path(state, multiworld.get_region('Inverted Big Bomb Shop', player))
 
     def to_file(self, filename: str) -> None:
+        with open(filename, 'w', encoding="utf-8-sig") as outfile:
+            self.write(outfile)
+
+    def write(self, outfile: TextIO) -> None:
+        """Writes the spoiler log into an opened text file."""
         from itertools import chain
         from worlds import AutoWorld
         from Options import Visibility
@@ -1728,72 +1981,71 @@ class Spoiler:
                 display_name = getattr(option_obj, "display_name", option_key)
                 outfile.write(f"{display_name + ':':33}{res.current_option_name}\n")
 
-        with open(filename, 'w', encoding="utf-8-sig") as outfile:
+        outfile.write(
+            'Archipelago Version %s  -  Seed: %s\n\n' % (
+                Utils.__version__, self.multiworld.seed))
+        outfile.write('Filling Algorithm:               %s\n' % self.multiworld.algorithm)
+        outfile.write('Players:                         %d\n' % self.multiworld.players)
+        outfile.write(f'Plando Options:                  {self.multiworld.plando_options}\n')
+        AutoWorld.call_stage(self.multiworld, "write_spoiler_header", outfile)
+
+        for player in range(1, self.multiworld.players + 1):
+            if self.multiworld.players > 1:
+                outfile.write('\nPlayer %d: %s\n' % (player, self.multiworld.get_player_name(player)))
+            outfile.write('Game:                            %s\n' % self.multiworld.game[player])
+
+            for f_option, option in self.multiworld.worlds[player].options_dataclass.type_hints.items():
+                write_option(f_option, option)
+
+            AutoWorld.call_single(self.multiworld, "write_spoiler_header", player, outfile)
+
+        if self.entrances:
+            outfile.write('\n\nEntrances:\n\n')
+            outfile.write('\n'.join(['%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
+                                                     if self.multiworld.players > 1 else '', entry['entrance'],
+                                                     '<=>' if entry['direction'] == 'both' else
+                                                     '<=' if entry['direction'] == 'exit' else '=>',
+                                                     entry['exit']) for entry in self.entrances.values()]))
+
+        AutoWorld.call_all(self.multiworld, "write_spoiler", outfile)
+
+        precollected_items = [f"{item.name} ({self.multiworld.get_player_name(item.player)})"
+                              if self.multiworld.players > 1
+                              else item.name
+                              for item in chain.from_iterable(self.multiworld.precollected_items.values())]
+        if precollected_items:
+            outfile.write("\n\nStarting Items:\n\n")
+            outfile.write("\n".join([item for item in precollected_items]))
+
+        locations = [(str(location), str(location.item) if location.item is not None else "Nothing")
+                     for location in self.multiworld.get_locations() if location.show_in_spoiler]
+        outfile.write('\n\nLocations:\n\n')
+        outfile.write('\n'.join(
+            ['%s: %s' % (location, item) for location, item in locations]))
+
+        outfile.write('\n\nPlaythrough:\n\n')
+        outfile.write('\n'.join(['%s: {\n%s\n}' % (sphere_nr, '\n'.join(
+            [f"  {location}: {item}" for (location, item) in sphere.items()] if isinstance(sphere, dict) else
+            [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items()]))
+        if self.unreachables:
+            outfile.write('\n\nUnreachable Progression Items:\n\n')
             outfile.write(
-                'Archipelago Version %s  -  Seed: %s\n\n' % (
-                    Utils.__version__, self.multiworld.seed))
-            outfile.write('Filling Algorithm:               %s\n' % self.multiworld.algorithm)
-            outfile.write('Players:                         %d\n' % self.multiworld.players)
-            outfile.write(f'Plando Options:                  {self.multiworld.plando_options}\n')
-            AutoWorld.call_stage(self.multiworld, "write_spoiler_header", outfile)
-
-            for player in range(1, self.multiworld.players + 1):
-                if self.multiworld.players > 1:
-                    outfile.write('\nPlayer %d: %s\n' % (player, self.multiworld.get_player_name(player)))
-                outfile.write('Game:                            %s\n' % self.multiworld.game[player])
-
-                for f_option, option in self.multiworld.worlds[player].options_dataclass.type_hints.items():
-                    write_option(f_option, option)
-
-                AutoWorld.call_single(self.multiworld, "write_spoiler_header", player, outfile)
-
-            if self.entrances:
-                outfile.write('\n\nEntrances:\n\n')
-                outfile.write('\n'.join(['%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
-                                                         if self.multiworld.players > 1 else '', entry['entrance'],
-                                                         '<=>' if entry['direction'] == 'both' else
-                                                         '<=' if entry['direction'] == 'exit' else '=>',
-                                                         entry['exit']) for entry in self.entrances.values()]))
-
-            AutoWorld.call_all(self.multiworld, "write_spoiler", outfile)
-
-            precollected_items = [f"{item.name} ({self.multiworld.get_player_name(item.player)})"
-                                  if self.multiworld.players > 1
-                                  else item.name
-                                  for item in chain.from_iterable(self.multiworld.precollected_items.values())]
-            if precollected_items:
-                outfile.write("\n\nStarting Items:\n\n")
-                outfile.write("\n".join([item for item in precollected_items]))
-
-            locations = [(str(location), str(location.item) if location.item is not None else "Nothing")
-                         for location in self.multiworld.get_locations() if location.show_in_spoiler]
-            outfile.write('\n\nLocations:\n\n')
-            outfile.write('\n'.join(
-                ['%s: %s' % (location, item) for location, item in locations]))
-
-            outfile.write('\n\nPlaythrough:\n\n')
-            outfile.write('\n'.join(['%s: {\n%s\n}' % (sphere_nr, '\n'.join(
-                [f"  {location}: {item}" for (location, item) in sphere.items()] if isinstance(sphere, dict) else
-                [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items()]))
-            if self.unreachables:
-                outfile.write('\n\nUnreachable Progression Items:\n\n')
-                outfile.write(
-                    '\n'.join(['%s: %s' % (unreachable.item, unreachable) for unreachable in self.unreachables]))
-
-            if self.paths:
-                outfile.write('\n\nPaths:\n\n')
-                path_listings: List[str] = []
-                for location, path in sorted(self.paths.items()):
-                    path_lines: List[str] = []
-                    for region, exit in path:
-                        if exit is not None:
-                            path_lines.append("{} -> {}".format(region, exit))
-                        else:
-                            path_lines.append(region)
-                    path_listings.append("{}\n        {}".format(location, "\n   =>   ".join(path_lines)))
-
-                outfile.write('\n'.join(path_listings))
-            AutoWorld.call_all(self.multiworld, "write_spoiler_end", outfile)
+                '\n'.join(['%s: %s' % (unreachable.item, unreachable) for unreachable in self.unreachables]))
+
+        if self.paths:
+            outfile.write('\n\nPaths:\n\n')
+            path_listings: List[str] = []
+            for location, path in sorted(self.paths.items()):
+                path_lines: List[str] = []
+                for region, exit in path:
+                    if exit is not None:
+                        path_lines.append("{} -> {}".format(region, exit))
+                    else:
+                        path_lines.append(region)
+                path_listings.append("{}\n        {}".format(location, "\n   =>   ".join(path_lines)))
+
+            outfile.write('\n'.join(path_listings))
+        AutoWorld.call_all(self.multiworld, "write_spoiler_end", outfile)
 
 
 class Tutorial(NamedTuple):
@@ -1,10 +1,13 @@
+import bisect
 import collections
+import heapq
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock, Region, \
+    SphereSearch
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -33,11 +36,111 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _LocationIndex:
+    """
+    Unfilled locations of a fill step, keyed by player, progress type and parent region, keeping track of which of them
+    lie in regions that are reachable in the current maximum exploration state.
+    Candidates are handed out in the order of the original locations list, so placements are the same as when scanning
+    that list from the start.
+    """
+    locations: typing.List[Location]
+    """the locations list of the fill step, kept in sync by remove"""
+    positions: typing.List[int]
+    """original positions of the locations still in locations, in order"""
+    by_position: typing.List[Location]
+    order: typing.Dict[Location, int]
+    regions: typing.Dict[int, typing.Dict[Region, typing.Dict[LocationProgressType, typing.List[int]]]]
+    """player -> parent region -> progress type -> positions of unfilled locations"""
+    reachable: typing.Dict[int, typing.Set[Region]]
+    """player -> regions of the index reachable in the last updated state"""
+    active: typing.Dict[LocationProgressType, typing.List[int]]
+    """progress type -> positions of unfilled locations in reachable regions, in order"""
+    unindexed: typing.List[int]
+    """positions of unfilled locations that can't be ruled out by region reachability, in order"""
+
+    def __init__(self, locations: typing.List[Location]) -> None:
+        self.locations = locations
+        self.positions = list(range(len(locations)))
+        self.by_position = list(locations)
+        self.order = {location: position for position, location in enumerate(locations)}
+        self.regions = {}
+        self.reachable = {}
+        self.active = {progress_type: [] for progress_type in LocationProgressType}
+        self.unindexed = []
+        for position, location in enumerate(locations):
+            region = location.parent_region
+            if self._is_indexable(location):
+                self.regions.setdefault(location.player, {}).setdefault(region, {}) \
+                    .setdefault(location.progress_type, []).append(position)
+            else:
+                self.unindexed.append(position)
+        for player in self.regions:
+            self.reachable[player] = set()
+
+    @staticmethod
+    def _is_indexable(location: Location) -> bool:
+        """Whether can_fill of this location can only succeed if its parent region is reachable."""
+        return (location.parent_region is not None
+                and type(location.parent_region).can_reach is Region.can_reach
+                and type(location).can_reach is Location.can_reach
+                and type(location).can_fill is Location.can_fill
+                and location.always_allow is Location.always_allow)
+
+    def update(self, state: CollectionState) -> None:
+        """Track the locations that are in regions reachable in state."""
+        for player, regions in self.regions.items():
+            if state.stale[player]:
+                state.update_reachable_regions(player)
+            reachable = regions.keys() & state.reachable_regions[player]
+            previous = self.reachable[player]
+            for region in previous - reachable:
+                for progress_type, positions in regions[region].items():
+                    active = self.active[progress_type]
+                    for position in positions:
+                        del active[bisect.bisect_left(active, position)]
+            for region in reachable - previous:
+                for progress_type, positions in regions[region].items():
+                    active = self.active[progress_type]
+                    for position in positions:
+                        bisect.insort(active, position)
+            self.reachable[player] = reachable
+
+    def candidates(self, item: Item) -> typing.Iterator[Location]:
+        """Locations that may be able to hold item in the last updated state, in their original order."""
+        sources = [positions for progress_type, positions in self.active.items()
+                   if positions and (progress_type != LocationProgressType.EXCLUDED
+                                     or not (item.advancement or item.useful))]
+        if self.unindexed:
+            sources.append(self.unindexed)
+        if len(sources) == 1:
+            positions = iter(sources[0])
+        else:
+            positions = heapq.merge(*sources)
+        return map(self.by_position.__getitem__, positions)
+
+    def remove(self, location: Location) -> Location:
+        """Remove a location that got filled from the index and from the locations list."""
+        position = self.order.pop(location)
+        i = bisect.bisect_left(self.unindexed, position)
+        if i < len(self.unindexed) and self.unindexed[i] == position:
+            del self.unindexed[i]
+        else:
+            region = location.parent_region
+            positions = self.regions[location.player][region][location.progress_type]
+            del positions[bisect.bisect_left(positions, position)]
+            if region in self.reachable[location.player]:
+                active = self.active[location.progress_type]
+                del active[bisect.bisect_left(active, position)]
+        i = bisect.bisect_left(self.positions, position)
+        del self.positions[i]
+        return self.locations.pop(i)
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
                      allow_partial: bool = False, allow_excluded: bool = False, one_item_per_player: bool = True,
-                     name: str = "Unknown") -> None:
+                     name: str = "Unknown", persistent_exploration: bool = False) -> None:
     """
     :param multiworld: Multiworld to be filled.
     :param base_state: State assumed before fill.
@@ -50,6 +153,9 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     :param allow_partial: only place what is possible. Remaining items will be in the item_pool list.
     :param allow_excluded: if true and placement fails, it is re-attempted while ignoring excluded on Locations
     :param name: name of this fill step for progress logging purposes
+    :param persistent_exploration: keep one state with the not yet placed items collected across placement rounds
+                                   instead of collecting the whole pool every round. The placed items are removed from
+                                   it and a copy of it is swept
     """
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
@@ -63,6 +169,15 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
+    # base_state with item_pool + unplaced_items collected, but not swept, as removing items from it is exact
+    pool_state: typing.Optional[CollectionState] = None
+    if persistent_exploration:
+        pool_state = base_state.copy()
+        for item in item_pool:
+            pool_state.collect(item, True)
+
+    location_index = _LocationIndex(locations)
+
     while any(reachable_items.values()) and locations:
         if one_item_per_player:
             # grab one item per player
@@ -82,11 +197,20 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        if pool_state is not None:
+            for item in items_to_place:
+                pool_state.remove(item)
+            maximum_exploration_state = pool_state.copy()
+            maximum_exploration_state.sweep_for_advancements(
+                multiworld.get_filled_locations(item.player) if single_player_placement else None)
+        else:
+            maximum_exploration_state = sweep_from_pool(
+                base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
+                if single_player_placement else None)
+        previously_unplaced = len(unplaced_items)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        location_index.update(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
@@ -105,12 +229,12 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
+            # without an access check every location is a candidate, otherwise only those in reachable regions
+            candidates = location_index.candidates(item_to_place) if perform_access_check else locations
+            for location in candidates:
                 if (not single_player_placement or location.player == item_to_place.player) \
                         and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
+                    spot_to_fill = location_index.remove(location)
                     break
 
             else:
@@ -148,6 +272,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            if pool_state is not None:
+                                pool_state.collect(placed_item, True)
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -174,6 +300,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if on_place:
                 on_place(spot_to_fill)
 
+        if pool_state is not None:
+            # items that could not be placed this round stay part of the pool
+            for item in unplaced_items[previously_unplaced:]:
+                pool_state.collect(item, True)
+
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
@@ -199,7 +330,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             for location in excluded_locations:
                 location.progress_type = location.progress_type.DEFAULT
             fill_restrictive(multiworld, base_state, excluded_locations, unplaced_items, single_player_placement, lock,
-                             swap, on_place, allow_partial, False)
+                             swap, on_place, allow_partial, False, persistent_exploration=persistent_exploration)
             for location in excluded_locations:
                 if not location.item:
                     location.progress_type = location.progress_type.EXCLUDED
@@ -343,7 +474,7 @@ def accessibility_corrections(multiworld: MultiWorld, state: CollectionState, lo
             pool.append(location.item)
             location.item = None
             if location in state.advancements:
-                state.advancements.remove(location)
+                state.own_attribute("advancements").remove(location)
                 state.remove(location.item)
             locations.append(location)
     if pool and locations:
@@ -449,7 +580,8 @@ def distribute_early_items(multiworld: MultiWorld,
 
 
 def distribute_items_restrictive(multiworld: MultiWorld,
-                                 panic_method: typing.Literal["swap", "raise", "start_inventory"] = "swap") -> None:
+                                 panic_method: typing.Literal["swap", "raise", "start_inventory"] = "swap",
+                                 persistent_exploration: bool = False) -> None:
     fill_locations = sorted(multiworld.get_unfilled_locations())
     multiworld.random.shuffle(fill_locations)
     # get items to distribute
@@ -496,14 +628,16 @@ def distribute_items_restrictive(multiworld: MultiWorld,
         maximum_exploration_state = sweep_from_pool(multiworld.state)
         fill_restrictive(multiworld, maximum_exploration_state, prioritylocations, progitempool,
                          single_player_placement=single_player, swap=False, on_place=mark_for_locking,
-                         name="Priority", one_item_per_player=True, allow_partial=True)
+                         name="Priority", one_item_per_player=True, allow_partial=True,
+                         persistent_exploration=persistent_exploration)
 
         if prioritylocations:
             # retry with one_item_per_player off because some priority fills can fail to fill with that optimization
             maximum_exploration_state = sweep_from_pool(multiworld.state)
             fill_restrictive(multiworld, maximum_exploration_state, prioritylocations, progitempool,
                             single_player_placement=single_player, swap=False, on_place=mark_for_locking,
-                            name="Priority Retry", one_item_per_player=False)
+                            name="Priority Retry", one_item_per_player=False,
+                            persistent_exploration=persistent_exploration)
         accessibility_corrections(multiworld, multiworld.state, prioritylocations, progitempool)
         defaultlocations = prioritylocations + defaultlocations
 
@@ -512,13 +646,16 @@ def distribute_items_restrictive(multiworld: MultiWorld,
         maximum_exploration_state = sweep_from_pool(multiworld.state)
         if panic_method == "swap":
             fill_restrictive(multiworld, maximum_exploration_state, defaultlocations, progitempool, swap=True,
-                             name="Progression", single_player_placement=single_player)
+                             name="Progression", single_player_placement=single_player,
+                             persistent_exploration=persistent_exploration)
         elif panic_method == "raise":
             fill_restrictive(multiworld, maximum_exploration_state, defaultlocations, progitempool, swap=False,
-                             name="Progression", single_player_placement=single_player)
+                             name="Progression", single_player_placement=single_player,
+                             persistent_exploration=persistent_exploration)
         elif panic_method == "start_inventory":
             fill_restrictive(multiworld, maximum_exploration_state, defaultlocations, progitempool, swap=False,
-                             allow_partial=True, name="Progression", single_player_placement=single_player)
+                             allow_partial=True, name="Progression", single_player_placement=single_player,
+                             persistent_exploration=persistent_exploration)
             if progitempool:
                 for item in progitempool:
                     logging.debug(f"Moved {item} to start_inventory to prevent fill failure.")
@@ -675,6 +812,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         state: CollectionState = CollectionState(multiworld)
         checked_locations: typing.Set[Location] = set()
         unchecked_locations: typing.Set[Location] = set(multiworld.get_locations())
+        # finds the next sphere of unchecked_locations, which it has to be kept in sync with
+        unchecked_search = SphereSearch(state, multiworld.get_locations())
 
         total_locations_count: typing.Counter[int] = Counter(
             location.player
@@ -709,7 +848,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            sphere_locations = set(unchecked_search.next_sphere())
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -740,6 +879,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 }
                 if balancing_players:
                     balancing_state = state.copy()
+                    balancing_search = unchecked_search.copy(balancing_state)
                     balancing_unchecked_locations = unchecked_locations.copy()
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
@@ -757,7 +897,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        balancing_sphere = set(balancing_search.next_sphere())
                         for location in balancing_sphere:
                             balancing_unchecked_locations.remove(location)
                             if not location.locked:
@@ -830,6 +970,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
                             unchecked_locations.remove(location)
+                            unchecked_search.discard(location)
                             if not location.locked:
                                 reachable_locations_count[location.player] += 1
                             sphere_locations.add(location)
@@ -582,6 +582,8 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 
 if __name__ == '__main__':
     import atexit
+    import settings
+    settings.lazy_world_loading = True
     confirmation = atexit.register(input, "Press enter to close.")
     erargs, seed = main()
     from Main import main as ERmain
@@ -28,9 +28,14 @@ if __name__ == "__main__":
     ModuleUpdate.update()
 
 import settings
+
+if __name__ == "__main__":
+    settings.lazy_world_loading = True
+
 import Utils
 from Utils import (init_logging, is_frozen, is_linux, is_macos, is_windows, local_path, messagebox, open_filename,
                    user_path)
+import worlds
 from worlds.LauncherComponents import Component, components, icon_paths, SuffixIdentifier, Type
 
 
@@ -55,6 +60,7 @@ def open_host_yaml():
     subprocess.Popen([exe, file], env=env)
 
 def open_patch():
+    worlds.load_all_worlds()
     suffixes = []
     for c in components:
         if c.type == Type.CLIENT and \
@@ -137,6 +143,7 @@ def handle_uri(path: str) -> tuple[list[Component], Component]:
     client_components = []
     text_client_component = None
     game = queries["game"][0]
+    worlds.load_worlds_for_component(game)
     for component in components:
         if component.supports_uri and component.game_name == game:
             client_components.append(component)
@@ -160,6 +167,7 @@ def build_uri_popup(component_list: list[Component], launch_args: tuple[str, ...
 def identify(path: None | str) -> tuple[None | str, None | Component]:
     if path is None:
         return None, None
+    worlds.load_worlds_for_component(path)
     for component in components:
         if component.handles_file(path):
             return path, component
@@ -236,6 +244,9 @@ def run_gui(launch_components: list[Component], args: Any) -> None:
     from kivymd.uix.snackbar import MDSnackbar, MDSnackbarText
     from kivymd.uix.textfield import MDTextField
 
+    # the GUI lists the components of all worlds
+    worlds.load_all_worlds()
+
     from kivy.lang.builder import Builder
 
     class LauncherCard(MDCard):
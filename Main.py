@@ -1,27 +1,37 @@
 import collections
 import concurrent.futures
+import dataclasses
+import io
 import logging
 import os
-import pickle
 import tempfile
 import time
 import zipfile
-import zlib
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
-from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
+from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from Options import StartInventoryPool
-from Utils import __version__, output_path, version_tuple
+from Utils import __version__, dump_multidata, dump_multidata_sections, output_path, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
 
-__all__ = ["main"]
+__all__ = ["main", "GenerationOutput"]
 
 
-def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+@dataclasses.dataclass
+class GenerationOutput:
+    """Output of main kept in memory instead of written into the final archive, for callers storing it themselves."""
+    multidata: dict[str, object] | None = None
+    spoiler: str = ""
+    files: dict[str, bytes] = dataclasses.field(default_factory=dict)
+    """output files of the worlds by file name"""
+
+
+def main(args, seed=None, baked_server_options: dict[str, object] | None = None,
+         output: GenerationOutput | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -29,6 +39,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         os.makedirs(args.outputpath, exist_ok=True)
         output_path.cached_path = args.outputpath
 
+    fill_algorithm = get_settings().generator.fill_algorithm
+    if fill_algorithm not in ("balanced", "persistent"):
+        raise ValueError(f"Fill algorithm {fill_algorithm} not recognized, expected balanced or persistent.")
+
     start = time.perf_counter()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
@@ -36,6 +50,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
     multiworld.plando_options = args.plando_options
+    multiworld.copy_on_write_state = bool(get_settings().generator.copy_on_write_state)
+    multiworld.algorithm = fill_algorithm
+    multiworld.stage_threads = max(1, get_settings().generator.stage_threads)
     multiworld.game = args.game.copy()
     multiworld.player_name = args.name.copy()
     multiworld.sprite = args.sprite.copy()
@@ -49,18 +66,20 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
+    # with lazy world loading, only list the worlds that are in use instead of importing all of them
+    world_types = AutoWorld.loaded_world_types()
+    logger.info(f"Found {len(world_types)} World Types:")
+    longest_name = max(len(text) for text in world_types)
 
-    item_count = len(str(max(len(cls.item_names) for cls in AutoWorld.AutoWorldRegister.world_types.values())))
-    location_count = len(str(max(len(cls.location_names) for cls in AutoWorld.AutoWorldRegister.world_types.values())))
+    item_count = len(str(max(len(cls.item_names) for cls in world_types.values())))
+    location_count = len(str(max(len(cls.location_names) for cls in world_types.values())))
 
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
+    for name, cls in world_types.items():
         if not cls.hidden and len(cls.item_names) > 0:
             logger.info(f" {name:{longest_name}}: Items: {len(cls.item_names):{item_count}} | "
                         f"Locations: {len(cls.location_names):{location_count}}")
 
-    del item_count, location_count
+    del item_count, location_count, world_types
 
     # This assertion method should not be necessary to run if we are not outputting any multidata.
     if not args.skip_output and not args.spoiler_only:
@@ -187,10 +206,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    distribute_items_restrictive(multiworld, get_settings().generator.panic_method,
+                                 persistent_exploration=multiworld.algorithm == 'persistent')
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
@@ -218,8 +235,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
-    output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    with tempfile.TemporaryDirectory() as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
         with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
@@ -334,11 +350,15 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
+                if output is not None:
+                    output.multidata = multidata
+                    return
 
+                generator_settings = get_settings().generator
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    dump = dump_multidata_sections if generator_settings.multidata_sections else dump_multidata
+                    dump(multidata, f, generator_settings.multidata_compression,
+                         generator_settings.multidata_compression_level)
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
@@ -357,6 +377,20 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
+        # generate_output of worlds writes to a folder, so their files are still read back from temp_dir,
+        # into output or into the zip
+        if output is not None:
+            if args.spoiler:
+                with io.StringIO() as spoiler:
+                    multiworld.spoiler.write(spoiler)
+                    output.spoiler = spoiler.getvalue()
+            for file in os.scandir(temp_dir):
+                if file.is_file():
+                    with open(file.path, "rb") as f:
+                        output.files[file.name] = f.read()
+            logger.info('Done. Kept output in memory. Total Time: %s', time.perf_counter() - start)
+            return multiworld
+
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
@@ -365,7 +399,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
                              compresslevel=9) as zf:
             for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+                # multidata is already compressed, deflating it again only costs time
+                zf.write(file.path, arcname=file.name,
+                         compress_type=zipfile.ZIP_STORED if file.name.endswith(".archipelago") else None)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
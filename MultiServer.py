@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime
@@ -43,7 +45,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, Hint, HintStatus
+    SlotType, LocationStore, Hint, HintStatus, compact_types_tag, encode_compact
 from BaseClasses import ItemClassification
 
 
@@ -118,12 +120,85 @@ modify_functions = {
 }
 
 
+# operations of which two in a row with integer values can be applied as one with the combined value
+# add and mul are not, as they round differently when the stored value is a float
+fusable_operations = {"max", "min"}
+
+
+CompiledOperation = typing.Tuple[typing.Callable[[typing.Any, typing.Any], typing.Any], typing.Any]
+
+
+def compile_operations(operations: typing.Any) -> typing.Optional[typing.List[CompiledOperation]]:
+    """Resolves DataStorageOperations to their functions and arguments before any of them are applied,
+    None if any operation is invalid.
+    "default" operations, which keep the value, are dropped and runs of fusable_operations with integer values are
+    fused into one, so that long lists of operations take fewer steps to apply."""
+    if type(operations) != list:
+        return None
+    compiled: typing.List[CompiledOperation] = []
+    previous: typing.Optional[str] = None
+    try:
+        for operation in operations:
+            name = operation["operation"]
+            func = modify_functions[name]
+            if name == "default":
+                continue
+            value = operation["value"]
+            if name == previous and name in fusable_operations and type(value) is int \
+                    and type(compiled[-1][1]) is int:
+                compiled[-1] = func, func(compiled[-1][1], value)
+            else:
+                compiled.append((func, value))
+            previous = name
+    except (KeyError, TypeError, AttributeError):
+        return None
+    return compiled
+
+
 def get_saving_second(seed_name: str, interval: int = 60) -> int:
     # save at expected times so other systems using savegame can expect it
     # represents the target second of the auto_save_interval at which to save
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+def apply_save_journal_entry(savedata: dict, entry: dict) -> None:
+    """Applies the changes of a savegame journal entry, see Context.get_save_journal_entry, to savedata.
+    Entries can be applied more than once."""
+    for key, value in entry.items():
+        if key == "received_items":
+            received_items = savedata.setdefault(key, {})
+            for team_slot_remote, (start, items) in value.items():
+                received_items.setdefault(team_slot_remote, [])[start:start + len(items)] = items
+        elif key == "location_checks":
+            location_checks = savedata.setdefault(key, {})
+            for team_slot, locations in value.items():
+                location_checks[team_slot] = location_checks.get(team_slot, set()) | locations
+        elif key in ("hints", "stored_data"):
+            savedata.setdefault(key, {}).update(value)
+        else:
+            savedata[key] = value
+
+
+def load_save_journal(savedata: dict, journal: bytes) -> int:
+    """Replays a savegame journal file onto savedata, if the journal was started for it.
+    A truncated last entry, as left behind by an interrupted save, is ignored.
+    Returns the number of entries replayed."""
+    journal_id = savedata.get("journal")
+    if not journal_id or not journal.startswith(journal_id):
+        return 0
+    count = 0
+    position = len(journal_id)
+    while position + 4 <= len(journal):
+        size = int.from_bytes(journal[position:position + 4], "little")
+        position += 4
+        if position + size > len(journal):
+            break
+        apply_save_journal_entry(savedata, restricted_loads(zlib.decompress(journal[position:position + size])))
+        position += size
+        count += 1
+    return count
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str]
@@ -132,6 +207,10 @@ class Client(Endpoint):
     no_items: bool
     no_locations: bool
     no_text: bool
+    compact_types: bool
+    set_allowance: float
+    """ Set packets the client may currently send, see Context.allow_set """
+    set_allowance_time: float
 
     def __init__(self, socket: "ServerConnection", ctx: Context) -> None:
         super().__init__(socket)
@@ -140,6 +219,9 @@ class Client(Endpoint):
         self.slot = None
         self.send_index = 0
         self.tags = []
+        self.compact_types = False
+        self.set_allowance = ctx.set_burst
+        self.set_allowance_time = time.monotonic()
         self.messageprocessor = client_message_processor(ctx, self)
         self.ctx = weakref.ref(ctx)
 
@@ -180,18 +262,45 @@ class Context:
                       "remaining_mode": str,
                       "collect_mode": str,
                       "item_cheat": bool,
-                      "compatibility": int}
+                      "compatibility": int,
+                      "data_storage_limit": int,
+                      "set_rate": int,
+                      "set_burst": int}
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     endpoints: list[Client]
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
     location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
+    new_items_slots: typing.Set[typing.Tuple[int, int]]
+    """ (team, slot) that received items not yet sent to their clients """
+    encoded_msgs: typing.OrderedDict[typing.Tuple[typing.Hashable, bool], str]
+    """ LRU of recently encoded packets, (cache key, compact) -> encoded packet """
+    encoded_msgs_size = 64
+    encoded_msgs_max_length = 8 * 1024 * 1024
+    """ maximum total length of the packets in encoded_msgs, longer packets are not cached at all """
+    encoded_msgs_length: int
     hints_used: typing.Dict[typing.Tuple[int, int], int]
+    hint_index: typing.Dict[typing.Tuple[int, int, int], Hint]
+    """ (team, finding_player, location) -> current Hint, shared by all hint sets that contain it """
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_prefix_notification_clients: typing.Dict[str, typing.Set[Client]]
+    """ key prefix -> clients notified of changes to all keys starting with it """
+    stored_data_prefix_lengths: typing.List[int]
+    """ sorted lengths of the prefixes in stored_data_prefix_notification_clients """
+    data_storage_limit: int
+    """ approximate limit for the total size of stored_data in bytes, 0 for unlimited """
+    stored_data_sizes: typing.Optional[typing.Dict[str, int]]
+    """ approximate size of each value in stored_data, only measured while data_storage_limit is set """
+    stored_data_size: int
+    """ sum of stored_data_sizes """
+    set_rate: int
+    """ Set packets each client may send per second on average, 0 for unlimited """
+    set_burst: int
+    """ Set packets each client may send at once """
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -202,8 +311,22 @@ class Context:
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
+    encoded_game_packages: typing.Dict[str, str]
+    """ checksum -> encoded game data package, as sent in DataPackage """
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    location_spheres: typing.Dict[int, typing.Dict[int, int]]
+    """ player -> location_id -> index of its sphere in spheres """
+    save_journal: bool
+    """ save only the changes since the previous save, until they outgrow the last full save """
+    journal_id: typing.Optional[bytes]
+    """ identifies the journal belonging to the last full save, None while no journal is being written """
+    main_loop: typing.Optional[asyncio.AbstractEventLoop]
+    """ loop the context is served on, None if it was created outside of a running loop """
+    cpu_time: float
+    """ CPU time in seconds spent processing client commands, excluding time they spent suspended """
+    slow_command_time: float = 1
+    """ commands taking longer than this many seconds get logged, as they stall everything else on the loop """
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
@@ -212,6 +335,10 @@ class Context:
                  log_network: bool = False, logger: logging.Logger = logging.getLogger()):
         self.logger = logger
         super(Context, self).__init__()
+        try:
+            self.main_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.main_loop = None
         self.slot_info = {}
         self.log_network = log_network
         self.endpoints = []
@@ -221,6 +348,15 @@ class Context:
         self.data_filename = None
         self.save_filename = None
         self.saving = False
+        self.save_journal = False
+        self.journal_id = None
+        self.journal_size = 0
+        self.snapshot_size = 0
+        self.journal_received_items: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        self.journal_location_checks: typing.Dict[team_slot, typing.Set[int]] = collections.defaultdict(set)
+        self.journal_hints: typing.Set[team_slot] = set()
+        self.journal_stored_data: typing.Set[str] = set()
+        self.journal_fields: typing.Dict[str, typing.Any] = {}
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -239,6 +375,7 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hint_index = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -266,8 +403,20 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.stored_data_prefix_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.stored_data_prefix_lengths = []
+        self.data_storage_limit = 0
+        self.set_rate = 0
+        self.set_burst = 1000
+        self.stored_data_sizes = None
+        self.stored_data_size = 0
         self.read_data = {}
         self.spheres = []
+        self.location_spheres = {}
+        self.new_items_slots = set()
+        self.cpu_time = 0
+        self.encoded_msgs = collections.OrderedDict()
+        self.encoded_msgs_length = 0
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -281,25 +430,29 @@ class Context:
         self.location_names = collections.defaultdict(
             lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})'))
         self.non_hintable_names = collections.defaultdict(frozenset)
+        self.encoded_game_packages = {}
 
         self._load_game_data()
 
     # Data package retrieval
     def _load_game_data(self):
-        import worlds
-        self.gamespackage = worlds.network_data_package["games"]
+        from worlds.AutoWorld import loaded_world_types
+        # with lazy world loading, further worlds are loaded once a multidata refers to them
+        for world_name in loaded_world_types():
+            self._load_world_game_data(world_name)
 
-        self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
-                                 worlds.AutoWorldRegister.world_types.items()}
-        self.location_name_groups = {world_name: world.location_name_groups for world_name, world in
-                                     worlds.AutoWorldRegister.world_types.items()}
-        for world_name, world in worlds.AutoWorldRegister.world_types.items():
-            self.non_hintable_names[world_name] = world.hint_blacklist
+    def _load_world_game_data(self, world_name: str):
+        import worlds
+        world = worlds.AutoWorldRegister.world_types[world_name]
+        game_package = worlds.network_data_package["games"][world_name]
+        self.gamespackage[world_name] = game_package
+        self.item_name_groups[world_name] = world.item_name_groups
+        self.location_name_groups[world_name] = world.location_name_groups
+        self.non_hintable_names[world_name] = world.hint_blacklist
 
-        for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+        # remove groups from data sent to clients
+        game_package.pop("item_name_groups", None)
+        game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -321,6 +474,27 @@ class Context:
             self.item_names[game].update(archipelago_item_names)
             self.location_names[game].update(archipelago_location_names)
 
+        # encode the data packages clients of this multiworld are going to ask for ahead of time
+        for game in {"Archipelago", *(slot_info.game for slot_info in self.slot_info.values())}:
+            if game in self.gamespackage:
+                self.get_encoded_game_package(game)
+
+    def get_encoded_game_package(self, game: str) -> str:
+        """Returns the encoded data package of game, which is shared by every data package with the same checksum."""
+        game_package = self.gamespackage[game]
+        checksum = game_package.get("checksum")
+        encoded_game_package = self.encoded_game_packages.get(checksum) if checksum else None
+        if encoded_game_package is None:
+            encoded_game_package = self.dumper(game_package)
+            if checksum:
+                self.encoded_game_packages[checksum] = encoded_game_package
+        return encoded_game_package
+
+    def encode_data_package(self, games: typing.Iterable[str]) -> str:
+        """Encodes a DataPackage packet for games out of their pre-encoded data packages."""
+        games = ",".join(f"{self.dumper(game)}:{self.get_encoded_game_package(game)}" for game in games)
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{games}}}}}}}]'
+
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
 
@@ -328,10 +502,32 @@ class Context:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
     # General networking
-    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+    def encode_msgs(self, msgs: typing.Iterable[dict], compact: bool = False,
+                    cache_key: typing.Optional[typing.Hashable] = None) -> str:
+        """Encodes msgs. With a cache_key, which has to identify the content of msgs,
+        recently encoded packets are reused instead of being encoded again."""
+        if cache_key is None:
+            return encode_compact(msgs) if compact else self.dumper(msgs)
+        key = cache_key, compact
+        msg = self.encoded_msgs.get(key)
+        if msg is None:
+            msg = encode_compact(msgs) if compact else self.dumper(msgs)
+            if len(msg) > self.encoded_msgs_max_length:
+                return msg
+            self.encoded_msgs[key] = msg
+            self.encoded_msgs_length += len(msg)
+            while len(self.encoded_msgs) > self.encoded_msgs_size \
+                    or self.encoded_msgs_length > self.encoded_msgs_max_length:
+                self.encoded_msgs_length -= len(self.encoded_msgs.popitem(last=False)[1])
+        else:
+            self.encoded_msgs.move_to_end(key)
+        return msg
+
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict],
+                        cache_key: typing.Optional[typing.Hashable] = None) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
+        msg = self.encode_msgs(msgs, isinstance(endpoint, Client) and endpoint.compact_types, cache_key)
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -374,13 +570,12 @@ class Context:
 
     def broadcast_all(self, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast(endpoints, msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -388,17 +583,22 @@ class Context:
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast(endpoints, msgs)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        """Sends msgs to endpoints, encoding them once per encoding in use."""
+        endpoints = list(endpoints)
+        compact_endpoints = [endpoint for endpoint in endpoints if endpoint.compact_types]
+        if len(compact_endpoints) < len(endpoints):
+            async_start(self.broadcast_send_encoded_msgs(
+                (endpoint for endpoint in endpoints if not endpoint.compact_types), self.encode_msgs(msgs)))
+        if compact_endpoints:
+            async_start(self.broadcast_send_encoded_msgs(compact_endpoints, self.encode_msgs(msgs, True)))
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -427,23 +627,22 @@ class Context:
             with zipfile.ZipFile(multidatapath) as zf:
                 for file in zf.namelist():
                     if file.endswith(".archipelago"):
-                        data = zf.read(file)
+                        with zf.open(file) as f:
+                            decoded_obj = self.decompress(f)
                         break
                 else:
                     raise Exception("No .archipelago found in archive.")
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                decoded_obj = self.decompress(f)
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+    def decompress(data: typing.Union[bytes, typing.BinaryIO]) -> dict:
+        """Decodes multidata from bytes or a binary file object, decompressing it as it is unpickled."""
+        return Utils.load_multidata(data)
 
     def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -500,6 +699,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -511,6 +711,12 @@ class Context:
             server_options = decoded_obj.get("server_options", {})
             self._set_options(server_options)
 
+        # worlds that weren't needed before with lazy world loading
+        import worlds
+        for game_name in {"Archipelago", *(slot_info.game for slot_info in self.slot_info.values())}:
+            if game_name not in self.gamespackage and game_name in worlds.AutoWorldRegister.world_types:
+                self._load_world_game_data(game_name)
+
         # embedded data package
         for game_name, data in decoded_obj.get("datapackage", {}).items():
             if game_name in game_data_packages:
@@ -530,6 +736,11 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.index_spheres()
+        if self.spheres and not decoded_obj.get("race_mode", 0):
+            for slot in self.slot_info:
+                self.read_data[f"location_spheres_{slot}"] = lambda local_player=slot: \
+                    self.location_spheres.get(local_player, {})
 
     # saving
 
@@ -544,19 +755,40 @@ class Context:
 
         return False
 
+    @property
+    def journal_filename(self) -> str:
+        import os
+        return os.path.splitext(self.save_filename)[0] + ".apjournal"
+
+    def use_save_journal(self, exit_save: bool = False) -> bool:
+        """Whether the next save should only append to the journal instead of writing a full save."""
+        return self.save_journal and bool(self.journal_id) and not exit_save and self.journal_size < self.snapshot_size
+
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if self.use_save_journal(exit_save):
+                encoded_entry = zlib.compress(pickle.dumps(self.call_on_loop(self.get_save_journal_entry)))
+                with open(self.journal_filename, "ab") as f:
+                    f.write(len(encoded_entry).to_bytes(4, "little") + encoded_entry)
+                self.journal_size += 4 + len(encoded_entry)
+            else:
+                encoded_save = zlib.compress(pickle.dumps(self.call_on_loop(self.get_journaled_save)))
+                with open(self.save_filename, "wb") as f:
+                    f.write(encoded_save)
+                self.snapshot_size = len(encoded_save)
+                if self.journal_id:
+                    with open(self.journal_filename, "wb") as f:
+                        f.write(self.journal_id)
         except Exception as e:
+            self.journal_id = None  # changes may be lost, so the next save has to be a full save
             self.logger.exception(e)
             return False
         else:
             return True
 
-    def init_save(self, enabled: bool = True):
+    def init_save(self, enabled: bool = True, journal: bool = False):
         self.saving = enabled
+        self.save_journal = journal
         if self.saving:
             if not self.save_filename:
                 import os
@@ -566,13 +798,94 @@ class Context:
             try:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                try:
+                    with open(self.journal_filename, 'rb') as f:
+                        load_save_journal(save_data, f.read())
+                except FileNotFoundError:
+                    pass
+                self.set_save(save_data)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
             self._start_async_saving()
 
+    def start_save_journal(self) -> None:
+        """Starts a new journal for the full save about to be written, if the journal is enabled."""
+        if self.save_journal:
+            import os
+            self.journal_id = os.urandom(16)
+            self.journal_size = 0
+            self.journal_received_items = {key: len(items) for key, items in self.received_items.items()}
+            self.journal_location_checks = collections.defaultdict(set)
+            self.journal_hints = set()
+            self.journal_stored_data = set()
+        else:
+            self.journal_id = None
+
+    def get_save_journal_entry(self) -> dict:
+        """Returns the changes since the previous save, to be applied with apply_save_journal_entry.
+        Has to be called on the loop, see call_on_loop, so no change can slip in between reading and resetting."""
+        fields = self.get_save_fields()
+        d = {key: value for key, value in fields.items() if self.journal_fields.get(key) != value}
+        self.journal_fields = fields
+        received_items = {}
+        for key, items in self.received_items.items():
+            start = self.journal_received_items.get(key, 0)
+            if len(items) > start:
+                new_items = items[start:]
+                received_items[key] = start, new_items
+                self.journal_received_items[key] = start + len(new_items)
+        d["received_items"] = received_items
+        location_checks, self.journal_location_checks = self.journal_location_checks, collections.defaultdict(set)
+        d["location_checks"] = dict(location_checks)
+        hints, self.journal_hints = self.journal_hints, set()
+        d["hints"] = {team_slot: set(self.hints[team_slot]) for team_slot in hints}
+        stored_data, self.journal_stored_data = self.journal_stored_data, set()
+        d["stored_data"] = {key: copy.copy(self.stored_data[key]) for key in stored_data}
+        return d
+
+    def get_journaled_save(self) -> dict:
+        """Starts a new save journal, if enabled, and returns the full save it continues from.
+        Has to be called on the loop, see call_on_loop."""
+        self.start_save_journal()
+        d = self.get_save()
+        self.journal_fields = {key: d[key] for key in self.get_save_fields()} if self.journal_id else {}
+        return d
+
+    def call_on_loop(self, function: typing.Callable[[], typing.Any]) -> typing.Any:
+        """Calls function on main_loop and waits for its result, for the save thread to read state in between two
+        steps of the loop instead of while it is being changed. Calls it directly if there is no running loop."""
+        loop = self.main_loop
+        if not loop or not loop.is_running():
+            return function()
+        try:
+            if asyncio.get_running_loop() is loop:
+                return function()
+        except RuntimeError:
+            pass  # not on any loop's thread
+
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def call():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function())
+                except BaseException as e:
+                    future.set_exception(e)
+
+        try:
+            loop.call_soon_threadsafe(call)
+        except RuntimeError:  # closed in the meantime
+            return function()
+        while True:
+            try:
+                return future.result(1)
+            except concurrent.futures.TimeoutError:
+                # the loop stopped before getting to it, so nothing can race function anymore
+                if not loop.is_running() and future.cancel():
+                    return function()
+
     def _start_async_saving(self, atexit_save: bool = True):
         if not self.auto_saver_thread:
             def save_regularly():
@@ -605,33 +918,39 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
             "location_checks": dict(self.location_checks),
-            "name_aliases": self.name_aliases,
+            "stored_data": self.stored_data,
+            **self.get_save_fields()
+        }
+        if self.journal_id:
+            d["journal"] = self.journal_id
+
+        return d
+
+    def get_save_fields(self) -> dict:
+        """Returns the small parts of the save, which journal entries contain whole, but only if they changed."""
+        return {
+            "hints_used": dict(self.hints_used),
+            "name_aliases": dict(self.name_aliases),
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
             "client_connection_timers": tuple(
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
-            "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
+            "group_collected": {group: set(players) for group, players in self.group_collected.items()},
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
                              "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
                              "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
-        return d
-
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
@@ -651,6 +970,7 @@ class Context:
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
         self.random.setstate(savedata["random_state"])
+        self.recheck_hints()
 
         if "game_options" in savedata:
             self.hint_cost = savedata["game_options"]["hint_cost"]
@@ -668,6 +988,7 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+            self.stored_data_sizes = None
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -685,6 +1006,7 @@ class Context:
         """Refreshes the hints for the specified team/slot. Providing 'None' for either team or slot
         will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
         pair that has at least one hint modified will be added to the set.
+        Hints are kept up to date by recheck_location_hints, so this is only needed after loading a savegame.
         """
         for hint_team, hint_slot in self.hints:
             if team != hint_team and team is not None:
@@ -703,19 +1025,49 @@ class Context:
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
+        self.index_hints()
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the specified locations of team/slot, after they got checked.
+        If a set is passed for 'changed', each (team,slot) pair that has a hint modified will be added to the set.
+        """
+        for location in locations:
+            hint = self.hint_index.get((team, slot, location))
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                if changed is not None:
+                    changed.add((team, player))
+                self.replace_hint(team, player, hint, new_hint)
+
+    def index_hints(self) -> None:
+        """Rebuilds hint_index from the hints of each finding player."""
+        self.hint_index = {(team, hint.finding_player, hint.location): hint
+                           for (team, slot), hints in self.hints.items()
+                           for hint in hints if hint.finding_player == slot}
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
+        # hints are rechecked as their locations get checked
         return self.hints[team, slot]
 
+    def index_spheres(self) -> None:
+        self.location_spheres = {}
+        for sphere_index, sphere in enumerate(self.spheres):
+            for player, locations in sphere.items():
+                self.location_spheres.setdefault(player, {}).update(dict.fromkeys(locations, sphere_index))
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
-            raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
-                           f"Location or player may not exist.")
+            try:
+                return self.location_spheres[player][location_id]
+            except KeyError:
+                raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
+                               f"Location or player may not exist.") from None
         return -1
 
     def get_players_package(self):
@@ -773,6 +1125,7 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hint_index[team, hint.finding_player, hint.location] = hint
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
@@ -781,25 +1134,34 @@ class Context:
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
         for slot in new_hint_events:
             self.on_new_hint(team, slot)
+        # each hint message is encoded once and shared by every slot it concerns
+        encoded_hints: typing.Dict[typing.Tuple[Hint, bool], str] = {}
         for slot, hint_data in concerns.items():
             if recipients is None or slot in recipients:
-                clients = filter(lambda c: not c.no_text, self.clients[team].get(slot, []))
+                clients = [client for client in self.clients[team].get(slot, []) if not client.no_text]
                 if not clients:
                     continue
-                client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
-                for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                hint_data = sorted(hint_data, key=lambda x: x[0].finding_player != slot)
+                for compact in {client.compact_types for client in clients}:
+                    parts = []
+                    for hint, message in hint_data:
+                        part = encoded_hints.get((hint, compact))
+                        if part is None:
+                            # strip the brackets of the single element list
+                            part = encoded_hints[hint, compact] = self.encode_msgs([message], compact)[1:-1]
+                        parts.append(part)
+                    async_start(self.broadcast_send_encoded_msgs(
+                        [client for client in clients if client.compact_types == compact], f"[{','.join(parts)}]"))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.hint_index.get((team, finding_player, seeked_location))
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            if slot == new_hint.finding_player:
+                self.hint_index[team, slot, new_hint.location] = new_hint
     
     # "events"
 
@@ -821,25 +1183,132 @@ class Context:
         }])
 
     def on_changed_hints(self, team: int, slot: int):
+        if self.journal_id:
+            self.journal_hints.add((team, slot))
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_notification_targets(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_notification_targets(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
 
+    # data storage
+
+    def get_stored_data_notification_targets(self, key: str) -> typing.Set[Client]:
+        """Returns the clients to notify of changes to key, registered for it or a prefix of it."""
+        targets: typing.Set[Client] = set(self.stored_data_notification_clients.get(key, ()))
+        prefix_clients = self.stored_data_prefix_notification_clients
+        lengths = self.stored_data_prefix_lengths
+        for length in lengths[:bisect.bisect_right(lengths, len(key))]:
+            targets.update(prefix_clients.get(key[:length], ()))
+        return targets
+
+    def add_stored_data_prefix_notification(self, prefix: str, client: Client) -> None:
+        """Notifies client of changes to all keys starting with prefix."""
+        self.stored_data_prefix_notification_clients[prefix].add(client)
+        index = bisect.bisect_left(self.stored_data_prefix_lengths, len(prefix))
+        if self.stored_data_prefix_lengths[index:index + 1] != [len(prefix)]:
+            self.stored_data_prefix_lengths.insert(index, len(prefix))
+
+    def remove_stored_data_prefix_notifications(self, client: Client) -> None:
+        """Stops notifying client of changes to keys by prefix, forgetting prefixes no client is notified for."""
+        prefix_clients = self.stored_data_prefix_notification_clients
+        for prefix, clients in list(prefix_clients.items()):
+            clients.discard(client)
+            if not clients:
+                del prefix_clients[prefix]
+        self.stored_data_prefix_lengths = sorted({len(prefix) for prefix in prefix_clients})
+
+    def allow_set(self, client: Client) -> bool:
+        """Takes one Set from the client's allowance, which refills at set_rate per second up to set_burst."""
+        if not self.set_rate:
+            return True
+        now = time.monotonic()
+        client.set_allowance = min(self.set_burst,
+                                   client.set_allowance + (now - client.set_allowance_time) * self.set_rate)
+        client.set_allowance_time = now
+        if client.set_allowance < 1:
+            return False
+        client.set_allowance -= 1
+        return True
+
+    def set_stored_data(self, key: str, default: typing.Any,
+                        operations: typing.List[typing.Tuple[typing.Callable[[typing.Any, typing.Any], typing.Any],
+                                                             typing.Any]]) -> typing.Tuple[typing.Any, typing.Any]:
+        """Applies compiled operations to the value of key and returns the original and new value.
+        If an operation fails or data_storage_limit would be exceeded, the value is restored and the error raised."""
+        exists = key in self.stored_data
+        value = self.stored_data[key] if exists else default
+        original_value = copy.copy(value)
+        try:
+            for func, argument in operations:
+                value = func(value, argument)
+            if self.data_storage_limit:
+                self.check_stored_data_size(key, value)
+        except Exception:
+            # operations on containers modify them in place
+            if exists:
+                self.stored_data[key] = original_value
+            raise
+        self.stored_data[key] = value
+        if self.journal_id:
+            self.journal_stored_data.add(key)
+        return original_value, value
+
+    def check_stored_data_size(self, key: str, value: typing.Any) -> None:
+        """Records the size of the new value of key, raises ValueError if it would exceed data_storage_limit.
+        Only called while data_storage_limit is set, as measuring pickles the whole value."""
+        if self.stored_data_sizes is None:
+            self.stored_data_sizes = {stored_key: len(pickle.dumps(stored_value))
+                                      for stored_key, stored_value in self.stored_data.items()}
+            self.stored_data_size = sum(self.stored_data_sizes.values())
+        old_size = self.stored_data_sizes.get(key, 0)
+        size = len(pickle.dumps(value))
+        if size > old_size and self.stored_data_size + size - old_size > self.data_storage_limit:
+            raise ValueError(f"Data storage is limited to {Utils.format_SI_prefix(self.data_storage_limit, 1024)}B.")
+        self.stored_data_sizes[key] = size
+        self.stored_data_size += size - old_size
+
+
 def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
+    ctx.broadcast(itertools.chain.from_iterable(ctx.clients[team].values()),
+                  [{"cmd": "RoomUpdate", "players": ctx.get_players_package()}])
+
+
+class TimedCommand:
+    """Awaits a coroutine and sums up the thread CPU time spent in its steps.
+    Time spent suspended, while the loop runs other rooms and clients, is not counted."""
+    cpu_time: float
+
+    def __init__(self, coroutine: typing.Coroutine):
+        self.coroutine = coroutine
+        self.cpu_time = 0
 
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+    def __await__(self):
+        send, error = None, None
+        while True:
+            start = time.thread_time()
+            try:
+                if error is None:
+                    yielded = self.coroutine.send(send)
+                else:
+                    yielded = self.coroutine.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.cpu_time += time.thread_time() - start
+            try:
+                send, error = (yield yielded), None
+            except GeneratorExit:
+                self.coroutine.close()
+                raise
+            except BaseException as e:
+                send, error = None, e
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -856,7 +1325,15 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
-                await process_client_cmd(ctx, client, msg)
+                command = TimedCommand(process_client_cmd(ctx, client, msg))
+                try:
+                    await command
+                finally:
+                    ctx.cpu_time += command.cpu_time
+                duration = command.cpu_time
+                if duration > ctx.slow_command_time:
+                    cmd = msg.get("cmd") if isinstance(msg, dict) else msg
+                    ctx.logger.warning(f"Processing {cmd} took {duration:.2f}s.")
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
             ctx.logger.exception(e)
@@ -903,6 +1380,7 @@ def get_permissions(ctx) -> typing.Dict[str, Permission]:
 
 
 async def on_client_disconnected(ctx: Context, client: Client):
+    ctx.remove_stored_data_prefix_notifications(client)
     if client.auth:
         await on_client_left(ctx, client)
 
@@ -1022,20 +1500,24 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """
+    Sends the items received since the last call to the clients of the slots that received them,
+    one ReceivedItems per client. Clients of other slots are not visited.
+    """
+    slots, ctx.new_items_slots = ctx.new_items_slots, set()
+    for team, slot in slots:
+        for client in ctx.clients[team][slot]:
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1060,8 +1542,13 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+    new_checks = [(source_player, record_location_checks(ctx, team, source_player, location_ids, False))
+                  for source_player, location_ids in all_locations.items()]
+    # one ReceivedItems per client for everything collected, before any message about it
+    send_new_items(ctx)
+    for source_player, (new_locations, info_texts) in new_checks:
+        if new_locations:
+            announce_location_checks(ctx, team, source_player, new_locations, info_texts)
         update_checked_locations(ctx, team, source_player)
 
     if not is_group:
@@ -1083,13 +1570,28 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_items_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
                              count_activity: bool = True):
+    new_locations, info_texts = record_location_checks(ctx, team, slot, locations, count_activity)
+    if new_locations:
+        # receivers get their items before any message about them, so they can be looked up on ItemSend
+        send_new_items(ctx)
+        announce_location_checks(ctx, team, slot, new_locations, info_texts)
+
+
+def record_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
+                           count_activity: bool) -> typing.Tuple[typing.Set[int], list[dict[str, typing.Any]]]:
+    """
+    Registers the new checks of a slot and queues their items for send_new_items, without sending anything.
+    Returns the new checks and the ItemSend texts about them, for announce_location_checks.
+    """
     slot_locations = ctx.locations[slot]
     new_locations = set(locations) - ctx.location_checks[team, slot]
     new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
+    info_texts: list[dict[str, typing.Any]] = []
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
@@ -1101,7 +1603,6 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             # sort/group by receiver and item
             sortable.append((target_player, item_id, location, flags))
 
-        info_texts: list[dict[str, typing.Any]] = []
         for target_player, item_id, location, flags in sorted(sortable):
             new_item = NetworkItem(item_id, location, slot, flags)
             send_items_to(ctx, team, target_player, new_item)
@@ -1109,28 +1610,33 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
                 team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
                 ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
-            if len(info_texts) >= 140:
-                # split into chunks that are close to compression window of 64K but not too big on the wire
-                # (roughly 1300-2600 bytes after compression depending on repetitiveness)
-                ctx.broadcast_team(team, info_texts)
-                info_texts.clear()
             info_texts.append(json_format_send_event(new_item, target_player))
-        ctx.broadcast_team(team, info_texts)
-        del info_texts
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
-        ctx.broadcast(ctx.clients[team][slot], [{
-            "cmd": "RoomUpdate",
-            "hint_points": get_slot_points(ctx, team, slot),
-            "checked_locations": new_locations,  # send back new checks only
-        }])
-        updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
-        for hint_team, hint_slot in updated_slots:
-            ctx.on_changed_hints(hint_team, hint_slot)
-        ctx.save()
+        if ctx.journal_id:
+            ctx.journal_location_checks[team, slot] |= new_locations
+    return new_locations, info_texts
+
+
+def announce_location_checks(ctx: Context, team: int, slot: int, new_locations: typing.Set[int],
+                             info_texts: list[dict[str, typing.Any]]):
+    """Broadcasts checks registered by record_location_checks, after their items were sent."""
+    for start in range(0, len(info_texts), 140):
+        # split into chunks that are close to compression window of 64K but not too big on the wire
+        # (roughly 1300-2600 bytes after compression depending on repetitiveness)
+        ctx.broadcast_team(team, info_texts[start:start + 140])
+
+    ctx.broadcast(ctx.clients[team][slot], [{
+        "cmd": "RoomUpdate",
+        "hint_points": get_slot_points(ctx, team, slot),
+        "checked_locations": new_locations,  # send back new checks only
+    }])
+    updated_slots: typing.Set[tuple[int, int]] = set()
+    ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
+    for hint_team, hint_slot in updated_slots:
+        ctx.on_changed_hints(hint_team, hint_slot)
+    ctx.save()
 
 
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str], auto_status: HintStatus) \
@@ -1592,6 +2098,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_items_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1610,9 +2117,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
         auto_status = HintStatus.HINT_UNSPECIFIED if for_location else HintStatus.HINT_PRIORITY
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1833,6 +2338,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.no_locations = bool(client.tags & _non_game_messages.keys())
             # set NoText for old PopTracker clients that predate the tag to save traffic
             client.no_text = "NoText" in client.tags or ("PopTracker" in client.tags and client.version < (0, 5, 1))
+            client.compact_types = compact_types_tag in client.tags
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1858,23 +2364,17 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
+            games = [name for name in ctx.gamespackage if name not in exclusions]
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
 
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(ctx.gamespackage))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1908,6 +2408,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                     client.no_text = "NoText" in client.tags or (
                         "PopTracker" in client.tags and client.version < (0, 5, 1)
                     )
+                    client.compact_types = compact_types_tag in client.tags
                     ctx.broadcast_text_all(
                         f"{ctx.get_aliased_name(client.team, client.slot)} (Team #{client.team + 1}) has changed tags "
                         f"from {old_tags} to {client.tags}.",
@@ -1918,8 +2419,11 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             items = get_received_items(ctx, client.team, client.slot, client.remote_items)
             if (start_inventory or items) and not client.no_items:
                 client.send_index = len(start_inventory) + len(items)
+                # received items are only ever appended to, so their count identifies the packet
                 await ctx.send_msgs(client, [{"cmd": "ReceivedItems", "index": 0,
-                                              "items": start_inventory + items}])
+                                              "items": start_inventory + items}],
+                                    ("Sync", client.team, client.slot, client.remote_start_inventory,
+                                     client.remote_items, client.send_index))
 
         elif cmd == 'LocationChecks':
             if client.no_locations:
@@ -2039,20 +2543,26 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             await ctx.send_msgs(client, [args])
 
         elif cmd == "Set":
-            if "key" not in args or args["key"].startswith("_read_") or \
-                    "operations" not in args or not type(args["operations"]) == list:
+            operations = compile_operations(args.get("operations"))
+            if "key" not in args or type(args["key"]) != str or args["key"].startswith("_read_") or \
+                    operations is None:
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'Set', "original_cmd": cmd}])
                 return
+            if not ctx.allow_set(client):
+                await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "cmd",
+                                              "text": "Too many Set packets, slow down.", "original_cmd": cmd}])
+                return
+            try:
+                args["original_value"], args["value"] = ctx.set_stored_data(args["key"], args.get("default", 0),
+                                                                            operations)
+            except Exception as e:
+                await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
+                                              "text": f"Set failed: {e}", "original_cmd": cmd}])
+                return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
             args["slot"] = client.slot
-            for operation in args["operations"]:
-                func = modify_functions[operation["operation"]]
-                value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
+            targets = ctx.get_stored_data_notification_targets(args["key"])
             if args.get("want_reply", False):
                 targets.add(client)
             if targets:
@@ -2060,12 +2570,16 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             ctx.save()
 
         elif cmd == "SetNotify":
-            if "keys" not in args or type(args["keys"]) != list:
+            if ("keys" not in args and "prefixes" not in args) or type(args.get("keys", [])) != list or \
+                    type(args.get("prefixes", [])) != list or \
+                    any(type(prefix) != str for prefix in args.get("prefixes", [])):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
-            for key in args["keys"]:
+            for key in args.get("keys", []):
                 ctx.stored_data_notification_clients[key].add(client)
+            for prefix in args.get("prefixes", []):
+                ctx.add_stored_data_prefix_notification(prefix, client)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2439,6 +2953,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--save_journal', default=defaults["save_journal"], action='store_true',
+                        help="Save only the changes since the previous save to a journal next to the savegame, "
+                             "until they outgrow the full savegame.")
+    parser.add_argument('--data_storage_limit', default=defaults["data_storage_limit"], type=int,
+                        help="Approximate limit for the total size of data storage values in bytes, 0 for unlimited.")
+    parser.add_argument('--set_rate', default=defaults["set_rate"], type=int,
+                        help="Set packets each client may send per second on average, 0 for unlimited.")
+    parser.add_argument('--set_burst', default=defaults["set_burst"], type=int,
+                        help="Set packets each client may send at once.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2533,6 +3056,9 @@ async def main(args: argparse.Namespace):
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.remaining_mode,
                   args.auto_shutdown, args.compatibility, args.log_network)
+    ctx.data_storage_limit = args.data_storage_limit
+    ctx.set_rate = args.set_rate
+    ctx.set_burst = args.set_burst
     data_filename = args.multidata
 
     if not data_filename:
@@ -2562,7 +3088,7 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
-    ctx.init_save(not args.disable_save)
+    ctx.init_save(not args.disable_save, args.save_journal)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
@@ -2584,6 +3110,8 @@ async def main(args: argparse.Namespace):
 client_message_processor = ClientMessageProcessor
 
 if __name__ == '__main__':
+    import settings
+    settings.lazy_world_loading = True
     try:
         asyncio.run(main(parse_args()))
     except asyncio.exceptions.CancelledError:
@@ -4,6 +4,7 @@ import typing
 import enum
 import warnings
 from json import JSONEncoder, JSONDecoder
+from json.encoder import encode_basestring
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
@@ -113,8 +114,92 @@ _encode = JSONEncoder(
 ).encode
 
 
+_typed_tuple_formats: typing.Dict[type, typing.Tuple[typing.List[str], str, str, typing.Tuple[type, ...]]] = {}
+""" NamedTuple type -> JSON text before each field, JSON text after the last field, format of the whole object
+for field values that are all ints, and the field types that format applies to """
+
+
+def _typed_tuple_format(typed_tuple_type: type) -> typing.Tuple[typing.List[str], str, str, typing.Tuple[type, ...]]:
+    fields = typed_tuple_type._fields
+    separators = ["{"] + [","] * len(fields)
+    prefixes = [separator + encode_basestring(field) + ":" for separator, field in zip(separators, fields)]
+    suffix = separators[len(fields)] + '"class":' + encode_basestring(typed_tuple_type.__name__) + "}"
+    int_format = "".join(prefix.replace("%", "%%") + "%d" for prefix in prefixes) + suffix.replace("%", "%%")
+    formats = _typed_tuple_formats[typed_tuple_type] = prefixes, suffix, int_format, (int,) * len(fields)
+    return formats
+
+
+def _encode_into(obj: typing.Any, out: typing.List[str]) -> None:
+    """Appends the JSON of obj to out, the same as _encode(_scan_for_TypedTuples(obj)) gives, but in a single pass
+    over obj. Values of types that are not handled here are handed to the JSON encoder whole."""
+    obj_type = type(obj)
+    if obj_type is str:
+        out.append(encode_basestring(obj))
+    elif obj_type is int:
+        out.append(int.__repr__(obj))
+    elif obj_type is list or obj_type is tuple or obj_type is set or obj_type is frozenset:
+        if not obj:
+            out.append("[]")
+        elif type(next(iter(obj))) is int and set(map(type, obj)) == {int}:
+            out.append("[" + ",".join(map(int.__repr__, obj)) + "]")
+        else:
+            separator = "["
+            for value in obj:
+                out.append(separator)
+                separator = ","
+                _encode_into(value, out)
+            out.append("]")
+    elif obj_type is dict:
+        if not obj:
+            out.append("{}")
+            return
+        start = len(out)
+        separator = "{"
+        for key, value in obj.items():
+            key_type = type(key)
+            if key_type is str:
+                out.append(separator + encode_basestring(key) + ":")
+            elif key_type is int:
+                out.append(separator + '"' + int.__repr__(key) + '":')
+            else:
+                # leave converting other key types to the JSON encoder
+                del out[start:]
+                out.append(_encode(_scan_for_TypedTuples(obj)))
+                return
+            separator = ","
+            _encode_into(value, out)
+        out.append("}")
+    elif obj is None:
+        out.append("null")
+    elif obj is True:
+        out.append("true")
+    elif obj is False:
+        out.append("false")
+    elif isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
+        prefixes, suffix, int_format, int_types = _typed_tuple_formats.get(obj_type) or _typed_tuple_format(obj_type)
+        if tuple(map(type, obj)) == int_types:
+            out.append(int_format % obj)
+        else:
+            for prefix, value in zip(prefixes, obj):
+                out.append(prefix)
+                value_type = type(value)
+                if value_type is str:
+                    out.append(encode_basestring(value))
+                elif value_type is int or (isinstance(value, int) and value_type is not bool):
+                    # the JSON encoder writes int enums as their value as well
+                    out.append(int.__repr__(value))
+                else:
+                    # _scan_for_TypedTuples does not look into the fields of a NamedTuple
+                    out.append(_encode(value))
+            out.append(suffix)
+    else:
+        out.append(_encode(_scan_for_TypedTuples(obj)))
+
+
 def encode(obj: typing.Any) -> str:
-    return _encode(_scan_for_TypedTuples(obj))
+    out: typing.List[str] = []
+    _encode_into(obj, out)
+    return "".join(out)
 
 
 def get_any_version(data: dict) -> Version:
@@ -150,6 +235,58 @@ def _object_hook(o: typing.Any) -> typing.Any:
 
 decode = JSONDecoder(object_hook=_object_hook).decode
 
+compact_types_tag = "CompactTypes"
+""" Connect tag of clients that receive the fields listed in compact_types as arrays, see encode_compact """
+
+compact_types: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    "Connected": {"players": typing.List[NetworkPlayer], "slot_info": typing.Dict[str, NetworkSlot]},
+    "RoomUpdate": {"players": typing.List[NetworkPlayer]},
+    "ReceivedItems": {"items": typing.List[NetworkItem]},
+    "LocationInfo": {"locations": typing.List[NetworkItem]},
+    "PrintJSON": {"item": NetworkItem},
+}
+""" cmd -> field -> type of the fields, whose NamedTuples are sent as arrays of their values in field order """
+
+
+def encode_compact(msgs: typing.Iterable[dict]) -> str:
+    """Encodes msgs like encode, except that the fields listed in compact_types are handed to the JSON encoder as is,
+    which writes their NamedTuples as arrays of values, without scanning them first."""
+    data = []
+    for msg in msgs:
+        fields = compact_types.get(msg.get("cmd"), None)
+        if fields:
+            compact_msg = _scan_for_TypedTuples({key: value for key, value in msg.items() if key not in fields})
+            for key in fields:
+                if key in msg:
+                    compact_msg[key] = msg[key]
+            data.append(compact_msg)
+        else:
+            data.append(_scan_for_TypedTuples(msg))
+    return _encode(data)
+
+
+def _restore_compact(field_type: typing.Any, value: typing.Any) -> typing.Any:
+    # _make accepts both arrays and NamedTuples already restored by _object_hook
+    origin = typing.get_origin(field_type)
+    if origin is list:
+        return list(map(typing.get_args(field_type)[0]._make, value))
+    if origin is dict:
+        make = typing.get_args(field_type)[1]._make
+        return {key: make(item) for key, item in value.items()}
+    return field_type._make(value)
+
+
+def decode_compact(data: str) -> typing.List[dict]:
+    """Decodes messages encoded by either encode or encode_compact."""
+    msgs = decode(data)
+    for msg in msgs:
+        fields = compact_types.get(msg.get("cmd", None), None)
+        if fields:
+            for key, field_type in fields.items():
+                if msg.get(key, None) is not None:
+                    msg[key] = _restore_compact(field_type, msg[key])
+    return msgs
+
 
 class Endpoint:
     socket: "ServerConnection"
@@ -391,8 +528,12 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _receiver_index: typing.Optional[typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int]]]]]
+    """receiver -> item -> [(sender, location, flags)], built on first use by find_item or get_for_player"""
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
+        self._receiver_index = None
 
         if not self:
             raise ValueError(f"Rejecting game with 0 players")
@@ -403,20 +544,30 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+    def _get_receiver_index(self) -> typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int]]]]:
+        if self._receiver_index is None:
+            receiver_index: typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int]]]] = {}
+            for finding_player, check_data in self.items():
+                for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                    receiver_index.setdefault(receiving_player, {}).setdefault(item_id, []).append(
+                        (finding_player, location_id, item_flags))
+            self._receiver_index = receiver_index
+        return self._receiver_index
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        receiver_index = self._get_receiver_index()
+        for receiving_player in slots:
+            for finding_player, location_id, item_flags in receiver_index.get(receiving_player, {}).get(seeked_item_id,
+                                                                                                        ()):
+                yield finding_player, location_id, seeked_item_id, receiving_player, item_flags
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        for locations in self._get_receiver_index().get(slot, {}).values():
+            for source_slot, location_id, _ in locations:
+                all_locations[source_slot].add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
@@ -472,6 +472,282 @@ def restricted_loads(s: bytes) -> Any:
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+multidata_format_versions: typing.Dict[str, int] = {
+    "zlib": 3,
+    "lzma": 4,
+}
+"""Leading byte of a multidata file for each compression it can be written with."""
+
+
+class _CompressionWriter:
+    """Write-only file object that compresses everything written to it into an underlying binary file."""
+
+    def __init__(self, file: BinaryIO, compressor: Any) -> None:
+        self.file = file
+        self.compressor = compressor
+
+    def write(self, data: bytes) -> int:
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.file.write(compressed)
+        return len(data)
+
+    def close(self) -> None:
+        self.file.write(self.compressor.flush())
+
+
+class _DecompressionReader(io.RawIOBase):
+    """Read-only file object that decompresses an underlying binary file on demand."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, file: BinaryIO, decompressor: Any) -> None:
+        self.file = file
+        self.decompressor = decompressor
+        self.pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        exhausted = False
+        while not self.decompressor.eof:
+            # lzma buffers excess output internally, zlib hands back the input it didn't get to
+            if not self.pending and getattr(self.decompressor, "needs_input", True):
+                self.pending = self.file.read(self.chunk_size)
+                if not self.pending:
+                    if exhausted:
+                        raise EOFError("Compressed multidata ended before the end-of-stream marker.")
+                    exhausted = True
+            data = self.decompressor.decompress(self.pending, len(buffer))
+            self.pending = getattr(self.decompressor, "unconsumed_tail", b"")
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+        return 0
+
+
+class _BoundedReader:
+    """Read-only file object for the next length bytes of an underlying binary file, without reading past them."""
+
+    def __init__(self, file: BinaryIO, length: int) -> None:
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _multidata_compressor(compression: str, level: int) -> Any:
+    if compression == "zlib":
+        import zlib
+        return zlib.compressobj(level)
+    if compression == "lzma":
+        import lzma
+        return lzma.LZMACompressor(preset=level)
+    raise ValueError(f"Unknown multidata compression {compression}, "
+                     f"expected one of {', '.join(multidata_format_versions)}.")
+
+
+def dump_multidata(obj: Any, file: BinaryIO, compression: str = "zlib", level: int = 9) -> None:
+    """
+    Pickle obj as multidata into file, compressing while pickling so the uncompressed pickle is never held in memory.
+
+    :param obj: the multidata to write
+    :param file: binary file object to write to, positioned where the multidata should start
+    :param compression: one of multidata_format_versions
+    :param level: zlib compression level or lzma preset, 0-9
+    """
+    compressor = _multidata_compressor(compression, level)
+    file.write(bytes([multidata_format_versions[compression]]))
+    writer = _CompressionWriter(file, compressor)
+    pickle.dump(obj, writer, protocol=pickle.DEFAULT_PROTOCOL)
+    writer.close()
+
+
+def _load_compressed(file: BinaryIO, format_version: int) -> Any:
+    if format_version <= multidata_format_versions["zlib"]:
+        import zlib
+        decompressor = zlib.decompressobj()
+    elif format_version == multidata_format_versions["lzma"]:
+        import lzma
+        decompressor = lzma.LZMADecompressor()
+    else:
+        raise VersionException("Incompatible multidata.")
+    return RestrictedUnpickler(io.BufferedReader(_DecompressionReader(file, decompressor))).load()
+
+
+def load_multidata(file: Union[bytes, BinaryIO]) -> Any:
+    """
+    Restricted-unpickle multidata written by dump_multidata or dump_multidata_sections, decompressing while unpickling.
+
+    :param file: the multidata as bytes, or a binary file object positioned at its start
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        file = io.BytesIO(file)
+    format_version = file.read(1)[0]
+    if format_version != multidata_sections_format_version:
+        return _load_compressed(file, format_version)
+    compression, index = _read_multidata_index(file)
+    values: Dict[typing.Tuple[str, ...], Any] = {}
+    for path, length in index:
+        section = _BoundedReader(file, length)
+        values[path] = _load_compressed(section, multidata_format_versions[compression])
+        if section.remaining:
+            raise EOFError("Multidata sections do not match the data.")
+    if file.read(1):
+        raise EOFError("Multidata sections do not match the data.")
+    return _join_multidata_sections(values)
+
+
+def multidata_compression(data: bytes) -> str:
+    """Returns the compression of multidata written by dump_multidata, as a key of multidata_format_versions."""
+    format_version = data[1] if multidata_has_sections(data) else data[0]
+    return "lzma" if format_version == multidata_format_versions["lzma"] else "zlib"
+
+
+multidata_sections_format_version = 5
+"""Leading byte of multidata written by dump_multidata_sections, followed by the byte of its compression."""
+
+
+def multidata_has_sections(data: bytes) -> bool:
+    """Returns if the multidata was written by dump_multidata_sections."""
+    return data[0] == multidata_sections_format_version
+
+
+def _read_multidata_index(
+    file: BinaryIO
+) -> typing.Tuple[str, typing.List[typing.Tuple[typing.Tuple[str, ...], int]]]:
+    """Reads the compression and the index of paths and lengths of the sections of multidata written by
+    dump_multidata_sections from file, positioned after its leading byte."""
+    import struct
+
+    header = file.read(5)
+    if len(header) < 5:
+        raise EOFError("Multidata sections do not match the data.")
+    for compression, format_version in multidata_format_versions.items():
+        if header[0] == format_version:
+            break
+    else:
+        raise VersionException("Incompatible multidata.")
+    index_length, = struct.unpack_from("<I", header, 1)
+    index = file.read(index_length)
+    if len(index) < index_length:
+        raise EOFError("Multidata sections do not match the data.")
+    return compression, [(tuple(path), length) for path, length in json.loads(index)]
+
+
+def _join_multidata_sections(values: Dict[typing.Tuple[str, ...], Any]) -> Dict[str, Any]:
+    """Puts the values of the sections of multidata back together into the full multidata."""
+    multidata = values[()]
+    for path, value in values.items():
+        if path:
+            parent = multidata
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[path[-1]] = value
+    return multidata
+
+
+def dump_multidata_sections(obj: Dict[str, Any], file: BinaryIO, compression: str = "zlib", level: int = 9) -> None:
+    """
+    Pickle obj as multidata into file, with the slot_info and the data package of each game compressed separately
+    from the rest, so they can be read or dropped through MultidataSections without decompressing everything.
+
+    :param obj: the multidata to write
+    :param file: binary file object to write to, positioned where the multidata should start
+    :param compression: one of multidata_format_versions
+    :param level: zlib compression level or lzma preset, 0-9
+    """
+    rest = dict(obj)
+    values: Dict[typing.Tuple[str, ...], Any] = {}
+    if "slot_info" in rest:
+        values[("slot_info",)] = rest.pop("slot_info")
+    if "datapackage" in rest:
+        # the rest keeps only what identifies each game's data package, as the WebHost stores it
+        data_package = rest["datapackage"] = dict(rest["datapackage"])
+        for game, game_data in data_package.items():
+            if game_data.get("checksum"):
+                values["datapackage", game] = game_data
+                data_package[game] = {"version": game_data.get("version", 0), "checksum": game_data["checksum"]}
+    sections = MultidataSections(compression)
+    sections.dump((), rest, level)
+    for path, value in values.items():
+        sections.dump(path, value, level)
+    sections.write(file)
+
+
+class MultidataSections:
+    """
+    Multidata written by dump_multidata_sections, with each section kept compressed until it is loaded.
+
+    Sections are addressed by the path of keys their value has in the multidata, like ("datapackage", game), the rest
+    of the multidata is the section with the empty path.
+    """
+    compression: str
+    sections: Dict[typing.Tuple[str, ...], bytes]
+
+    def __init__(self, compression: str, sections: Optional[Dict[typing.Tuple[str, ...], bytes]] = None) -> None:
+        self.compression = compression
+        self.sections = sections if sections is not None else {}
+
+    @classmethod
+    def read(cls, file: Union[bytes, BinaryIO]) -> MultidataSections:
+        """
+        Splits multidata written by dump_multidata_sections into its sections, without decompressing them.
+
+        :param file: the multidata as bytes, or a binary file object positioned at its start
+        """
+        if isinstance(file, (bytes, bytearray, memoryview)):
+            file = io.BytesIO(file)
+        if file.read(1) != bytes([multidata_sections_format_version]):
+            raise ValueError("Multidata was not written in sections.")
+        compression, index = _read_multidata_index(file)
+        sections: Dict[typing.Tuple[str, ...], bytes] = {}
+        for path, length in index:
+            sections[path] = file.read(length)
+            if len(sections[path]) < length:
+                raise EOFError("Multidata sections do not match the data.")
+        if file.read(1):
+            raise EOFError("Multidata sections do not match the data.")
+        return cls(compression, sections)
+
+    def load(self, path: typing.Tuple[str, ...]) -> Any:
+        """Restricted-unpickle the section at path."""
+        return _load_compressed(io.BytesIO(self.sections[path]), multidata_format_versions[self.compression])
+
+    def load_all(self) -> Dict[str, Any]:
+        """Restricted-unpickle all sections, putting them back together into the full multidata."""
+        return _join_multidata_sections({path: self.load(path) for path in self.sections})
+
+    def dump(self, path: typing.Tuple[str, ...], obj: Any, level: int = 9) -> None:
+        """Pickle and compress obj as the section at path."""
+        buffer = io.BytesIO()
+        writer = _CompressionWriter(buffer, _multidata_compressor(self.compression, level))
+        pickle.dump(obj, writer, protocol=pickle.DEFAULT_PROTOCOL)
+        writer.close()
+        self.sections[path] = buffer.getvalue()
+
+    def write(self, file: BinaryIO) -> None:
+        import struct
+
+        index = json.dumps([[path, len(section)] for path, section in self.sections.items()]).encode()
+        file.write(bytes([multidata_sections_format_version, multidata_format_versions[self.compression]]))
+        file.write(struct.pack("<I", len(index)))
+        file.write(index)
+        for section in self.sections.values():
+            file.write(section)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+
 class ByValue:
     """
     Mixin for enums to pickle value instead of name (restores pre-3.11 behavior). Use as left-most parent.
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import heapq
 import json
 import logging
 import multiprocessing
+import os
+import time
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -45,12 +48,26 @@ def _mp_gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=No
     return res
 
 
+def _mp_process_upload(upload: dict, meta: dict[str, Any] | None = None, owner=None, sid=None) -> UUID:
+    from setproctitle import setproctitle
+
+    setproctitle(f"Generator (upload {sid})")
+    res = process_upload(upload, meta, owner, sid)
+    setproctitle(f"Generator (idle)")
+    return res
+
+
 def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation):
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
-        logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(_mp_gen_game, (options,),
+        if meta.pop("upload", False):
+            logging.info(f"Processing upload {generation.id}")
+            target = _mp_process_upload
+        else:
+            logging.info(f"Generating {generation.id} for {len(options)} players")
+            target = _mp_gen_game
+        pool.apply_async(target, (options,),
                          {"meta": meta,
                           "sid": generation.id,
                           "owner": generation.owner},
@@ -99,6 +116,84 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+class RoomScheduler:
+    """Starts Rooms on their hoster when their last_activity moves.
+
+    Rooms are indexed by their deadline, last_activity + timeout, after which they no longer need to be hosted.
+    Each tick only queries Rooms with activity since the previous tick, instead of every Room active in the last days.
+    """
+    lookback = timedelta(days=3)
+    """ how far back the first tick looks for Rooms that may still need hosting """
+    activity_overlap = timedelta(seconds=10)
+    """ how far each tick looks back past the previous one, to catch activity that was committed late """
+    report_interval = 600
+    """ seconds between logging the scheduling metrics """
+
+    def __init__(self, hosters: typing.Sequence[MultiworldInstance]):
+        self.hosters = hosters
+        self.deadlines: typing.Dict[UUID, datetime] = {}
+        self.deadline_queue: typing.List[typing.Tuple[datetime, UUID]] = []
+        self.checked_until: datetime | None = None
+        self.latencies: typing.List[float] = []
+        self.tick_times: typing.List[float] = []
+        self.next_report = time.monotonic() + self.report_interval
+
+    def get_hoster(self, room_id: UUID) -> MultiworldInstance:
+        return self.hosters[room_id.int % len(self.hosters)]
+
+    @db_session
+    def tick(self) -> None:
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        first = self.checked_until is None
+        since = now - self.lookback if first else self.checked_until - self.activity_overlap
+        self.checked_until = now
+        for room in select(room for room in Room if room.last_activity >= since):
+            if self.schedule(room, now) and not first:
+                self.latencies.append((now - room.last_activity).total_seconds())
+
+        for hoster in self.hosters:
+            for room_id in hoster.collect_shut_down_rooms():
+                # a Room moves its last_activity back when shutting down, so it is only hosted again if there was
+                # activity since
+                self.deadlines.pop(room_id, None)
+                room = Room.get(id=room_id)
+                if room:
+                    self.schedule(room, now)
+
+        while self.deadline_queue and self.deadline_queue[0][0] <= now:
+            deadline, room_id = heapq.heappop(self.deadline_queue)
+            if self.deadlines.get(room_id) == deadline:
+                del self.deadlines[room_id]
+
+        self.tick_times.append(time.perf_counter() - start)
+        if time.monotonic() >= self.next_report:
+            self.report()
+
+    def schedule(self, room: Room, now: datetime) -> bool:
+        """Starts the Room if its deadline moved and lies in the future. Returns if it did."""
+        deadline = room.last_activity + timedelta(seconds=room.timeout + 5)
+        if deadline <= now or self.deadlines.get(room.id) == deadline:
+            return False
+        self.deadlines[room.id] = deadline
+        heapq.heappush(self.deadline_queue, (deadline, room.id))
+        self.get_hoster(room.id).start_room(room.id)
+        return True
+
+    def report(self) -> None:
+        """Logs the scheduling latency, from a Room's activity to it being scheduled, and the time spent in ticks."""
+        self.next_report = time.monotonic() + self.report_interval
+        if self.latencies:
+            logging.info(f"Scheduled {len(self.latencies)} Room activities, latency "
+                         f"avg {sum(self.latencies) / len(self.latencies):.3f}s, max {max(self.latencies):.3f}s.")
+        if self.tick_times:
+            logging.info(f"Scheduler ran {len(self.tick_times)} ticks for {len(self.deadlines)} active Rooms, tick "
+                         f"avg {sum(self.tick_times) / len(self.tick_times) * 1000:.1f}ms, "
+                         f"max {max(self.tick_times) * 1000:.1f}ms.")
+        self.latencies.clear()
+        self.tick_times.clear()
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
@@ -106,20 +201,14 @@ def autohost(config: dict):
             with Locker("autohost"):
                 cleanup()
                 hosters = []
-                for x in range(config["HOSTERS"]):
+                for x in range(config["HOSTERS"] or os.cpu_count() or 1):
                     hoster = MultiworldInstance(config, x)
                     hosters.append(hoster)
                     hoster.start()
 
+                scheduler = RoomScheduler(hosters)
                 while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                    scheduler.tick()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -175,6 +264,8 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.save_journal = config["SAVE_JOURNAL"]
+        self.command_poll_interval = config["ROOM_COMMAND_POLL_INTERVAL"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
@@ -186,14 +277,22 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.save_journal,
+                                                self.command_poll_interval),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def collect_shut_down_rooms(self) -> typing.List[UUID]:
+        """Returns the Rooms that shut down since the last call, so they can be started again."""
+        room_ids = []
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.discard(room_id)
+            room_ids.append(room_id)
+        return room_ids
+
+    def start_room(self, room_id):
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -216,3 +315,4 @@ class MultiworldInstance():
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
 from .customserver import run_server_process, get_static_server_data
 from .generate import gen_game
+from .upload import process_upload
@@ -19,10 +19,11 @@ from pony.orm import commit, db_session, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, \
+    load_server_cert, apply_save_journal_entry
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, RoomProgress, SaveJournal, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -59,6 +60,8 @@ class DBCommandProcessor(ServerCommandProcessor):
 
 class WebHostContext(Context):
     room_id: int
+    multidata_size: int
+    """ size of the Room's stored multidata, reported as a rough measure of how much memory the Room holds """
 
     def __init__(self, static_server_data: dict, logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
@@ -68,9 +71,10 @@ class WebHostContext(Context):
                                              40, True, "enabled", "enabled",
                                              "enabled", 0, 2, logger=logger)
         del self.static_server_data
-        self.main_loop = asyncio.get_running_loop()
+        self.command_processor = DBCommandProcessor(self)
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.received_item_counts: typing.Dict[typing.Tuple[int, int], typing.Tuple[int, typing.Dict[int, int]]] = {}
 
     def __del__(self):
         try:
@@ -86,19 +90,6 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
-
     @db_session
     def load(self, room_id: int):
         self.room_id = room_id
@@ -108,7 +99,10 @@ class WebHostContext(Context):
         else:
             self.port = get_random_port()
 
-        multidata = self.decompress(room.seed.multidata)
+        stored_multidata = room.seed.multidata
+        self.multidata_size = len(stored_multidata)
+        multidata = self.decompress(stored_multidata)
+        del stored_multidata
         game_data_packages = {}
 
         static_gamespackage = self.gamespackage  # this is shared across all rooms
@@ -147,29 +141,127 @@ class WebHostContext(Context):
         return self._load(multidata, game_data_packages, True)
 
     @db_session
-    def init_save(self, enabled: bool = True):
+    def init_save(self, enabled: bool = True, journal: bool = False):
         self.saving = enabled
+        self.save_journal = journal
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
+            room = Room.get(id=self.room_id)
+            savegame_data = room.multisave
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                save_data = restricted_loads(savegame_data)
+                for entry in room.save_journal.select().order_by(SaveJournal.id):
+                    apply_save_journal_entry(save_data, restricted_loads(entry.data))
+                self.set_save(save_data)
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
-        # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
-        if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
-            room.last_activity = datetime.datetime.utcnow()
+        try:
+            if self.use_save_journal(exit_save):
+                encoded_entry = pickle.dumps(self.call_on_loop(self.get_save_journal_entry))
+                SaveJournal(room=room, data=encoded_entry)
+                self.journal_size += len(encoded_entry)
+            else:
+                encoded_save = pickle.dumps(self.call_on_loop(self.get_journaled_save))
+                room.multisave = encoded_save
+                room.save_journal.select().delete(bulk=True)
+                self.snapshot_size = len(encoded_save)
+            encoded_progress = pickle.dumps(self.call_on_loop(self.get_progress))
+            if room.progress:
+                room.progress.data = encoded_progress
+            else:
+                RoomProgress(room=room, data=encoded_progress)
+            # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
+            if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
+                room.last_activity = datetime.datetime.utcnow()
+            commit()
+        except Exception:
+            self.journal_id = None  # changes may be lost, so the next save has to be a full save
+            raise
         return True
 
-    def get_save(self) -> dict:
-        d = super(WebHostContext, self).get_save()
+    def get_save_fields(self) -> dict:
+        d = super(WebHostContext, self).get_save_fields()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
         return d
 
+    def get_progress(self) -> dict:
+        """Returns the summary of each slot's progress that trackers read instead of the multisave.
+        Has to be called on the loop, see call_on_loop."""
+        for (team, slot, remote), items in self.received_items.items():
+            if not remote:
+                continue
+            # received items are only ever appended to, so only the new ones need counting
+            counted, counts = self.received_item_counts.get((team, slot), (0, {}))
+            new_items = items[counted:]
+            for item in new_items:
+                counts[item.item] = counts.get(item.item, 0) + 1
+            self.received_item_counts[team, slot] = counted + len(new_items), counts
+        return {
+            "checked_location_counts": {team_slot: len(checks) for team_slot, checks in self.location_checks.items()},
+            "received_item_counts": {team_slot: dict(counts)
+                                     for team_slot, (_, counts) in self.received_item_counts.items()},
+            "client_game_state": dict(self.client_game_state),
+            "client_activity_timers": tuple(
+                (key, value.timestamp()) for key, value in self.client_activity_timers.items()),
+            "name_aliases": self.name_aliases,
+            "video": [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()],
+        }
+
+
+class RoomCommandPoller(threading.Thread):
+    """Polls the Commands of all Rooms hosted by this process in one query, instead of a thread per Room."""
+    interval: float
+    """ seconds between polls """
+    contexts: typing.Dict[typing.Any, WebHostContext]
+    """ Room id -> context of the hosted Room """
+    max_query_rooms = 500
+    """ Rooms per query, to stay below the databases' limits for query parameters """
+
+    def __init__(self, interval: float = 5) -> None:
+        super().__init__(name="RoomCommandPoller", daemon=True)
+        self.interval = interval
+        self.contexts = {}
+        self.lock = threading.Lock()
+
+    def add(self, ctx: WebHostContext) -> None:
+        with self.lock:
+            self.contexts[ctx.room_id] = ctx
+
+    def remove(self, ctx: WebHostContext) -> None:
+        with self.lock:
+            if self.contexts.get(ctx.room_id) is ctx:
+                del self.contexts[ctx.room_id]
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                contexts = {room_id: ctx for room_id, ctx in self.contexts.items() if not ctx.exit_event.is_set()}
+            if contexts:
+                try:
+                    self.poll(contexts)
+                except Exception as e:
+                    logging.exception(e)
+            time.sleep(self.interval)
+
+    @db_session
+    def poll(self, contexts: typing.Dict[typing.Any, WebHostContext]) -> None:
+        all_room_ids = list(contexts)
+        for start in range(0, len(all_room_ids), self.max_query_rooms):
+            room_ids = all_room_ids[start:start + self.max_query_rooms]
+            commands = select(command for command in Command if command.room.id in room_ids)
+            if commands:
+                for command in commands:
+                    ctx = contexts[command.room.id]
+                    ctx.main_loop.call_soon_threadsafe(ctx.command_processor, command.commandtext)
+                    command.delete()
+                commit()
+
+
+room_report_interval = 600
+""" seconds between reports of the resources used by each hosted Room """
+
 
 def get_random_port():
     return random.randint(49152, 65535)
@@ -199,6 +291,8 @@ def get_static_server_data() -> dict:
             world_name: world.location_name_groups
             for world_name, world in worlds.AutoWorldRegister.world_types.items()
         },
+        # filled by the rooms as they load, so each data package is encoded once per process
+        "encoded_game_packages": {},
     }
 
     return data
@@ -226,7 +320,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       save_journal: bool = False, command_poll_interval: float = 5):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -270,6 +365,35 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    command_poller = RoomCommandPoller(command_poll_interval)
+    command_poller.start()
+
+    async def report_rooms():
+        """Logs the CPU time each hosted Room used since the previous report, to find Rooms stalling the others.
+        Rooms share the process memory, so only the process as a whole is measured, next to each Room's multidata
+        size."""
+        reported_cpu_time: typing.Dict[typing.Any, float] = {}
+        while True:
+            await asyncio.sleep(room_report_interval)
+            with command_poller.lock:
+                contexts = dict(command_poller.contexts)
+            if not contexts:
+                continue
+            try:
+                import psutil
+                memory = f", process memory: {Utils.format_SI_prefix(psutil.Process().memory_info().rss, 1024)}iB"
+            except ImportError:
+                memory = ""
+            lines = []
+            for room_id, ctx in sorted(contexts.items(), key=lambda item: item[1].cpu_time, reverse=True):
+                cpu_time = ctx.cpu_time - reported_cpu_time.get(room_id, 0)
+                reported_cpu_time[room_id] = ctx.cpu_time
+                lines.append(f"Room {room_id}: {cpu_time:.2f}s CPU, "
+                             f"{Utils.format_SI_prefix(ctx.multidata_size, 1024)}iB multidata, "
+                             f"{len(ctx.endpoints)} connections")
+            for room_id in set(reported_cpu_time) - set(contexts):
+                del reported_cpu_time[room_id]
+            logging.info(f"Hosting {len(contexts)} rooms on {name}{memory}.\n" + "\n".join(lines))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -277,7 +401,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger = set_up_logging(room_id)
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
-                ctx.init_save()
+                ctx.init_save(journal=save_journal)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -289,6 +413,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                         functools.partial(server, ctx=ctx), ctx.host, 0, ssl=get_ssl_context())
 
                     await ctx.server
+                # only take commands once the server is up, a queued /exit could not close it before
+                command_poller.add(ctx)
                 port = 0
                 for wssocket in ctx.server.ws_server.sockets:
                     socketname = wssocket.getsockname()
@@ -331,6 +457,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
+                    command_poller.remove(ctx)
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
                     with (db_session):
                         # ensure the Room does not spin up again on its own, minute of safety buffer
@@ -366,6 +493,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    loop.create_task(report_rooms())
     try:
         loop.run_forever()
     finally:
@@ -4,7 +4,6 @@ import os
 import pickle
 import random
 import tempfile
-import zipfile
 from collections import Counter
 from typing import Any, Dict, List, Optional, Union, Set
 
@@ -13,14 +12,14 @@ from pony.orm import commit, db_session
 
 from BaseClasses import get_seed, seeddigits
 from Generate import PlandoOptions, handle_name
-from Main import main as ERmain
+from Main import GenerationOutput, main as ERmain
 from Utils import __version__
 from WebHostLib import app
 from settings import ServerOptions, GeneratorOptions
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
 from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
-from .upload import upload_zip_to_db
+from .upload import store_generation
 
 
 def get_meta(options_source: dict, race: bool = False) -> Dict[str, Union[List[str], Dict[str, Any]]]:
@@ -152,9 +151,10 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
             erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
         if len(set(erargs.name.values())) != len(erargs.name):
             raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
-        ERmain(erargs, seed, baked_server_options=meta["server_options"])
+        output = GenerationOutput()
+        ERmain(erargs, seed, baked_server_options=meta["server_options"], output=output)
 
-        return upload_to_db(target.name, sid, owner, race)
+        return output_to_db(output, sid, owner, race)
     thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     thread = thread_pool.submit(task)
 
@@ -200,19 +200,10 @@ def wait_seed(seed: UUID):
     return render_template("waitSeed.html", seed_id=seed_id)
 
 
-def upload_to_db(folder, sid, owner, race):
-    for file in os.listdir(folder):
-        file = os.path.join(folder, file)
-        if file.endswith(".zip"):
-            with db_session:
-                with zipfile.ZipFile(file) as zfile:
-                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid)
-                if type(res) == "str":
-                    raise Exception(res)
-                elif res:
-                    seed = res
-                    gen = Generation.get(id=seed.id)
-                    if gen is not None:
-                        gen.delete()
-                    return seed.id
-    raise Exception("Generation zipfile not found.")
+def output_to_db(output: GenerationOutput, sid, owner, race):
+    with db_session:
+        seed = store_generation(output, owner, {"race": race}, sid)
+        gen = Generation.get(id=seed.id)
+        if gen is not None:
+            gen.delete()
+        return seed.id
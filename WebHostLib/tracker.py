@@ -1,5 +1,7 @@
 import datetime
 import collections
+import functools
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -8,16 +10,88 @@ from email.utils import parsedate_to_datetime
 from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
-from MultiServer import Context, get_saving_second
+from MultiServer import Context, apply_save_journal_entry, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, SaveJournal, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
-
-_multidata_cache = {}
+# Approximate memory in bytes that decoded multidata and data packages may take up per process.
+MULTIDATA_CACHE_SIZE = 512 * 1024 * 1024
+GAME_DATA_CACHE_SIZE = 64 * 1024 * 1024
+# Rough factor from the stored length of multidata or a data package to the memory it takes up once decoded.
+DECODED_SIZE_FACTOR = 16
+
+
+class _LRUCache:
+    """Thread-safe cache that keeps the values of the most recently used keys, up to a total approximate size."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.current_size = 0
+        self._values: collections.OrderedDict[Any, Tuple[Any, int]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, create: Callable[[], Tuple[Any, int]]) -> Any:
+        """Returns the value of key, creating it and its approximate size with create if it is not cached.
+        Values larger than the whole cache are not kept."""
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key][0]
+        value, size = create()  # outside the lock, concurrent misses on the same key just create it twice
+        if size > self.size:
+            return value
+        with self._lock:
+            if key in self._values:
+                self.current_size -= self._values[key][1]
+            self._values[key] = value, size
+            self.current_size += size
+            while self.current_size > self.size:
+                self.current_size -= self._values.popitem(last=False)[1][1]
+        return value
+
+
+class _IdNameLookup(collections.ChainMap):
+    """Per-request view on a shared id to name table that names unknown ids without adding them to the shared table."""
+
+    def __init__(self, names: Dict[int, str], unknown_name: Callable[[int], str]):
+        # writes land in the request's own first map, never in the shared names
+        super().__init__({}, names)
+        self.unknown_name = unknown_name
+
+    def __missing__(self, key: int) -> str:
+        return self.unknown_name(key)
+
+
+class _GameData(NamedTuple):
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+
+
+def _load_game_data(checksum: str) -> Tuple[_GameData, int]:
+    data = GameDataPackage.get(checksum=checksum).data
+    game_package = restricted_loads(data)
+    return _GameData(
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+        {id: name for name, id in game_package["item_name_to_id"].items()},
+        {id: name for name, id in game_package["location_name_to_id"].items()},
+    ), len(data) * DECODED_SIZE_FACTOR
+
+
+def _load_multidata(seed: Seed) -> Tuple[Dict[str, Any], int]:
+    data = seed.multidata
+    return Context.decompress(data), len(data) * DECODED_SIZE_FACTOR
+
+
+# multidata and game data never change for a seed id or checksum, so they are shared by all TrackerData
+_multidata_cache = _LRUCache(MULTIDATA_CACHE_SIZE)
+_game_data_cache = _LRUCache(GAME_DATA_CACHE_SIZE)
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
 
@@ -50,14 +124,15 @@ class TrackerData:
     """
     room: Room
     _multidata: Dict[str, Any]
-    _multisave: Dict[str, Any]
+    _progress: Optional[Dict[str, Any]]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _multidata_cache.get(room.seed.id, lambda: _load_multidata(room.seed))
+        # summary written by the room with each save, see WebHostContext.get_progress
+        self._progress = restricted_loads(room.progress.data) if room.progress else None
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -71,15 +146,25 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            checksum = game_package["checksum"]
+            game_data: _GameData = _game_data_cache.get(checksum, lambda: _load_game_data(checksum))
+            # the cached tables are shared between requests and threads, so unknown ids must not be written into them
+            self.item_id_to_name[game] = _IdNameLookup(game_data.item_id_to_name,
+                                                       lambda code: f"Unknown Item (ID: {code})")
+            self.location_id_to_name[game] = _IdNameLookup(game_data.location_id_to_name,
+                                                           lambda code: f"Unknown Location (ID: {code})")
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = game_data.item_name_to_id
+            self.location_name_to_id[game] = game_data.location_name_to_id
+
+    @functools.cached_property
+    def _multisave(self) -> Dict[str, Any]:
+        """The full multisave, only loaded once details not in the progress summary are needed."""
+        multisave = restricted_loads(self.room.multisave) if self.room.multisave else {}
+        for entry in self.room.save_journal.select().order_by(SaveJournal.id):
+            apply_save_journal_entry(multisave, restricted_loads(entry.data))
+        return multisave
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -113,6 +198,12 @@ class TrackerData:
         """Retrieves the set of all locations marked complete by this player."""
         return self._multisave.get("location_checks", {}).get((team, player), set())
 
+    def get_player_checked_locations_count(self, team: int, player: int) -> int:
+        """Retrieves the number of locations marked complete by this player."""
+        if self._progress is not None:
+            return self._progress["checked_location_counts"].get((team, player), 0)
+        return len(self.get_player_checked_locations(team, player))
+
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
@@ -125,11 +216,13 @@ class TrackerData:
     @_cache_results
     def get_player_inventory_counts(self, team: int, player: int) -> collections.Counter:
         """Retrieves a dictionary of all items received by their id and their received count."""
-        received_items = self.get_player_received_items(team, player)
         starting_items = self.get_player_starting_inventory(team, player)
-        inventory = collections.Counter()
-        for item in received_items:
-            inventory[item.item] += 1
+        if self._progress is not None:
+            inventory = collections.Counter(self._progress["received_item_counts"].get((team, player), {}))
+        else:
+            inventory = collections.Counter()
+            for item in self.get_player_received_items(team, player):
+                inventory[item.item] += 1
         for item in starting_items:
             inventory[item] += 1
 
@@ -149,11 +242,17 @@ class TrackerData:
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
-        return self._multisave.get("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
+        return self._get_summary("client_game_state").get((team, player), ClientStatus.CLIENT_UNKNOWN)
 
     def get_player_alias(self, team: int, player: int) -> Optional[str]:
         """Returns the alias of a particular player, if any."""
-        return self._multisave.get("name_aliases", {}).get((team, player), None)
+        return self._get_summary("name_aliases").get((team, player), None)
+
+    def _get_summary(self, key: str) -> Any:
+        """Retrieves a value that is the same in the progress summary and the multisave."""
+        if self._progress is not None:
+            return self._progress[key]
+        return self._multisave.get(key, {})
 
     @_cache_results
     def get_team_completed_worlds_count(self) -> Dict[int, int]:
@@ -187,7 +286,7 @@ class TrackerData:
     def get_team_locations_checked_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of checked player locations each team has."""
         return {
-            team: sum(len(self.get_player_checked_locations(team, player)) for player in players)
+            team: sum(self.get_player_checked_locations_count(team, player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -242,7 +341,7 @@ class TrackerData:
     def get_room_locations_complete(self) -> Dict[TeamPlayer, int]:
         """Retrieves a dictionary of all locations complete per player."""
         return {
-            (team, player): len(self.get_player_checked_locations(team, player))
+            (team, player): self.get_player_checked_locations_count(team, player)
             for team, players in self.get_all_players().items() for player in players
         }
 
@@ -275,7 +374,7 @@ class TrackerData:
         """
         last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = datetime.datetime.utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
+        for (team, player), timestamp in self._get_summary("client_activity_timers"):
             last_activity[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
 
         return last_activity
@@ -287,7 +386,7 @@ class TrackerData:
         Only supported platforms are Twitch and YouTube.
         """
         video_feeds = {}
-        for (team, player), video_data in self._multisave.get("video", []):
+        for (team, player), video_data in self._get_summary("video"):
             video_feeds[team, player] = video_data
 
         return video_feeds
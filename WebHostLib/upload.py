@@ -4,23 +4,27 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
 from markupsafe import Markup
-from pony.orm import commit, flush, select, rollback
+from pony.orm import commit, db_session, flush, select, rollback
 from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
 from NetUtils import SlotType
-from Utils import VersionException, __version__
+from Utils import MultidataSections, VersionException, __version__, dump_multidata, dump_multidata_sections, \
+    multidata_compression, multidata_has_sections, version_tuple
+from settings import get_settings
 from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
-from .models import Seed, Room, Slot, GameDataPackage
+from .models import Seed, Room, Slot, GameDataPackage, Generation, STATE_ERROR, STATE_QUEUED
+
+if typing.TYPE_CHECKING:
+    from Main import GenerationOutput
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
 allowed_options_extensions = (".yaml", ".json", ".yml", ".txt", ".zip")
@@ -48,55 +52,212 @@ def banned_file(filename: str) -> bool:
     return filename.endswith(banned_extensions)
 
 
+def store_game_data_package(game: str, game_data: GamesPackage) -> typing.Dict[str, typing.Any]:
+    """Validates and stores the data package of a game, returning what the multidata keeps of it."""
+    original_checksum = game_data.pop("checksum")
+    game_data = sort_game_data_package(games_package_schema.validate(game_data))
+    game_data["checksum"] = data_package_checksum(game_data)
+    if original_checksum != game_data["checksum"]:
+        raise Exception(f"Original checksum {original_checksum} != "
+                        f"calculated checksum {game_data['checksum']} "
+                        f"for game {game}.")
+    return add_game_data_package(game_data)
+
+
+def sort_game_data_package(game_data: GamesPackage) -> GamesPackage:
+    """Orders the keys of the data package of a game as data_package_checksum expects, keeping the checksum last."""
+    sorted_game_data = {key: value for key, value in sorted(game_data.items()) if key != "checksum"}
+    if "checksum" in game_data:
+        sorted_game_data["checksum"] = game_data["checksum"]
+    return sorted_game_data
+
+
+def add_game_data_package(game_data: GamesPackage) -> typing.Dict[str, typing.Any]:
+    """Stores the data package of a game, unless already known, returning what the multidata keeps of it."""
+    game_data_package = GameDataPackage(checksum=game_data["checksum"],
+                                        data=pickle.dumps(game_data))
+    try:
+        commit()  # commit game data package
+    except TransactionIntegrityError:
+        del game_data_package
+        rollback()
+    return {
+        "version": game_data.get("version", 0),
+        "checksum": game_data["checksum"],
+    }
+
+
+def create_slots(slot_infos: typing.Dict[int, typing.Any], files: typing.Dict[int, bytes]) -> typing.Set[Slot]:
+    slots: typing.Set[Slot] = set()
+    for slot, slot_info in slot_infos.items():
+        # Ignore Player Groups (e.g. item links)
+        if slot_info.type == SlotType.group:
+            continue
+        slots.add(Slot(data=files.get(slot, None),
+                       player_name=slot_info.name,
+                       player_id=slot,
+                       game=slot_info.game))
+    flush()  # commit slots
+    return slots
+
+
 def process_multidata(compressed_multidata, files={}):
-    game_data: GamesPackage
+    if multidata_has_sections(compressed_multidata):
+        return process_multidata_sections(compressed_multidata, files)
 
     decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
+    check_minimum_versions(decompressed_multidata)
 
     slots: typing.Set[Slot] = set()
     if "datapackage" in decompressed_multidata:
         # strip datapackage from multidata, leaving only the checksums
-        game_data_packages: typing.List[GameDataPackage] = []
         for game, game_data in decompressed_multidata["datapackage"].items():
             if game_data.get("checksum"):
-                original_checksum = game_data.pop("checksum")
-                game_data = games_package_schema.validate(game_data)
-                game_data = {key: value for key, value in sorted(game_data.items())}
-                game_data["checksum"] = data_package_checksum(game_data)
-                if original_checksum != game_data["checksum"]:
-                    raise Exception(f"Original checksum {original_checksum} != "
-                                    f"calculated checksum {game_data['checksum']} "
-                                    f"for game {game}.")
-
-                game_data_package = GameDataPackage(checksum=game_data["checksum"],
-                                                    data=pickle.dumps(game_data))
-                decompressed_multidata["datapackage"][game] = {
-                    "version": game_data.get("version", 0),
-                    "checksum": game_data["checksum"],
-                }
-                try:
-                    commit()  # commit game data package
-                    game_data_packages.append(game_data_package)
-                except TransactionIntegrityError:
-                    del game_data_package
-                    rollback()
+                decompressed_multidata["datapackage"][game] = store_game_data_package(game, game_data)
 
     if "slot_info" in decompressed_multidata:
-        for slot, slot_info in decompressed_multidata["slot_info"].items():
-            # Ignore Player Groups (e.g. item links)
-            if slot_info.type == SlotType.group:
-                continue
-            slots.add(Slot(data=files.get(slot, None),
-                           player_name=slot_info.name,
-                           player_id=slot,
-                           game=slot_info.game))
-        flush()  # commit slots
-
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+        slots = create_slots(decompressed_multidata["slot_info"], files)
+
+    with BytesIO() as buffer:
+        dump_multidata(decompressed_multidata, buffer, multidata_compression(compressed_multidata))
+        compressed_multidata = buffer.getvalue()
     return slots, compressed_multidata
 
 
-def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None):
+def process_multidata_sections(compressed_multidata: bytes, files={}):
+    """Like process_multidata, but only decompresses the data packages and slot_info, which have their own sections.
+
+    The rest of the multidata is unpickled once to be validated and then discarded. It already only keeps the checksums
+    of the data packages, so their sections are dropped once stored.
+    """
+    sections = MultidataSections.read(compressed_multidata)
+    for path in sections.sections:
+        if path not in ((), ("slot_info",)) and (len(path) != 2 or path[0] != "datapackage"):
+            raise Exception(f"Unexpected multidata section {path}.")
+    rest = sections.load(())
+    check_minimum_versions(rest)
+
+    for path in list(sections.sections):
+        if path and path[0] == "datapackage":
+            game_data = sections.load(path)
+            if not game_data.get("checksum"):
+                raise Exception(f"Data package section of game {path[1]} has no checksum.")
+            if store_game_data_package(path[1], game_data) != rest.get("datapackage", {}).get(path[1]):
+                raise Exception(f"Data package section of game {path[1]} does not match the multidata.")
+            del sections.sections[path]
+
+    slots: typing.Set[Slot] = set()
+    if ("slot_info",) in sections.sections:
+        slots = create_slots(sections.load(("slot_info",)), files)
+
+    return slots, sections.to_bytes()
+
+
+def check_minimum_versions(multidata: typing.Dict[str, typing.Any]) -> None:
+    """Raises VersionException if the multidata requires a newer server than this one, as MultiServer would."""
+    minimum_version = multidata["minimum_versions"]["server"]
+    if minimum_version > version_tuple:
+        raise VersionException(f"Multidata requires a server of at least version {minimum_version}, "
+                               f"however this server is of version {version_tuple}.")
+
+
+def upload_job_required(multidata: bytes) -> bool:
+    """Large multidata without sections has to be rewritten in full, which is left to the generator processes."""
+    return not multidata_has_sections(multidata) and len(multidata) >= app.config["UPLOAD_JOB_THRESHOLD"]
+
+
+def queue_upload(multidata: bytes, files: typing.Dict[int, bytes], spoiler: str, owner,
+                 meta: typing.Dict[str, typing.Any]) -> Generation:
+    """Queues the upload for the generator processes, which store it through process_upload."""
+    generation = Generation(
+        options=pickle.dumps({"multidata": multidata, "files": files, "spoiler": spoiler}),
+        meta=json.dumps({**meta, "upload": True}),
+        state=STATE_QUEUED,
+        owner=owner)
+    commit()
+    return generation
+
+
+def process_upload(upload: typing.Dict[str, typing.Any], meta: typing.Dict[str, typing.Any], owner, sid) -> uuid.UUID:
+    """Stores an upload queued by queue_upload as the Seed of its Generation."""
+    try:
+        with db_session:
+            seed = store_seed(upload["multidata"], upload["files"], upload["spoiler"], owner, meta, sid)
+            generation = Generation.get(id=sid)
+            if generation is not None:
+                generation.delete()
+            return seed.id
+    except BaseException as e:
+        with db_session:
+            generation = Generation.get(id=sid)
+            if generation is not None:
+                generation.state = STATE_ERROR
+                meta = json.loads(generation.meta)
+                meta["error"] = (e.__class__.__name__ + ": " + str(e))
+                generation.meta = json.dumps(meta)
+                commit()
+        raise
+
+
+def store_seed(multidata: bytes, files: typing.Dict[int, bytes], spoiler: str, owner,
+               meta: typing.Dict[str, typing.Any], sid=None) -> Seed:
+    slots, multidata = process_multidata(multidata, files)
+    return create_seed(multidata, slots, spoiler, owner, meta, sid)
+
+
+def store_generation(output: "GenerationOutput", owner, meta: typing.Dict[str, typing.Any], sid=None) -> Seed:
+    """Stores the output of a generation this WebHost ran itself as Seed.
+
+    Unlike uploads, the checksums of the data packages are trusted as generated and the multidata is compressed only
+    once, here.
+    """
+    multidata = output.multidata
+    for game, game_data in multidata["datapackage"].items():
+        if game_data.get("checksum"):
+            multidata["datapackage"][game] = add_game_data_package(sort_game_data_package(game_data))
+
+    files: typing.Dict[int, bytes] = {}
+    for filename, data in output.files.items():
+        if banned_file(filename):
+            raise Exception(f"Generation output {filename} is likely a rom file, which is not stored.")
+        files[get_file_slot(filename, data)] = data
+    slots = create_slots(multidata["slot_info"], files)
+
+    generator_settings = get_settings().generator
+    with BytesIO() as buffer:
+        dump = dump_multidata_sections if generator_settings.multidata_sections else dump_multidata
+        dump(multidata, buffer, generator_settings.multidata_compression,
+             generator_settings.multidata_compression_level)
+        compressed_multidata = buffer.getvalue()
+    return create_seed(compressed_multidata, slots, output.spoiler, owner, meta, sid)
+
+
+def create_seed(multidata: bytes, slots: typing.Set[Slot], spoiler: str, owner,
+                meta: typing.Dict[str, typing.Any], sid=None) -> Seed:
+    seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
+                id=sid if sid else uuid.uuid4())
+    flush()  # create seed
+    for slot in slots:
+        slot.seed = seed
+    return seed
+
+
+def get_file_slot(filename: str, data: bytes) -> int:
+    """Returns the slot an output file of a generation is for. Raises ValueError for unexpected file names."""
+    # AP Container
+    if AutoPatchRegister.get_handler(filename):
+        with zipfile.ZipFile(BytesIO(data)) as container:
+            return json.loads(container.open("archipelago.json").read())["player"]
+    # Factorio
+    elif filename.endswith(".zip"):
+        _, _, slot_id, *_ = filename.split('_')[0].split('-', 3)
+    # All other files using the standard MultiWorld.get_out_file_name_base method
+    else:
+        _, _, slot_id, *_ = filename.split('.')[0].split('_', 3)
+    return int(slot_id[1:])
+
+
+def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None, offload=False):
     if not owner:
         owner = session["_id"]
     infolist = zfile.infolist()
@@ -116,56 +277,32 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
             return "Uploaded data contained a rom file, which is likely to contain copyrighted material. " \
                    "Your file was deleted."
 
-        # AP Container
-        elif handler:
-            data = zfile.open(file, "r").read()
-            with zipfile.ZipFile(BytesIO(data)) as container:
-                player = json.loads(container.open("archipelago.json").read())["player"]
-            files[player] = data
-
         # Spoiler
-        elif file.filename.endswith(".txt"):
+        elif not handler and file.filename.endswith(".txt"):
             spoiler = zfile.open(file, "r").read().decode("utf-8-sig")
 
         # Multi-data
-        elif file.filename.endswith(".archipelago"):
+        elif not handler and file.filename.endswith(".archipelago"):
             try:
                 multidata = zfile.open(file).read()
             except:
                 flash("Could not load multidata. File may be corrupted or incompatible.")
                 multidata = None
 
-
-        # Factorio
-        elif file.filename.endswith(".zip"):
-            try:
-                _, _, slot_id, *_ = file.filename.split('_')[0].split('-', 3)
-            except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
-                return
-            data = zfile.open(file, "r").read()
-            files[int(slot_id[1:])] = data
-
-        # All other files using the standard MultiWorld.get_out_file_name_base method
+        # AP Containers, Factorio and all other files using the standard MultiWorld.get_out_file_name_base method
         else:
+            data = zfile.open(file, "r").read()
             try:
-                _, _, slot_id, *_ = file.filename.split('.')[0].split('_', 3)
+                files[get_file_slot(file.filename, data)] = data
             except ValueError:
                 flash("Error: Unexpected file found in .zip: " + file.filename)
                 return
-            data = zfile.open(file, "r").read()
-            files[int(slot_id[1:])] = data
 
     # Load multi data.
     if multidata:
-        slots, multidata = process_multidata(multidata, files)
-
-        seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
-                    id=sid if sid else uuid.uuid4())
-        flush()  # create seed
-        for slot in slots:
-            slot.seed = seed
-        return seed
+        if offload and upload_job_required(multidata):
+            return queue_upload(multidata, files, spoiler, owner, meta)
+        return store_seed(multidata, files, spoiler, owner, meta, sid)
     else:
         flash("No multidata was found in the zip file, which is required.")
 
@@ -185,7 +322,7 @@ def uploads():
                 if zipfile.is_zipfile(uploaded_file):
                     with zipfile.ZipFile(uploaded_file, "r") as zfile:
                         try:
-                            res = upload_zip_to_db(zfile)
+                            res = upload_zip_to_db(zfile, offload=True)
                         except VersionException:
                             flash(f"Could not load multidata. Wrong Version detected.")
                         except Exception as e:
@@ -193,6 +330,8 @@ def uploads():
                         else:
                             if res is str:
                                 return res
+                            elif isinstance(res, Generation):
+                                return redirect(url_for("wait_seed", seed=res.id))
                             elif res:
                                 return redirect(url_for("view_seed", seed=res.id))
                 else:
@@ -200,6 +339,9 @@ def uploads():
                     # noinspection PyBroadException
                     try:
                         multidata = uploaded_file.read()
+                        if upload_job_required(multidata):
+                            generation = queue_upload(multidata, {}, "", session["_id"], {"race": False})
+                            return redirect(url_for("wait_seed", seed=generation.id))
                         slots, multidata = process_multidata(multidata)
                     except Exception as e:
                         flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
@@ -14,6 +14,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -69,6 +70,22 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverEntry:
+    # entries of a receiver, sorted by item, then by position in entries
+    ap_id_t item
+    size_t entry
+
+
+cdef int compare_receiver_entries(const void* a, const void* b) noexcept nogil:
+    cdef const ReceiverEntry* x = <const ReceiverEntry*>a
+    cdef const ReceiverEntry* y = <const ReceiverEntry*>b
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.entry != y.entry:
+        return -1 if x.entry < y.entry else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -96,11 +113,17 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    # receiver index is built on first use by find_item or get_for_player
+    cdef ReceiverEntry* receiver_entries  # 1.6MB/100k items
+    cdef IndexEntry* receiver_index  # 16KB/1000 players
+    cdef size_t receiver_index_size  # 0 until built
 
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
                 + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+        if self.receiver_index_size:
+            size += sizeof(ReceiverEntry) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -214,22 +237,75 @@ cdef class LocationStore:
     def items(self) -> Iterable[Tuple[int, PlayerLocationProxy]]:
         return self._items
 
+    cdef void _build_receiver_index(self):
+        # counting sort of entries by receiver, then sort each receiver's entries by item
+        cdef size_t i
+        cdef size_t pos
+        cdef size_t max_receiver = 0
+        cdef LocationEntry* entry
+        for entry in self.entries[:self.entry_count]:
+            max_receiver = max(max_receiver, entry.receiver)
+        cdef IndexEntry* index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
+        if self.entry_count:
+            self.receiver_entries = <ReceiverEntry*>self._mem.alloc(self.entry_count, sizeof(ReceiverEntry))
+        for entry in self.entries[:self.entry_count]:
+            index[entry.receiver].count += 1
+        pos = 0
+        for i in range(max_receiver + 1):
+            index[i].start = pos
+            pos += index[i].count
+            index[i].count = 0
+        for i in range(self.entry_count):
+            entry = self.entries + i
+            pos = index[entry.receiver].start + index[entry.receiver].count
+            self.receiver_entries[pos].item = entry.item
+            self.receiver_entries[pos].entry = i
+            index[entry.receiver].count += 1
+        for i in range(max_receiver + 1):
+            if index[i].count > 1:
+                qsort(self.receiver_entries + index[i].start, index[i].count, sizeof(ReceiverEntry),
+                      compare_receiver_entries)
+        self.receiver_index = index
+        self.receiver_index_size = max_receiver + 1
+
+    cdef size_t _find_receiver_item(self, ap_player_t receiver, ap_id_t item) noexcept nogil:
+        # returns the position of the first receiver entry of item, or the end of the receiver's entries
+        cdef size_t l = self.receiver_index[receiver].start
+        cdef size_t r = l + self.receiver_index[receiver].count
+        cdef size_t m
+        while l < r:
+            m = (l + r) // 2
+            if self.receiver_entries[m].item < item:
+                l = m + 1
+            else:
+                r = m
+        return l
+
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
         cdef ap_player_set* receivers
         cdef size_t slot_count = len(slots)
+        cdef size_t i
+        cdef size_t end
+        cdef LocationEntry* entry
+        if not self.receiver_index_size:
+            self._build_receiver_index()
         if slot_count == 1:
             # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+            receiver_id = list(slots)[0]
+            if receiver_id < 1 or receiver_id >= self.receiver_index_size:
+                return
+            receiver = receiver_id
+            i = self._find_receiver_item(receiver, item)
+            end = self.receiver_index[receiver].start + self.receiver_index[receiver].count
+            while i < end and self.receiver_entries[i].item == item:
+                entry = self.entries + self.receiver_entries[i].entry
+                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                i += 1
         elif slot_count:
-            # generic implementation with lookup in set
+            # generic implementation with lookup in set, walking the receivers that exist in the store
             receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
             if not receivers:
                 raise MemoryError()
@@ -237,25 +313,35 @@ cdef class LocationStore:
                 for receiver in slots:
                     if not ap_player_set_add(receivers, receiver):
                         raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                for receiver in range(1, self.receiver_index_size):
+                    if not ap_player_set_contains(receivers, receiver):
+                        continue
+                    i = self._find_receiver_item(receiver, item)
+                    end = self.receiver_index[receiver].start + self.receiver_index[receiver].count
+                    while i < end and self.receiver_entries[i].item == item:
+                        entry = self.entries + self.receiver_entries[i].entry
+                        yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                        i += 1
             finally:
                 ap_player_set_free(receivers)
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
+        cdef ap_player_t receiver
+        cdef LocationEntry* entry
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if not self.receiver_index_size:
+            self._build_receiver_index()
+        if slot < 1 or slot >= self.receiver_index_size:
+            return all_locations
+        receiver = slot
+        start = self.receiver_index[receiver].start
+        count = self.receiver_index[receiver].count
+        for receiver_entry in self.receiver_entries[start:start + count]:
+            entry = self.entries + receiver_entry.entry
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
@@ -186,6 +186,7 @@ class ERPlacementState:
     def test_speculative_connection(self, source_exit: Entrance, target_entrance: Entrance,
                                     usable_exits: set[Entrance]) -> bool:
         copied_state = self.collection_state.copy()
+        copied_state.own_player_containers(self.world.player)
         # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
         # propagate back to the real multiworld.
         copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
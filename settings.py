@@ -16,7 +16,7 @@ from threading import Lock
 from typing import cast, Any, BinaryIO, ClassVar, TextIO, TypeVar, Union
 
 __all__ = [
-    "get_settings", "fmt_doc", "no_gui",
+    "get_settings", "fmt_doc", "no_gui", "lazy_world_loading",
     "Group", "Bool", "Path", "UserFilePath", "UserFolderPath", "LocalFilePath", "LocalFolderPath",
     "OptionalUserFilePath", "OptionalUserFolderPath", "OptionalLocalFilePath", "OptionalLocalFolderPath",
     "GeneralOptions", "ServerOptions", "GeneratorOptions", "SNIOptions", "Settings"
@@ -24,7 +24,8 @@ __all__ = [
 
 no_gui = False
 skip_autosave = False
-_world_settings_name_cache: dict[str, str] = {}  # TODO: cache on disk and update when worlds change
+lazy_world_loading = False  # only import worlds when they are used, set by entry points before importing worlds
+_world_settings_name_cache: dict[str, str] = {}  # settings key -> game
 _world_settings_name_cache_updated = False
 _lock = Lock()
 
@@ -36,12 +37,15 @@ def _update_cache() -> None:
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
+        from worlds import pending_world_settings
+        from worlds.AutoWorld import loaded_world_types
+        # worlds that weren't imported yet by lazy world loading are known from the world manifest
+        _world_settings_name_cache.update(pending_world_settings)
+        for world in loaded_world_types().values():
             annotation = world.__annotations__.get("settings", None)
             if annotation is None or annotation == "ClassVar[Optional['Group']]":
                 continue
-            _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
+            _world_settings_name_cache[world.settings_key] = world.game
     finally:
         _world_settings_name_cache_updated = True
 
@@ -535,6 +539,28 @@ class ServerOptions(Group):
     class DisableItemCheat(Bool):
         """Disallow !getitem"""
 
+    class SaveJournal(Bool):
+        """
+        Write only the changes since the previous save to a journal file next to the savegame,
+        rewriting the full savegame once the journal grows larger than it. Reduces disk writes for large games.
+        """
+
+    class DataStorageLimit(int):
+        """
+        Approximate limit for the total size of the values clients write to the data storage, in bytes.
+        Set packets growing it beyond the limit are rejected. 0 for unlimited
+        """
+
+    class SetRate(int):
+        """
+        Set packets each client may send per second on average, more are rejected. 0 for unlimited
+        """
+
+    class SetBurst(int):
+        """
+        Set packets each client may send at once before set_rate applies
+        """
+
     class LocationCheckPoints(int):
         """
         Client hint system
@@ -604,6 +630,10 @@ class ServerOptions(Group):
     multidata: str | None = None
     savefile: str | None = None
     disable_save: bool = False
+    save_journal: SaveJournal | bool = False
+    data_storage_limit: DataStorageLimit = DataStorageLimit(0)
+    set_rate: SetRate = SetRate(0)
+    set_burst: SetBurst = SetBurst(1000)
     loglevel: str = "info"
     logtime: bool = False
     server_password: ServerPassword | None = None
@@ -675,6 +705,49 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class FillAlgorithm(str):
+        """
+        Which algorithm to use to place items.
+        balanced -> Sweep the remaining item pool from scratch for every placement round. (Default)
+        persistent -> Keep the remaining item pool collected in one state, removing what got placed, and sweep a copy of
+          it every placement round instead of collecting the whole pool again. Every round still sweeps all filled
+          locations, so this is not faster than balanced; see test/benchmark/fill_algorithm.py. Produces the same
+          placements as balanced.
+        """
+
+    class StageThreads(int):
+        """
+        Number of threads to run the generation stages of worlds in, from generate_early up to generate_basic.
+        Only consecutive players of worlds that declare these stages thread safe are run concurrently, so results don't
+        depend on this setting. 1 runs all worlds one after another.
+        """
+
+    class MultidataCompression(str):
+        """
+        How to compress the .archipelago multidata file.
+        zlib -> Fast to write and read. (Default)
+        lzma -> Smaller files that take longer to write.
+        """
+
+    class MultidataCompressionLevel(int):
+        """
+        Compression level of the multidata file, from 0 (fastest) to 9 (smallest).
+        For lzma this is the preset, where higher levels also use considerably more memory.
+        """
+
+    class MultidataSections(Bool):
+        """
+        Write the .archipelago multidata file with slot info and data packages compressed as their own sections,
+        which lets a WebHost of this version take uploads without decompressing everything. The files are a bit larger
+        and can't be hosted by servers or WebHosts of older versions.
+        """
+
+    class CopyOnWriteState(Bool):
+        """
+        Share unchanged per-player data between copies of the generation state instead of copying everything.
+        Lowers fill time and memory use for multiworlds with many players.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -684,6 +757,12 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    fill_algorithm: FillAlgorithm = FillAlgorithm("balanced")
+    copy_on_write_state: Union[CopyOnWriteState, bool] = False
+    stage_threads: StageThreads = StageThreads(1)
+    multidata_compression: MultidataCompression = MultidataCompression("zlib")
+    multidata_compression_level: MultidataCompressionLevel = MultidataCompressionLevel(9)
+    multidata_sections: Union[MultidataSections, bool] = False
     loglevel: str = "info"
     logtime: bool = False
 
@@ -752,9 +831,10 @@ class Settings(Group):
             if key not in _world_settings_name_cache:
                 # not a world group
                 return super().__getattribute__(key)
-            # directly import world and grab settings class
-            world_mod, world_cls_name = _world_settings_name_cache[key].rsplit(".", 1)
-            world = cast(type, getattr(__import__(world_mod, fromlist=[world_cls_name]), world_cls_name))
+            # import world and grab settings class
+            from worlds.AutoWorld import AutoWorldRegister
+            world = AutoWorldRegister.world_types[_world_settings_name_cache[key]]
+            world_mod, world_cls_name = world.__module__, world.__name__
             assert getattr(world, "settings_key") == key
             try:
                 cls_or_name = world.__annotations__["settings"]
@@ -5,3 +5,9 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import network_encoding
+    network_encoding.run_network_encoding_benchmark()
+    import state_copy
+    state_copy.run_state_copy_benchmark()
+    import fill_algorithm
+    fill_algorithm.run_fill_algorithm_benchmark()
@@ -0,0 +1,44 @@
+def run_fill_algorithm_benchmark():
+    """Times the main fill of freshly generated multiworlds with the balanced and persistent fill_algorithm."""
+    import argparse
+    import logging
+
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, MultiWorld
+    from Utils import init_logging
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+    from Fill import distribute_items_restrictive
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    gen_steps = ("generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                 "generate_basic", "pre_fill")
+
+    def setup(game: str, players: int) -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        for step in gen_steps:
+            call_all(multiworld, step)
+        return multiworld
+
+    for game, players in (("A Link to the Past", 10), ("Timespinner", 20), ("Super Mario 64", 20)):
+        for algorithm in ("balanced", "persistent"):
+            multiworld = setup(game, players)
+            with TimeIt(f"{players} players of {game} filled with {algorithm}", logger):
+                distribute_items_restrictive(multiworld, persistent_exploration=algorithm == "persistent")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_fill_algorithm_benchmark()
@@ -0,0 +1,49 @@
+def run_network_encoding_benchmark():
+    """Compares encoding and decoding of large server packets for regular and CompactTypes clients.
+    "scan" is the regular encoding done by scanning for NamedTuples before handing everything to the JSON encoder."""
+    import logging
+
+    from time_it import TimeIt
+
+    from NetUtils import NetworkItem, NetworkPlayer, NetworkSlot, SlotType, _encode, _scan_for_TypedTuples, decode, \
+        decode_compact, encode, encode_compact
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    iterations = 20
+    players = 300
+    items = [NetworkItem(item, 1000 + item, item % players + 1, item % 8) for item in range(20_000)]
+    packets = {
+        "ReceivedItems": [{"cmd": "ReceivedItems", "index": 0, "items": items}],
+        "LocationInfo": [{"cmd": "LocationInfo", "locations": items[:2_000]}],
+        "Connected": [{
+            "cmd": "Connected", "team": 0, "slot": 1,
+            "players": [NetworkPlayer(0, slot, f"Player{slot}", f"Player{slot}") for slot in range(1, players + 1)],
+            "slot_info": {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player)
+                          for slot in range(1, players + 1)},
+            "missing_locations": list(range(1_000)), "checked_locations": set(range(1_000, 2_000)),
+        }],
+        "PrintJSON": [{"cmd": "PrintJSON", "type": "ItemSend", "receiving": item.player, "item": item,
+                       "data": [{"text": str(item.player), "type": "player_id"}, {"text": " found their "},
+                                {"text": str(item.item), "type": "item_id", "flags": item.flags}]}
+                      for item in items[:140]],
+    }
+
+    for name, msgs in packets.items():
+        for encoding, encoder, decoder in (("scan", lambda obj: _encode(_scan_for_TypedTuples(obj)), decode),
+                                           ("json", encode, decode), ("compact", encode_compact, decode_compact)):
+            with TimeIt(f"{iterations} {encoding} encodes of {name}", logger):
+                for _ in range(iterations):
+                    data = encoder(msgs)
+            with TimeIt(f"{iterations} {encoding} decodes of {name}", logger):
+                for _ in range(iterations):
+                    decoder(data)
+            logger.info(f"{encoding} {name} is {len(data)} characters.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_network_encoding_benchmark()
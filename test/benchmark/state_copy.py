@@ -0,0 +1,58 @@
+def run_state_copy_benchmark():
+    """Compares copying CollectionState eagerly against copy-on-write, the way fill copies a state and then changes
+    only one player of it."""
+    import argparse
+    import itertools
+    import logging
+
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, MultiWorld
+    from Utils import init_logging
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    gen_steps = ("generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                 "generate_basic")
+    game = "A Link to the Past"
+    players = 30
+    iterations = 200
+
+    multiworld = MultiWorld(players)
+    multiworld.game = {player: game for player in multiworld.player_ids}
+    multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+    multiworld.set_seed(0)
+    args = argparse.Namespace()
+    for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+        setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+    multiworld.set_options(args)
+    multiworld.state = CollectionState(multiworld)
+    with TimeIt(f"{players} players of {game} generated", logger):
+        for step in gen_steps:
+            call_all(multiworld, step)
+
+    items = [item for item in multiworld.itempool if item.player == 1 and item.advancement]
+    items = list(itertools.islice(itertools.cycle(items), iterations))
+    locations = multiworld.get_locations(1)
+    for copy_on_write in (False, True):
+        multiworld.copy_on_write_state = copy_on_write
+        state = multiworld.get_all_state(False)
+        mode = "copy-on-write" if copy_on_write else "eager"
+        with TimeIt(f"{len(items)} {mode} copies", logger):
+            for _ in items:
+                state.copy()
+        with TimeIt(f"{len(items)} {mode} copies collecting and searching for one player", logger):
+            for item in items:
+                new_state = state.copy()
+                new_state.collect(item, True)
+                for location in locations:
+                    location.can_reach(new_state)
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_state_copy_benchmark()
@@ -1,12 +1,13 @@
-from typing import List, Iterable
+from typing import List, Iterable, Tuple
 import unittest
 
 from Options import Accessibility
-from test.general import generate_items, generate_locations, generate_test_multiworld
+from test.general import generate_items, generate_locations, generate_test_multiworld, setup_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
     distribute_early_items, distribute_items_restrictive
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
+from worlds.AutoWorld import AutoWorldRegister
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -243,6 +244,50 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(locations[2].item, items[0])
         self.assertEqual(locations[3].item, items[3])
 
+    def test_multi_step_fill_persistent_exploration(self):
+        """Test that fill with a persistent exploration state places the same as the default fill"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 4, 4)
+
+        items = player1.prog_items
+        locations = player1.locations
+
+        multiworld.completion_condition[player1.id] = lambda state: state.has(
+            items[2].name, player1.id) and state.has(items[3].name, player1.id)
+        set_rule(locations[1], lambda state: state.has(
+            items[0].name, player1.id))
+        set_rule(locations[2], lambda state: state.has(
+            items[1].name, player1.id))
+        set_rule(locations[3], lambda state: state.has(
+            items[1].name, player1.id))
+
+        fill_restrictive(multiworld, multiworld.state,
+                         player1.locations.copy(), player1.prog_items.copy(), persistent_exploration=True)
+
+        self.assertEqual(locations[0].item, items[1])
+        self.assertEqual(locations[1].item, items[2])
+        self.assertEqual(locations[2].item, items[0])
+        self.assertEqual(locations[3].item, items[3])
+        self.assertFalse(multiworld.state.prog_items[player1.id], "Fill modified the passed in base state")
+
+    def test_fill_skips_unreachable_regions(self):
+        """Test that fill only places into reachable locations, keeping the order of the locations list"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 0, 3)
+        items = player1.prog_items
+        gated = player1.generate_region(player1.menu, 2, lambda state: state.has(items[0].name, player1.id))
+        unreachable = player1.generate_region(player1.menu, 1, lambda state: False)
+        open_region = player1.generate_region(player1.menu, 2)
+        locations = [*unreachable.locations, *gated.locations, *open_region.locations]
+        unreachable.locations[0].always_allow = lambda state, item: item == items[2]
+
+        fill_restrictive(multiworld, multiworld.state, locations, items.copy())
+
+        self.assertEqual(unreachable.locations[0].item, items[2])
+        self.assertEqual(gated.locations[0].item, items[1])
+        self.assertEqual(open_region.locations[0].item, items[0])
+        self.assertEqual([gated.locations[1], open_region.locations[1]], locations)
+
     def test_impossible_fill(self):
         """Test that fill raises an error when it can't place any items"""
         multiworld = generate_test_multiworld()
@@ -660,6 +705,32 @@ class TestDistributeItemsRestrictive(unittest.TestCase):
         self.assertEqual(gen1.locations[2].item, gen2.locations[2].item)
         self.assertEqual(gen1.locations[3].item, gen2.locations[3].item)
 
+    def test_persistent_exploration_matches_default(self):
+        """Test that the persistent exploration fill produces the same placements as the default fill"""
+        def generate(persistent_exploration: bool) -> PlayerDefinition:
+            multiworld = generate_test_multiworld()
+            player1 = generate_player_data(multiworld, 1, 8, prog_item_count=6, basic_item_count=2)
+            for index, location in enumerate(player1.locations[2:]):
+                item_name = player1.prog_items[index].name
+                set_rule(location, lambda state, item_name=item_name: state.has(item_name, 1))
+            multiworld.completion_condition[1] = lambda state: state.has_all(names(player1.prog_items), 1)
+            distribute_items_restrictive(multiworld, persistent_exploration=persistent_exploration)
+            return player1
+
+        self.assertEqual([location.item.name for location in generate(False).locations],
+                         [location.item.name for location in generate(True).locations])
+
+    def test_persistent_exploration_matches_default_in_games(self):
+        """Test that the persistent exploration fill produces the same placements as the default fill in real games"""
+        world_types = [AutoWorldRegister.world_types[game] for game in ("Timespinner", "Super Mario 64")] * 2
+
+        def generate(persistent_exploration: bool) -> List[Tuple[str, int, str]]:
+            multiworld = setup_multiworld(world_types, seed=1)
+            distribute_items_restrictive(multiworld, persistent_exploration=persistent_exploration)
+            return [(location.name, location.player, location.item.name) for location in multiworld.get_locations()]
+
+        self.assertEqual(generate(False), generate(True))
+
     def test_can_reserve_advancement_items_for_general_fill(self):
         """Test that priority locations fill still satisfies item rules"""
         multiworld = generate_test_multiworld()
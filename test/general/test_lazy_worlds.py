@@ -0,0 +1,45 @@
+import unittest
+
+from worlds.AutoWorld import AutoWorldRegister, LazyWorldTypes, World, loaded_world_types
+
+
+class TestLazyWorldTypes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.old_world_types = AutoWorldRegister.world_types
+        self.world_types = AutoWorldRegister.world_types = LazyWorldTypes()
+        self.loads = 0
+
+        def load() -> None:
+            self.loads += 1
+
+            class LazyWorld(World):
+                game = "Lazy Game"
+                item_name_to_id = {}
+                location_name_to_id = {}
+
+        self.world_types.pending["Lazy Game"] = load
+
+    def tearDown(self) -> None:
+        AutoWorldRegister.world_types = self.old_world_types
+
+    def test_names_without_import(self) -> None:
+        """Tests that game names of pending worlds are known without importing the world"""
+        self.assertIn("Lazy Game", self.world_types)
+        self.assertEqual(list(self.world_types), ["Lazy Game"])
+        self.assertEqual(len(self.world_types), 1)
+        self.assertNotIn("Lazy Game", loaded_world_types())
+        self.assertEqual(self.loads, 0)
+
+    def test_import_on_access(self) -> None:
+        """Tests that a pending world is imported once on first access and can register itself"""
+        world_type = self.world_types["Lazy Game"]
+        self.assertEqual(world_type.game, "Lazy Game")
+        self.assertIs(self.world_types["Lazy Game"], world_type)
+        self.assertEqual(self.loads, 1)
+        self.assertIn("Lazy Game", loaded_world_types())
+        self.assertEqual(len(self.world_types), 1)
+
+    def test_unknown_game(self) -> None:
+        with self.assertRaises(KeyError):
+            _ = self.world_types["Unknown Game"]
+        self.assertIsNone(self.world_types.get("Unknown Game"))
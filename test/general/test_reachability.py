@@ -1,8 +1,8 @@
 import unittest
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, Item, ItemClassification, Location, Region, SphereSearch
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld, gen_steps
+from . import generate_test_multiworld, setup_solo_multiworld, gen_steps
 
 
 class TestBase(unittest.TestCase):
@@ -79,3 +79,62 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+
+class TestSphereSearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        menu = self.multiworld.get_region("Menu", 1)
+        key_room = Region("Key Room", 1, self.multiworld)
+        self.multiworld.regions.append(key_room)
+        menu.connect(key_room, rule=lambda state: state.has("Key", 1))
+        self.locations = {}
+        for name, region, item, rule in (
+                ("Start", menu, "Key", None),
+                ("Key Room Chest", key_room, "Gem", None),
+                ("Gem Chest", menu, "Crown", lambda state: state.has("Gem", 1)),
+                ("Throne", key_room, "Filler", lambda state: state.has_all(("Gem", "Crown"), 1)),
+                ("Nowhere", menu, "Filler", lambda state: False)):
+            location = Location(1, name, None, region)
+            if rule:
+                location.access_rule = rule
+            region.locations.append(location)
+            location.place_locked_item(Item(item, ItemClassification.progression, None, 1))
+            self.locations[name] = location
+
+    def test_spheres(self) -> None:
+        """Ensure locations are found in the spheres their items make them reachable in"""
+        self.assertEqual([{"Start"}, {"Key Room Chest"}, {"Gem Chest"}, {"Throne"}, set(), {"Nowhere"}],
+                         [{location.name for location in sphere} for sphere in self.multiworld.get_spheres()])
+
+    def test_copy(self) -> None:
+        """Ensure a copied search continues independently in its own state"""
+        state = CollectionState(self.multiworld)
+        search = SphereSearch(state, self.locations.values())
+        self.assertEqual([self.locations["Start"]], search.next_sphere())
+        self.assertEqual([], search.next_sphere())
+
+        copied_state = state.copy()
+        copied_search = search.copy(copied_state)
+        copied_state.collect(self.locations["Start"].item, True, self.locations["Start"])
+        self.assertEqual([self.locations["Key Room Chest"]], copied_search.next_sphere())
+        self.assertEqual([], search.next_sphere())
+        self.assertEqual(4, len(search.remaining()))
+
+    def test_order(self) -> None:
+        """Ensure a sphere lists its locations in the order they were given, whichever regions they are in"""
+        menu = self.multiworld.get_region("Menu", 1)
+        locations = []
+        for index in range(20):
+            region = Region(f"Room {index}", 1, self.multiworld)
+            self.multiworld.regions.append(region)
+            menu.connect(region, rule=lambda state: state.has("Key", 1))
+            location = Location(1, f"Room {index} Chest", None, region)
+            region.locations.append(location)
+            locations.append(location)
+        self.multiworld.random.shuffle(locations)
+        state = CollectionState(self.multiworld)
+        search = SphereSearch(state, locations)
+        self.assertEqual([], search.next_sphere())
+        state.collect(self.locations["Start"].item, True, self.locations["Start"])
+        self.assertEqual(locations, search.next_sphere())
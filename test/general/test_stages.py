@@ -0,0 +1,79 @@
+import time
+import unittest
+
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from test.general import gen_steps, generate_items, generate_test_multiworld, setup_multiworld
+
+
+class TestThreadedStages(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(3)
+        self.multiworld.stage_threads = 3
+        for player in (2, 3):
+            self.multiworld.worlds[player].thread_safe_stages = True
+
+    def test_itempool_order(self) -> None:
+        """Tests that items created in threads end up in the itempool in player order"""
+        for player, world in self.multiworld.worlds.items():
+            def create_items(player: int = player) -> None:
+                for item in generate_items(3, player):
+                    # later players finish first
+                    time.sleep(0.01 * (3 - player))
+                    self.multiworld.itempool.append(item)
+            world.create_items = create_items
+
+        call_all(self.multiworld, "create_items")
+        self.assertEqual([item.player for item in self.multiworld.itempool], [1, 1, 1, 2, 2, 2, 3, 3, 3])
+
+    def test_global_random_is_blocked(self) -> None:
+        """Tests that threaded stages can't use the global random and that it is available again afterwards"""
+        errors = []
+        for player in (2, 3):
+            def generate_early() -> None:
+                try:
+                    self.multiworld.random.random()
+                except RuntimeError as e:
+                    errors.append(e)
+            self.multiworld.worlds[player].generate_early = generate_early
+
+        call_all(self.multiworld, "generate_early")
+        self.assertEqual(len(errors), 2)
+        self.multiworld.random.random()
+
+    def test_player_order(self) -> None:
+        """Tests that worlds that aren't thread safe still run after all lower and before all higher players"""
+        self.multiworld.worlds[2].thread_safe_stages = False
+        self.multiworld.worlds[1].thread_safe_stages = True
+        finished = []
+        seen_by_player_2 = []
+        for player, world in self.multiworld.worlds.items():
+            def generate_basic(player: int = player) -> None:
+                if player == 2:
+                    seen_by_player_2.extend(finished)
+                finished.append(player)
+            world.generate_basic = generate_basic
+
+        call_all(self.multiworld, "generate_basic")
+        self.assertEqual(seen_by_player_2, [1])
+        self.assertEqual(finished, [1, 2, 3])
+
+    def test_same_output(self) -> None:
+        """Tests that a world opting into threaded stages generates the same multiworld as when run serially"""
+        checks_finder = AutoWorldRegister.world_types["ChecksFinder"]
+        clique = AutoWorldRegister.world_types["Clique"]
+        self.assertTrue(checks_finder.thread_safe_stages)
+        self.assertFalse(clique.thread_safe_stages)
+        world_types = [checks_finder, checks_finder, clique, checks_finder, checks_finder]
+
+        results = []
+        for stage_threads in (1, 4):
+            multiworld = setup_multiworld(world_types, (), seed=1)
+            multiworld.stage_threads = stage_threads
+            for step in gen_steps:
+                call_all(multiworld, step)
+            itempool = [(item.player, item.name) for item in multiworld.itempool]
+            distribute_items_restrictive(multiworld)
+            results.append((itempool, {(location.player, location.name): (location.item.player, location.item.name)
+                                       for location in multiworld.get_locations()}))
+        self.assertEqual(results[0], results[1])
@@ -1,7 +1,12 @@
+import os
 import unittest
+import unittest.mock
+from collections import Counter
 
+from BaseClasses import CollectionState, Item, ItemClassification, MultiWorld, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from .. import file_path
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +32,97 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestCopyOnWriteState(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        self.multiworld.copy_on_write_state = True
+        menu = self.multiworld.get_region("Menu", 1)
+        self.key_room = Region("Key Room", 1, self.multiworld)
+        self.multiworld.regions.append(self.key_room)
+        menu.connect(self.key_room, rule=lambda state: state.has("Key", 1))
+
+    def test_copies_are_independent(self) -> None:
+        """Ensure mutating either side of a copy-on-write copy doesn't leak into the other"""
+        state = CollectionState(self.multiworld)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.key_room.can_reach(state))
+        copy = state.copy()
+        copy.collect(Item("Key", ItemClassification.progression, None, 2), True)
+        state.collect(Item("Other", ItemClassification.progression, None, 1), True)
+
+        self.assertEqual(0, state.count("Key", 2))
+        self.assertEqual(1, copy.count("Key", 2))
+        self.assertFalse(copy.has("Other", 1))
+        self.assertTrue(self.key_room.can_reach(copy))
+        self.assertEqual(state.path, copy.path)
+        copy.own_attribute("path")[self.key_room] = ("changed", None)
+        self.assertNotEqual(state.path, copy.path)
+
+        state.remove(Item("Key", ItemClassification.progression, None, 1))
+        self.assertFalse(self.key_room.can_reach(state))
+        self.assertTrue(self.key_room.can_reach(copy))
+
+    def test_reads_do_not_copy(self) -> None:
+        """Ensure containers only get copied for the players whose containers get changed"""
+        state = CollectionState(self.multiworld)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.key_room.can_reach(state))
+        copy = state.copy()
+        self.assertTrue(copy.has("Key", 1))
+        self.assertTrue(self.key_room.can_reach(copy))
+        for player in (1, 2):
+            self.assertIs(state.prog_items[player], copy.prog_items[player])
+            self.assertIs(state.reachable_regions[player], copy.reachable_regions[player])
+        self.assertIs(state.path, copy.path)
+
+        copy.collect(Item("Other", ItemClassification.progression, None, 1), True)
+        self.assertIsNot(state.prog_items[1], copy.prog_items[1])
+        self.assertIs(state.prog_items[2], copy.prog_items[2])
+        self.assertFalse(state.has("Other", 1))
+
+    def test_shared_containers_refuse_changes(self) -> None:
+        """Ensure changing a shared container without taking ownership first fails instead of leaking into the copy"""
+        state = CollectionState(self.multiworld)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.key_room.can_reach(state))
+        copy = state.copy()
+        for changed_state in (state, copy):
+            with self.subTest(source=changed_state is state):
+                with self.assertRaises(TypeError):
+                    changed_state.prog_items[1]["Key"] += 1
+                with self.assertRaises(TypeError):
+                    changed_state.reachable_regions[1].add(self.key_room)
+                with self.assertRaises(TypeError):
+                    changed_state.advancements.update(())
+                with self.assertRaises(TypeError):
+                    changed_state.path[self.key_room] = ("changed", None)
+
+        copy.own_player_containers(1)
+        copy.prog_items[1]["Key"] += 1
+        copy.reachable_regions[1].discard(self.key_room)
+        copy.own_attribute("path")[self.key_room] = ("changed", None)
+        self.assertEqual(1, state.count("Key", 1))
+        self.assertEqual(2, copy.count("Key", 1))
+        self.assertIn(self.key_room, state.reachable_regions[1])
+        self.assertNotEqual(state.path, copy.path)
+        self.assertIs(type(state.prog_items[1].copy()), Counter)
+        self.assertIs(type(state.reachable_regions[1].copy()), set)
+
+
+class TestCopyOnWriteWorlds(unittest.TestCase):
+    def test_world_tests(self) -> None:
+        """Run the tests of every world with copy-on-write states, where changing a shared container fails"""
+        loader = unittest.TestLoader()
+        folders = {os.path.join(os.path.dirname(world_type.__file__), "test"): game_name
+                   for game_name, world_type in AutoWorldRegister.world_types.items()}
+        for folder, game_name in folders.items():
+            if not os.path.exists(folder):
+                continue
+            with self.subTest("Game", game=game_name):
+                result = unittest.TestResult()
+                with unittest.mock.patch.object(MultiWorld, "copy_on_write_state", True):
+                    loader.discover(folder, top_level_dir=str(file_path)).run(result)
+                if result.errors or result.failures:
+                    self.fail("\n".join(f"{test}:\n{trace}" for test, trace in result.errors + result.failures))
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import worlds
+from worlds import WorldSource
+from worlds.AutoWorld import AutoWorldRegister
+
+
+class TestWorldManifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.world_type = AutoWorldRegister.world_types["Archipelago"]
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_cached_checksum(self) -> None:
+        """Tests that the checksum of a manifest entry is reused while the data package contents are unchanged"""
+        data_package, entry = worlds._build_data_package(self.world_type, None)
+        self.assertEqual(data_package, self.world_type.get_data_package_data())
+        cached = dict(entry, checksum="cached")
+        self.assertEqual(worlds._build_data_package(self.world_type, cached)[0]["checksum"], "cached")
+
+    def test_changed_contents(self) -> None:
+        """Tests that a manifest entry is not used once the data package contents differ from when it was cached"""
+        _, entry = worlds._build_data_package(self.world_type, None)
+        cached = dict(entry, checksum="cached")
+        with mock.patch.object(self.world_type, "item_name_groups",
+                               {**self.world_type.item_name_groups, "New Group": {"Nothing"}}):
+            data_package, changed_entry = worlds._build_data_package(self.world_type, cached)
+            self.assertEqual(data_package, self.world_type.get_data_package_data())
+        self.assertNotEqual(data_package["checksum"], "cached")
+        self.assertNotEqual(changed_entry["digest"], entry["digest"])
+        self.assertEqual(worlds._build_data_package(self.world_type, {"checksum": "cached"})[0]["checksum"],
+                         entry["checksum"], "entries without a digest should be recomputed")
+
+    def test_fingerprint(self) -> None:
+        """Tests that the fingerprint of a world source changes with its files, but not with its __pycache__"""
+        world_path = os.path.join(self.temp_dir.name, "world")
+        os.makedirs(os.path.join(world_path, "__pycache__"))
+        with open(os.path.join(world_path, "__init__.py"), "w") as f:
+            f.write("")
+        source = WorldSource(world_path, relative=False)
+        fingerprint = source.fingerprint
+        with open(os.path.join(world_path, "__pycache__", "__init__.pyc"), "w") as f:
+            f.write("cache")
+        self.assertEqual(source.fingerprint, fingerprint)
+        with open(os.path.join(world_path, "__init__.py"), "w") as f:
+            f.write("changed = True")
+        self.assertNotEqual(source.fingerprint, fingerprint)
+
+    def test_manifest_round_trip(self) -> None:
+        """Tests that a written manifest is read back, and discarded once the core changes"""
+        manifest = {"world": {"fingerprint": "abc", "games": {}, "components": []}}
+        with mock.patch.object(worlds, "_manifest_path", os.path.join(self.temp_dir.name, "manifest.json")):
+            self.assertEqual(worlds._read_manifest(), {}, "a missing manifest should be empty")
+            worlds._write_manifest(manifest)
+            self.assertEqual(worlds._read_manifest(), manifest)
+            with mock.patch.object(worlds, "_core_fingerprint", "other core"):
+                self.assertEqual(worlds._read_manifest(), {})
+
+    def test_corrupt_manifest(self) -> None:
+        """Tests that a corrupt or truncated manifest is ignored instead of failing to load worlds"""
+        manifest_path = os.path.join(self.temp_dir.name, "manifest.json")
+        with mock.patch.object(worlds, "_manifest_path", manifest_path):
+            for content in ("{\"core\": ", "[]", json.dumps({"core": worlds._core_fingerprint})):
+                with self.subTest(content=content):
+                    with open(manifest_path, "w", encoding="utf-8-sig") as f:
+                        f.write(content)
+                    self.assertEqual(worlds._read_manifest(), {})
@@ -0,0 +1,38 @@
+# Tests for NetUtils.encode_compact and NetUtils.decode_compact
+import json
+import unittest
+
+from NetUtils import NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode_compact, encode, encode_compact
+
+msgs = [
+    {"cmd": "Connected", "team": 0, "slot": 1, "players": [NetworkPlayer(0, 1, "Alias", "Name")],
+     "slot_info": {1: NetworkSlot("Name", "Game", SlotType.player),
+                   2: NetworkSlot("Group", "Game", SlotType.group, [1])},
+     "checked_locations": {3, 4}, "slot_data": {"item": NetworkItem(1, 2, 3, 4)}},
+    {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7)]},
+    {"cmd": "PrintJSON", "type": "ItemSend", "data": [{"text": "text"}], "item": NetworkItem(1, 2, 3, 4)},
+    {"cmd": "Bounced", "data": {"item": NetworkItem(1, 2, 3, 4)}},
+]
+
+
+class TestCompactTypes(unittest.TestCase):
+    def test_arrays(self) -> None:
+        """Tests that only the listed fields are encoded as arrays"""
+        data = json.loads(encode_compact(msgs))
+        self.assertEqual(data[0]["players"], [[0, 1, "Alias", "Name"]])
+        self.assertEqual(data[0]["slot_info"]["2"], ["Group", "Game", 2, [1]])
+        self.assertEqual(data[0]["slot_data"]["item"]["class"], "NetworkItem")
+        self.assertEqual(sorted(data[0]["checked_locations"]), [3, 4])
+        self.assertEqual(data[1]["items"], [[1, 2, 3, 4], [5, 6, 7, 0]])
+        self.assertEqual(data[2]["item"], [1, 2, 3, 4])
+        self.assertEqual(data[3]["data"]["item"]["class"], "NetworkItem")
+
+    def test_roundtrip(self) -> None:
+        """Tests that decode_compact gives the same result for both encodings"""
+        compact = decode_compact(encode_compact(msgs))
+        regular = decode_compact(encode(msgs))
+        self.assertEqual(compact, regular)
+        self.assertEqual(compact[1]["items"], msgs[1]["items"])
+        self.assertIsInstance(compact[1]["items"][0], NetworkItem)
+        self.assertIsInstance(compact[0]["slot_info"]["1"], NetworkSlot)
+        self.assertIsInstance(compact[2]["item"], NetworkItem)
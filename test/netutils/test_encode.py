@@ -0,0 +1,48 @@
+# Tests for NetUtils.encode
+import enum
+import typing
+import unittest
+
+from NetUtils import HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, _encode, _scan_for_TypedTuples, \
+    encode
+
+
+class Nested(typing.NamedTuple):
+    item: NetworkItem
+    names: typing.List[str]
+
+
+class Empty(typing.NamedTuple):
+    pass
+
+
+class Color(str, enum.Enum):
+    red = "red"
+
+
+values = [
+    "text", "unicode ✓ \"quoted\"\n", 0, -5, 2**70, 1.5, float("inf"), True, False, None, [], (), {}, set(),
+    [1, 2, 3], (1, "2", 3.0), {3, 4}, frozenset((5,)), [[1, [2]], {"a": [True, None]}],
+    {"key": 1, 2: "int key", 1.5: "float key", True: "bool key", None: "None key"},
+    {"nested": {3: {"deeper": [NetworkItem(1, 2, 3)]}}},
+    NetworkItem(1, 2, 3, 4), NetworkItem(True, 2, 3), NetworkItem(1.5, 2, 3),
+    NetworkPlayer(0, 1, "Alias", "Name"), NetworkSlot("Group", "Game", SlotType.group, [1, 2]),
+    Nested(NetworkItem(1, 2, 3), ["a"]), Empty(),
+    HintStatus.HINT_FOUND, Color.red, {HintStatus.HINT_FOUND: "enum key"},
+    [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(item, item, 1) for item in range(10)]}],
+]
+
+
+class TestEncode(unittest.TestCase):
+    def test_same_as_scan(self) -> None:
+        """Tests that the single pass encoder writes the same JSON as scanning for NamedTuples first"""
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(encode(value), _encode(_scan_for_TypedTuples(value)))
+
+    def test_unsupported(self) -> None:
+        """Tests that values the JSON encoder can't write still raise TypeError"""
+        for value in (object(), [1, object()], {"key": object()}, {(1, 2): "tuple key"},
+                      Nested(NetworkItem(1, 2, 3), {"a"})):
+            with self.subTest(value=value):
+                self.assertRaises(TypeError, encode, value)
@@ -264,6 +264,12 @@ class TestSpeedupsLocationStore(Base.TestLocationStore):
         self.store = LocationStore(sample_data)
         super().setUp()
 
+    def test_get_size(self) -> None:
+        """Tests that the lazily built receiver index is included in the reported size"""
+        size = self.store.get_size()
+        self.store.get_for_player(1)
+        self.assertGreater(self.store.get_size(), size)
+
 
 @unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
 class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
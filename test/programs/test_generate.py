@@ -63,6 +63,17 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_in_memory(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        output = Main.GenerationOutput()
+        Main.main(*Generate.main(), output=output)
+
+        self.assertEqual(list(Path(self.output_tempdir.name).glob('*.zip')), [])
+        self.assertEqual(set(output.multidata["slot_info"]), {1})
+        self.assertIn("datapackage", output.multidata)
+
     def test_generate_relative(self):
         sys.argv = [sys.argv[0], '--seed', '0',
                     '--player_files_path', str(self.rel_input_dir),
@@ -108,6 +119,7 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_in_memory = None
 
     def test_generate_yaml(self):
         from settings import get_settings
@@ -137,3 +149,39 @@ class TestGenerateWeights(TestGenerateMain):
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+
+class TestGenerateFillAlgorithm(TestGenerateMain):
+    """Tests that the fill algorithms in host.yaml place the same items on a fixed multiworld seed."""
+
+    generate_dir = TestGenerateMain.generate_dir
+    run_dir = TestGenerateMain.run_dir
+    abs_input_dir = Path(__file__).parent / "data" / "multi_world"
+    rel_input_dir = abs_input_dir.relative_to(run_dir)
+    yaml_input_dir = abs_input_dir.relative_to(generate_dir)
+
+    # don't need to run these tests
+    test_generate_absolute = None
+    test_generate_relative = None
+    test_generate_in_memory = None
+    test_generate_yaml = None
+
+    def generate(self, fill_algorithm: str) -> dict:
+        from settings import get_settings
+        generator_settings = get_settings().generator
+        fill_algorithm_backup = generator_settings.fill_algorithm
+        generator_settings.fill_algorithm = generator_settings.FillAlgorithm(fill_algorithm)
+        try:
+            sys.argv = [sys.argv[0], "--seed", "1", "--multi", "1",
+                        "--player_files_path", str(self.abs_input_dir),
+                        "--outputpath", self.output_tempdir.name]
+            output = Main.GenerationOutput()
+            Main.main(*Generate.main(), output=output)
+        finally:
+            generator_settings.fill_algorithm = fill_algorithm_backup
+        return output.multidata["locations"]
+
+    def test_persistent_matches_balanced(self):
+        balanced = self.generate("balanced")
+        self.assertEqual(set(balanced), {1, 2, 3, 4})
+        self.assertEqual(balanced, self.generate("persistent"))
@@ -1,5 +1,20 @@
+import asyncio
+import collections
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import unittest.mock
+import zlib
+from MultiServer import Client, Context, ServerCommandProcessor, TimedCommand, collect_player, \
+    compile_operations, load_save_journal, modify_functions, process_client_cmd, register_location_checks, \
+    send_items_to, send_new_items
+from NetUtils import Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType
+from Utils import restricted_loads
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +53,486 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class FakeSocket:
+    open = True
+
+    def __init__(self) -> None:
+        self.sent: typing.List[typing.List[dict]] = []
+
+    async def send(self, msg: str) -> None:
+        self.sent.append(json.loads(msg))
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.clients = {0: {1: [], 2: []}}
+        self.sockets: typing.Dict[int, FakeSocket] = {}
+        for slot in (1, 2):
+            socket = self.sockets[slot] = FakeSocket()
+            client = Client(socket, self.ctx)  # type: ignore
+            client.team, client.slot, client.items_handling = 0, slot, 0b111
+            self.ctx.clients[0][slot].append(client)
+
+        async def broadcast_send_encoded_msgs(endpoints: typing.Iterable[Client], msg: str) -> bool:
+            for endpoint in endpoints:
+                await endpoint.socket.send(msg)
+            return True
+
+        self.ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs  # type: ignore
+
+    async def test_coalesced(self) -> None:
+        """Tests that items received since the last send arrive in one ReceivedItems per affected client"""
+        for item in range(3):
+            send_items_to(self.ctx, 0, 1, NetworkItem(item, item, 2))
+        send_new_items(self.ctx)
+        send_new_items(self.ctx)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.sockets[1].sent), 1)
+        self.assertEqual(self.sockets[1].sent[0][0]["cmd"], "ReceivedItems")
+        self.assertEqual(self.sockets[1].sent[0][0]["index"], 0)
+        self.assertEqual([item["item"] for item in self.sockets[1].sent[0][0]["items"]], [0, 1, 2])
+        self.assertEqual(self.sockets[2].sent, [])
+
+        send_items_to(self.ctx, 0, 1, NetworkItem(3, 3, 2))
+        send_new_items(self.ctx)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.sockets[1].sent), 2)
+        self.assertEqual(self.sockets[1].sent[1][0]["index"], 3)
+
+    async def test_order(self) -> None:
+        """Tests that checked locations send their items before the messages about them"""
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        self.ctx.item_names = {"Game": {5: "Item", 6: "Other Item"}}
+        self.ctx.location_names = {"Game": {100: "Location", 101: "Other Location"}}
+        self.ctx.locations = LocationStore({1: {100: (5, 1, 0), 101: (6, 2, 0)}, 2: {}})
+        self.ctx.location_checks = collections.defaultdict(set)
+        for client in itertools.chain(self.ctx.clients[0][1], self.ctx.clients[0][2]):
+            client.no_text = False
+        register_location_checks(self.ctx, 0, 1, [100, 101])
+        await asyncio.sleep(0.01)
+        for slot in (1, 2):
+            with self.subTest(slot=slot):
+                commands = [msg["cmd"] for msgs in self.sockets[slot].sent for msg in msgs]
+                self.assertEqual(commands[0], "ReceivedItems")
+                self.assertIn("PrintJSON", commands)
+        self.assertEqual([msg["cmd"] for msgs in self.sockets[1].sent for msg in msgs][-1], "RoomUpdate")
+
+    async def test_collect(self) -> None:
+        """Tests that collecting items from multiple slots sends one ReceivedItems per client"""
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        self.ctx.item_names = {"Game": {5: "Item", 6: "Other Item"}}
+        self.ctx.location_names = {"Game": {100: "Location", 200: "Other Location", 201: "Third Location"}}
+        self.ctx.locations = LocationStore({1: {100: (5, 1, 0)}, 2: {200: (6, 1, 0), 201: (5, 1, 0)}})
+        self.ctx.location_checks = collections.defaultdict(set)
+        for client in itertools.chain(self.ctx.clients[0][1], self.ctx.clients[0][2]):
+            client.no_text = True
+        collect_player(self.ctx, 0, 1)
+        await asyncio.sleep(0.01)
+        received = [msg for msgs in self.sockets[1].sent for msg in msgs if msg["cmd"] == "ReceivedItems"]
+        self.assertEqual(len(received), 1)
+        self.assertEqual(len(received[0]["items"]), 3)
+        commands = [msg["cmd"] for msgs in self.sockets[1].sent for msg in msgs]
+        self.assertEqual(commands[0], "ReceivedItems")
+
+
+class TestEncodedMsgs(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        self.ctx.item_names = {"Game": {5: "Item", 6: "Other Item"}}
+        self.ctx.location_names = {"Game": {100: "Location", 101: "Other Location"}}
+        self.ctx.clients = {0: {1: [], 2: []}}
+        for slot, compact in ((1, False), (1, True), (2, False)):
+            client = Client(FakeSocket(), self.ctx)  # type: ignore
+            client.team, client.slot, client.compact_types, client.no_text = 0, slot, compact, False
+            self.ctx.clients[0][slot].append(client)
+
+    def test_lru(self) -> None:
+        msgs = [{"cmd": "DataPackage", "data": {"games": {}}}]
+        encoded = self.ctx.encode_msgs(msgs, cache_key="key")
+        msgs[0]["data"] = None
+        self.assertIs(self.ctx.encode_msgs(msgs, cache_key="key"), encoded, "cached packet should be reused")
+        self.assertNotEqual(self.ctx.encode_msgs(msgs, compact=True, cache_key="key"), encoded)
+        for key in range(self.ctx.encoded_msgs_size):
+            self.ctx.encode_msgs(msgs, cache_key=key)
+        self.assertNotIn(("key", False), self.ctx.encoded_msgs)
+        self.assertEqual(len(self.ctx.encoded_msgs), self.ctx.encoded_msgs_size)
+
+    def test_lru_length(self) -> None:
+        """Tests that the LRU of encoded packets is bounded by their total length"""
+        msgs = [{"cmd": "Print", "text": "x" * 100}]
+        length = len(self.ctx.encode_msgs(msgs))
+        self.ctx.encoded_msgs_max_length = length * 2
+        for key in range(3):
+            self.ctx.encode_msgs(msgs, cache_key=key)
+        self.assertEqual([(1, False), (2, False)], list(self.ctx.encoded_msgs))
+        self.assertEqual(length * 2, self.ctx.encoded_msgs_length)
+
+        self.ctx.encode_msgs([{"cmd": "Print", "text": "x" * 300}], cache_key="long")
+        self.assertNotIn(("long", False), self.ctx.encoded_msgs)
+        self.assertEqual(length * 2, self.ctx.encoded_msgs_length)
+
+    def test_data_package(self) -> None:
+        """Tests that DataPackage packets are assembled from game packages encoded once per checksum"""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {
+            "Archipelago": {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {}, "checksum": "a"},
+            "Game": {"item_name_to_id": {"Item": 5}, "location_name_to_id": {"Location": 100}, "checksum": "b"},
+            "Old Game": {"item_name_to_id": {"Old Item": 1}, "location_name_to_id": {}},
+        }
+        ctx.item_name_groups = {game: {} for game in ctx.gamespackage}
+        ctx.slot_info = {1: NetworkSlot("Player1", "Game", SlotType.player)}
+        ctx._init_game_data()
+        self.assertEqual(set(ctx.encoded_game_packages), {"a", "b"})
+        for games in ([], ["Game"], list(ctx.gamespackage)):
+            with self.subTest(games=games):
+                expected = [{"cmd": "DataPackage",
+                             "data": {"games": {game: ctx.gamespackage[game] for game in games}}}]
+                self.assertEqual(json.loads(ctx.encode_data_package(games)), expected)
+        ctx.encoded_game_packages["b"] = '"cached"'
+        self.assertEqual(json.loads(ctx.encode_data_package(["Game"]))[0]["data"]["games"]["Game"], "cached")
+
+    async def test_notify_hints(self) -> None:
+        """Tests that hints are encoded once per encoding and sent in order to every concerned client"""
+        own_hint = Hint(1, 1, 100, 5, True)
+        other_hint = Hint(1, 2, 101, 6, True)
+        sent: typing.List[typing.Tuple[typing.List[Client], str]] = []
+
+        async def broadcast_send_encoded_msgs(endpoints: typing.Iterable[Client], msg: str) -> bool:
+            sent.append((list(endpoints), msg))
+            return True
+
+        with unittest.mock.patch.object(self.ctx, "broadcast_send_encoded_msgs", broadcast_send_encoded_msgs), \
+                unittest.mock.patch.object(self.ctx, "encode_msgs", wraps=self.ctx.encode_msgs) as encode_msgs:
+            self.ctx.notify_hints(0, [other_hint, own_hint])
+            await asyncio.sleep(0.01)
+        self.assertEqual(encode_msgs.call_count, 4, "each hint should be encoded once per encoding in use")
+        self.assertEqual(len(sent), 3)
+        for clients, msg in sent:
+            self.assertEqual(len(clients), 1)
+            client = clients[0]
+            items = [message["item"] for message in json.loads(msg)]
+            locations = [item[1] if client.compact_types else item["location"] for item in items]
+            self.assertEqual(locations, [100, 101] if client.slot == 1 else [101], "own hints should come first")
+
+class TestDataStorage(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.stored_data["list"] = [1]
+        self.sockets = [FakeSocket(), FakeSocket()]
+        self.clients = [Client(socket, self.ctx) for socket in self.sockets]  # type: ignore
+        for client in self.clients:
+            client.auth, client.team, client.slot = True, 0, 1
+
+        async def broadcast_send_encoded_msgs(endpoints: typing.Iterable[Client], msg: str) -> bool:
+            for endpoint in endpoints:
+                await endpoint.socket.send(msg)
+            return True
+
+        self.ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs  # type: ignore
+
+    async def set(self, key: str, *operations: typing.Tuple[str, typing.Any], client: int = 0) -> dict:
+        await process_client_cmd(self.ctx, self.clients[client], {
+            "cmd": "Set", "key": key, "want_reply": True,
+            "operations": [{"operation": operation, "value": value} for operation, value in operations]})
+        await asyncio.sleep(0)  # let the broadcast of the reply run
+        return self.sockets[client].sent[-1][0]
+
+    async def test_failed_operations(self) -> None:
+        """Tests that invalid or failing operations are rejected without changing the value"""
+        reply = await self.set("list", ("update", [2]), ("unknown", 3))
+        self.assertEqual((reply["cmd"], reply["type"]), ("InvalidPacket", "arguments"))
+        reply = await self.set("list", ("update", [2]), ("add", "text"))
+        self.assertEqual((reply["cmd"], reply["type"]), ("InvalidPacket", "arguments"))
+        self.assertEqual(self.ctx.stored_data["list"], [1])
+        reply = await self.set("list", ("update", [2]), ("add", [3]))
+        self.assertEqual((reply["cmd"], reply["original_value"], reply["value"]), ("SetReply", [1], [1, 2, 3]))
+
+    async def test_prefix_notification(self) -> None:
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "SetNotify", "prefixes": ["team_0_"]})
+        await self.set("team_0_deaths", ("add", 1))
+        await self.set("team_1_deaths", ("add", 1))
+        self.assertEqual([msgs[0]["key"] for msgs in self.sockets[1].sent], ["team_0_deaths"])
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "SetNotify"})
+        self.assertEqual(self.sockets[1].sent[-1][0]["cmd"], "InvalidPacket")
+
+        await process_client_cmd(self.ctx, self.clients[0], {"cmd": "SetNotify", "prefixes": ["team_", ""]})
+        self.assertEqual(self.ctx.get_stored_data_notification_targets("team_0_deaths"), set(self.clients))
+        self.assertEqual(self.ctx.get_stored_data_notification_targets("team"), {self.clients[0]})
+        self.ctx.remove_stored_data_prefix_notifications(self.clients[0])
+        self.assertEqual(list(self.ctx.stored_data_prefix_notification_clients), ["team_0_"],
+                         "prefixes no client is notified for anymore should be forgotten")
+        self.assertEqual(self.ctx.get_stored_data_notification_targets("team_0_deaths"), {self.clients[1]})
+        self.assertEqual(self.ctx.get_stored_data_notification_targets("team"), set())
+
+    def test_compile_operations(self) -> None:
+        """Tests that runs of integer max and min are fused and operations are applied the same as one by one"""
+        operations = [{"operation": operation, "value": value} for operation, value in
+                      (("add", 1), ("default", None), ("add", 2), ("mul", 2), ("mul", 3), ("max", 5), ("max", 100),
+                       ("add", 1.5), ("add", 1), ("add", 1))]
+        compiled = compile_operations(operations)
+        self.assertEqual([argument for _, argument in compiled], [1, 2, 2, 3, 100, 1.5, 1, 1])
+        for value in (0, 20.5):
+            expected = value
+            for operation in operations:
+                expected = modify_functions[operation["operation"]](expected, operation["value"])
+            result = value
+            for func, argument in compiled:
+                result = func(result, argument)
+            self.assertEqual(result, expected)
+        result = float(2 ** 53)
+        for func, argument in compile_operations([{"operation": "add", "value": 1}] * 2):
+            result = func(result, argument)
+        self.assertEqual(result, float(2 ** 53), "float additions should round after each operation")
+        self.assertIsNone(compile_operations([{"operation": "add", "value": 1}, {"operation": "unknown"}]))
+        self.assertIsNone(compile_operations([{"operation": "replace"}]), "operations other than default need a value")
+        self.assertEqual(compile_operations([{"operation": "default"}]), [])
+
+    async def test_rate_limit(self) -> None:
+        self.ctx.set_rate, self.ctx.set_burst = 0.001, 2
+        self.clients[0].set_allowance = self.ctx.set_burst
+        for _ in range(2):
+            self.assertEqual((await self.set("key", ("replace", 1)))["cmd"], "SetReply")
+        reply = await self.set("key", ("replace", 2))
+        self.assertEqual((reply["cmd"], reply["type"]), ("InvalidPacket", "cmd"))
+        self.assertEqual(self.ctx.stored_data["key"], 1)
+        self.assertEqual((await self.set("key", ("replace", 2), client=1))["cmd"], "SetReply",
+                         "the allowance should be per client")
+
+    async def test_size_limit(self) -> None:
+        self.ctx.data_storage_limit = 1000
+        self.assertEqual((await self.set("list", ("add", list(range(50)))))["cmd"], "SetReply")
+        reply = await self.set("list", ("update", list(range(50, 500))))
+        self.assertEqual((reply["cmd"], reply["type"]), ("InvalidPacket", "arguments"))
+        self.assertEqual(len(self.ctx.stored_data["list"]), 51)
+        self.assertEqual((await self.set("list", ("replace", [])))["cmd"], "SetReply", "shrinking should be allowed")
+        self.assertEqual((await self.set("other", ("replace", list(range(100)))))["cmd"], "SetReply")
+        self.assertEqual(self.ctx.stored_data_size, sum(self.ctx.stored_data_sizes.values()))
+
+
+class TestHintIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.groups = {3: {2}}
+        self.hint = Hint(3, 1, 100, 5, False)
+        self.other_hint = Hint(1, 1, 101, 6, False)
+        self.ctx.hints[0, 1] = {self.hint, self.other_hint}
+        self.ctx.hints[0, 2] = {self.hint}
+        self.ctx.index_hints()
+
+    def test_get_hint(self) -> None:
+        self.assertIs(self.ctx.get_hint(0, 1, 100), self.hint)
+        self.assertIsNone(self.ctx.get_hint(0, 2, 100), "hints should only be found for the finding player")
+        self.assertIsNone(self.ctx.get_hint(1, 1, 100))
+
+    def test_recheck_location_hints(self) -> None:
+        """Tests that checking a location updates the hints for that location in every concerned slot only"""
+        self.ctx.location_checks[0, 1] = {100, 101}
+        changed = set()
+        self.ctx.recheck_location_hints(0, 1, {100}, changed)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        found_hint = self.ctx.get_hint(0, 1, 100)
+        self.assertTrue(found_hint.found)
+        self.assertEqual(found_hint.status, HintStatus.HINT_FOUND)
+        for slot in (1, 2):
+            self.assertIn(found_hint, self.ctx.hints[0, slot])
+            self.assertNotIn(self.hint, self.ctx.hints[0, slot])
+        self.assertIs(self.ctx.get_hint(0, 1, 101), self.other_hint, "unchecked location's hint should be untouched")
+
+    def test_replace_hint(self) -> None:
+        new_hint = self.hint.re_prioritize(self.ctx, HintStatus.HINT_PRIORITY)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, self.hint, new_hint)
+        self.assertIs(self.ctx.get_hint(0, 1, 100), new_hint)
+        self.assertEqual(self.ctx.hints[0, 2], {new_hint})
+
+
+class TestHintRecheck(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.player_name_lookup = {name: team_slot for team_slot, name in self.ctx.player_names.items()}
+        self.ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        self.ctx.games = {1: "Game", 2: "Game"}
+        self.ctx.item_names = {"Game": {5: "Item", 6: "Other Item"}}
+        self.ctx.location_names = {"Game": {100: "Location", 101: "Other Location"}}
+        self.ctx.gamespackage["Game"] = {"location_name_to_id": {"Location": 100, "Other Location": 101}}
+        self.ctx.locations = LocationStore({1: {100: (5, 2, 0)}, 2: {101: (6, 1, 0)}})
+        self.ctx.location_checks = collections.defaultdict(set)
+        self.ctx.clients = {0: {1: [], 2: []}}
+        # player 1 has their location hinted, player 2 has their location hinted as holding player 1's item
+        self.ctx.hints[0, 1] = {Hint(2, 1, 100, 5, False), Hint(1, 2, 101, 6, False)}
+        self.ctx.hints[0, 2] = set(self.ctx.hints[0, 1])
+        self.ctx.index_hints()
+
+    def assertFullyRechecked(self) -> None:
+        """Asserts that a full recheck of every hint doesn't change anything anymore"""
+        hints = {team_slot: set(hints) for team_slot, hints in self.ctx.hints.items()}
+        self.ctx.recheck_hints()
+        self.assertEqual(hints, self.ctx.hints)
+
+    async def test_send_location(self) -> None:
+        """Tests that an admin /send_location updates the hints for that location"""
+        self.assertTrue(ServerCommandProcessor(self.ctx)("/send_location Player1 Location"))
+        self.assertTrue(self.ctx.get_hint(0, 1, 100).found)
+        self.assertFalse(self.ctx.get_hint(0, 2, 101).found)
+        for slot in (1, 2):
+            self.assertIn(self.ctx.get_hint(0, 1, 100), self.ctx.get_rechecked_hints(0, slot))
+        self.assertFullyRechecked()
+
+    async def test_collect(self) -> None:
+        """Tests that an admin /collect updates the hints for the locations holding the player's items"""
+        self.assertTrue(ServerCommandProcessor(self.ctx)("/collect Player1"))
+        self.assertTrue(self.ctx.get_hint(0, 2, 101).found)
+        self.assertFalse(self.ctx.get_hint(0, 1, 100).found)
+        for slot in (1, 2):
+            self.assertIn(self.ctx.get_hint(0, 2, 101), self.ctx.get_rechecked_hints(0, slot))
+        self.assertFullyRechecked()
+
+
+class TestSpheres(unittest.TestCase):
+    def test_get_sphere(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        self.assertEqual(ctx.get_sphere(1, 100), -1, "no spheres should give -1")
+        ctx.spheres = [{1: {100, 101}}, {1: {102}, 2: {200}}, {2: {201}}]
+        ctx.index_spheres()
+        self.assertEqual([ctx.get_sphere(1, location) for location in (100, 101, 102)], [0, 0, 1])
+        self.assertEqual([ctx.get_sphere(2, location) for location in (200, 201)], [1, 2])
+        with self.assertRaises(KeyError):
+            ctx.get_sphere(1, 200)
+        with self.assertRaises(KeyError):
+            ctx.get_sphere(3, 100)
+
+
+class TestTimedCommand(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def spin(seconds: float) -> None:
+        end = time.thread_time() + seconds
+        while time.thread_time() < end:
+            pass
+
+    async def test_excludes_suspended_time(self) -> None:
+        async def command() -> int:
+            self.spin(0.05)
+            await asyncio.sleep(0.01)
+            self.spin(0.05)
+            return 1
+
+        async def other_room() -> None:
+            await asyncio.sleep(0)
+            self.spin(0.3)
+
+        other = asyncio.create_task(other_room())
+        timed = TimedCommand(command())
+        self.assertEqual(await timed, 1)
+        await other
+        self.assertGreaterEqual(timed.cpu_time, 0.1)
+        self.assertLess(timed.cpu_time, 0.3, "time spent in other tasks should not be counted")
+
+    async def test_exception(self) -> None:
+        async def command() -> None:
+            await asyncio.sleep(0)
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            await TimedCommand(command())
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.save_filename = os.path.join(self.temp_dir.name, "test.apsave")
+        self.ctx.save_journal = True
+        self.ctx.received_items[0, 1, True] = [NetworkItem(1, 1, 1, 0)]
+        self.ctx.stored_data["large"] = list(range(10000))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def load(self, journal: typing.Optional[bytes] = None) -> typing.Tuple[dict, int]:
+        with open(self.ctx.save_filename, "rb") as f:
+            savedata = restricted_loads(zlib.decompress(f.read()))
+        if journal is None:
+            with open(self.ctx.journal_filename, "rb") as f:
+                journal = f.read()
+        return savedata, load_save_journal(savedata, journal)
+
+    def test_journal(self) -> None:
+        """Tests that only changes get appended after a full save and that replaying them restores the save"""
+        self.assertTrue(self.ctx._save())
+        snapshot_mtime = os.stat(self.ctx.save_filename).st_mtime_ns
+        self.ctx.received_items[0, 1, True].append(NetworkItem(2, 2, 1, 0))
+        self.ctx.location_checks[0, 1].add(2)
+        self.ctx.journal_location_checks[0, 1].add(2)
+        self.ctx.hints[0, 1].add(Hint(1, 1, 3, 3, False))
+        self.ctx.on_changed_hints(0, 1)
+        self.ctx.stored_data["small"] = 1
+        self.ctx.journal_stored_data.add("small")
+        self.assertTrue(self.ctx._save())
+        self.assertEqual(os.stat(self.ctx.save_filename).st_mtime_ns, snapshot_mtime)
+
+        savedata, replayed = self.load()
+        self.assertEqual(replayed, 1)
+        self.assertEqual(savedata["received_items"], self.ctx.received_items)
+        self.assertEqual(savedata["location_checks"], {(0, 1): {2}})
+        self.assertEqual(savedata["hints"], dict(self.ctx.hints))
+        self.assertEqual(savedata["stored_data"], self.ctx.stored_data)
+
+        with open(self.ctx.journal_filename, "rb") as f:
+            journal = f.read()
+        self.assertEqual(self.load(journal[:-1])[1], 0, "truncated entry should be ignored")
+        self.assertEqual(self.load(journal + journal[-10:])[1], 1, "truncated entry should be ignored")
+
+    def test_journal_entry(self) -> None:
+        """Tests that journal entries only contain what changed since the previous save"""
+        self.assertTrue(self.ctx._save())
+        self.ctx.hints_used[0, 1] += 1
+        self.assertEqual(self.ctx.get_save_journal_entry(),
+                         {"hints_used": {(0, 1): 1}, "received_items": {}, "location_checks": {}, "hints": {},
+                          "stored_data": {}})
+        self.assertNotIn("hints_used", self.ctx.get_save_journal_entry())
+
+    def test_compaction(self) -> None:
+        """Tests that the exit save is a full save, which starts a new journal"""
+        self.assertTrue(self.ctx._save())
+        self.ctx.received_items[0, 1, True].append(NetworkItem(2, 2, 1, 0))
+        self.assertTrue(self.ctx._save())
+        self.assertTrue(self.ctx._save(True))
+        savedata, replayed = self.load()
+        self.assertEqual(replayed, 0)
+        self.assertEqual(savedata["received_items"], self.ctx.received_items)
+
+        self.ctx.save_journal = False
+        self.assertTrue(self.ctx._save())
+        self.assertIsNone(self.ctx.journal_id)
+        self.assertNotIn("journal", self.load(b"")[0])
+
+    def test_save_from_thread(self) -> None:
+        """Tests that the save thread reads the journal on the loop, so changes cannot slip in between"""
+        async def save_from_thread() -> None:
+            self.ctx.main_loop = asyncio.get_running_loop()
+            loop_thread = threading.current_thread()
+            called_on = []
+            get_save_journal_entry = self.ctx.get_save_journal_entry
+
+            def record_thread() -> dict:
+                called_on.append(threading.current_thread())
+                return get_save_journal_entry()
+
+            self.assertTrue(await asyncio.to_thread(self.ctx._save))
+            self.ctx.received_items[0, 1, True].append(NetworkItem(2, 2, 1, 0))
+            with unittest.mock.patch.object(self.ctx, "get_save_journal_entry", record_thread):
+                self.assertTrue(await asyncio.to_thread(self.ctx._save))
+            self.assertEqual(called_on, [loop_thread])
+
+        asyncio.run(save_from_thread())
+        savedata, replayed = self.load()
+        self.assertEqual(replayed, 1)
+        self.assertEqual(savedata["received_items"], self.ctx.received_items)
@@ -0,0 +1,90 @@
+# Tests for multidata compression in Utils.py
+
+import io
+import pickle
+import unittest
+import zlib
+
+from Utils import MultidataSections, VersionException, dump_multidata, dump_multidata_sections, load_multidata, \
+    multidata_compression, multidata_has_sections
+
+
+class TestMultidata(unittest.TestCase):
+    data = {
+        "seed_name": "12345",
+        "locations": {player: {location: (location, player, 0) for location in range(1000)} for player in range(1, 9)},
+        "tags": ["AP"],
+    }
+
+    def test_roundtrip(self) -> None:
+        for compression in ("zlib", "lzma"):
+            for level in (0, 1, 9):
+                with self.subTest(compression=compression, level=level):
+                    buffer = io.BytesIO()
+                    dump_multidata(self.data, buffer, compression, level)
+                    self.assertEqual(multidata_compression(buffer.getvalue()), compression)
+                    self.assertEqual(load_multidata(buffer.getvalue()), self.data)
+                    buffer.seek(0)
+                    self.assertEqual(load_multidata(buffer), self.data)
+
+    def test_legacy_format(self) -> None:
+        """Tests that multidata compressed in one go, as it used to be written, can still be read"""
+        legacy = bytes([3]) + zlib.compress(pickle.dumps(self.data), 9)
+        self.assertEqual(load_multidata(legacy), self.data)
+        self.assertEqual(multidata_compression(legacy), "zlib")
+
+    def test_incompatible(self) -> None:
+        with self.assertRaises(VersionException):
+            load_multidata(bytes([255]) + zlib.compress(pickle.dumps(self.data)))
+        with self.assertRaises(EOFError):
+            buffer = io.BytesIO()
+            dump_multidata(self.data, buffer)
+            load_multidata(buffer.getvalue()[:-100])
+        with self.assertRaises(ValueError):
+            dump_multidata(self.data, io.BytesIO(), "bz2")
+
+    def test_forbidden_globals(self) -> None:
+        buffer = io.BytesIO()
+        dump_multidata({"forbidden": unittest.TestCase}, buffer)
+        with self.assertRaises(pickle.UnpicklingError):
+            load_multidata(buffer.getvalue())
+
+    def test_sections(self) -> None:
+        """Tests that sections can be read or dropped on their own, and that all of them load as the full multidata"""
+        data = {
+            **self.data,
+            "slot_info": {1: "Player1"},
+            "datapackage": {
+                "Game": {"item_name_to_id": {"Item": 1}, "checksum": "abc", "version": 0},
+                "Legacy Game": {"item_name_to_id": {"Item": 1}, "version": 1},
+            },
+        }
+        for compression in ("zlib", "lzma"):
+            with self.subTest(compression=compression):
+                buffer = io.BytesIO()
+                dump_multidata_sections(data, buffer, compression)
+                self.assertTrue(multidata_has_sections(buffer.getvalue()))
+                self.assertEqual(multidata_compression(buffer.getvalue()), compression)
+                self.assertEqual(load_multidata(buffer.getvalue()), data)
+
+                sections = MultidataSections.read(buffer.getvalue())
+                self.assertEqual(list(sections.sections), [(), ("slot_info",), ("datapackage", "Game")])
+                self.assertEqual(sections.load(("datapackage", "Game")), data["datapackage"]["Game"])
+                del sections.sections["datapackage", "Game"]
+                stripped = load_multidata(sections.to_bytes())
+                self.assertEqual(stripped["datapackage"], {"Game": {"checksum": "abc", "version": 0},
+                                                           "Legacy Game": data["datapackage"]["Legacy Game"]})
+                self.assertEqual(stripped["slot_info"], data["slot_info"])
+
+                buffer.seek(0)
+                self.assertEqual(MultidataSections.read(buffer).sections,
+                                 MultidataSections.read(buffer.getvalue()).sections)
+                for truncated in (buffer.getvalue()[:-1], buffer.getvalue()[:5]):
+                    with self.assertRaises(EOFError):
+                        MultidataSections.read(truncated)
+                    with self.assertRaises(EOFError):
+                        load_multidata(truncated)
+                with self.assertRaises(EOFError):
+                    load_multidata(buffer.getvalue() + b"\0")
+                with self.assertRaises(VersionException):
+                    load_multidata(buffer.getvalue()[:1] + bytes([255]) + buffer.getvalue()[2:])
@@ -42,6 +42,69 @@ class TestHostFakeRoom(TestBase):
         except FileNotFoundError:
             pass
 
+    def test_command_poller(self) -> None:
+        """Verify that the shared poller dispatches and deletes the commands of the hosted rooms only."""
+        from types import SimpleNamespace
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import RoomCommandPoller
+        from WebHostLib.models import Command, Room
+
+        dispatched = []
+        main_loop = SimpleNamespace(call_soon_threadsafe=lambda callback, *args: callback(*args))
+        with db_session:
+            room = Room.get(id=self.room_id)
+            rooms = [room] + [Room(seed=room.seed, owner=room.owner, tracker=uuid4()) for _ in range(3)]
+            for n, room in enumerate(rooms):
+                Command(room=room, commandtext=f"/command {n}")
+            room_ids = [room.id for room in rooms]
+        poller = RoomCommandPoller()
+        poller.max_query_rooms = 2
+        poller.poll({room_id: SimpleNamespace(room_id=room_id, command_processor=dispatched.append, main_loop=main_loop)
+                     for room_id in room_ids[:3]})  # type: ignore
+        self.assertEqual(sorted(dispatched), ["/command 0", "/command 1", "/command 2"])
+        with db_session:
+            self.assertEqual([command.commandtext for command in select(command for command in Command)],
+                             ["/command 3"])
+            for room_id in room_ids[1:]:
+                Room.get(id=room_id).delete()
+
+    def test_room_scheduler(self) -> None:
+        """Verify that the scheduler starts rooms once per activity and does not restart rooms that shut down."""
+        import datetime
+        from types import SimpleNamespace
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import Room
+
+        started = []
+        shut_down = []
+
+        def collect_shut_down_rooms():
+            room_ids = shut_down[:]
+            shut_down.clear()
+            return room_ids
+
+        hoster = SimpleNamespace(start_room=started.append, collect_shut_down_rooms=collect_shut_down_rooms)
+        scheduler = RoomScheduler([hoster])  # type: ignore
+        scheduler.tick()
+        scheduler.tick()
+        self.assertEqual(started.count(self.room_id), 1)
+        self.assertIn(self.room_id, scheduler.deadlines)
+
+        with db_session:
+            Room.get(id=self.room_id).last_activity = datetime.datetime.utcnow() + datetime.timedelta(seconds=1)
+        scheduler.tick()
+        self.assertEqual(started.count(self.room_id), 2)
+        self.assertEqual(len(scheduler.latencies), 1)
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+        shut_down.append(self.room_id)
+        scheduler.tick()
+        self.assertEqual(started.count(self.room_id), 2)
+        self.assertNotIn(self.room_id, scheduler.deadlines)
+
     def test_display_log_missing_full(self) -> None:
         """
         Verify that we get a 200 response even if log is missing.
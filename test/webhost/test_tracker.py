@@ -93,3 +93,76 @@ class TestTracker(TestBase):
                 headers={"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00"},  # missing timezone
             )
             self.assertEqual(response.status_code, 400)
+
+    def test_shared_multidata(self) -> None:
+        """Verify that tracker data of the same seed shares the decoded multidata and data packages."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first, second = TrackerData(room), TrackerData(room)
+        self.assertIs(first._multidata, second._multidata)
+        for game in first._multidata["datapackage"]:
+            self.assertIs(first.item_id_to_name[game].maps[1], second.item_id_to_name[game].maps[1])
+            self.assertIs(first.location_name_to_id[game], second.location_name_to_id[game])
+
+    def test_unknown_ids_not_shared(self) -> None:
+        """Verify that looking up unknown ids does not grow the id to name tables shared between requests."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first, second = TrackerData(room), TrackerData(room)
+        for game in first._multidata["datapackage"]:
+            shared_names = first.item_id_to_name[game].maps[1]
+            size = len(shared_names)
+            self.assertEqual("Unknown Item (ID: -12345)", first.item_id_to_name[game][-12345])
+            self.assertEqual("Unknown Location (ID: -12345)", first.location_id_to_name[game][-12345])
+            self.assertEqual(size, len(shared_names))
+            self.assertNotIn(-12345, second.item_id_to_name[game])
+
+    def test_multidata_cache_size(self) -> None:
+        """Verify that the decoded multidata cache evicts by approximate size."""
+        from WebHostLib.tracker import _LRUCache
+
+        cache = _LRUCache(10)
+        for key in ("a", "b", "c"):
+            cache.get(key, lambda: (key, 4))
+        self.assertEqual(["b", "c"], list(cache._values))
+        self.assertEqual(8, cache.current_size)
+        self.assertEqual("b", cache.get("b", lambda: ("new b", 4)))
+        self.assertEqual("large", cache.get("large", lambda: ("large", 11)))
+        self.assertNotIn("large", cache._values)
+        self.assertEqual(8, cache.current_size)
+
+    def test_progress_summary(self) -> None:
+        """Verify that tracker data uses the progress summary of a room instead of loading its multisave."""
+        from pony.orm import db_session
+        from NetUtils import ClientStatus
+        from WebHostLib.models import Room, RoomProgress
+        from WebHostLib.tracker import TrackerData
+
+        progress = {
+            "checked_location_counts": {(0, 1): 3},
+            "received_item_counts": {(0, 1): {1: 2}},
+            "client_game_state": {(0, 1): ClientStatus.CLIENT_PLAYING},
+            "client_activity_timers": (((0, 1), 1000.0),),
+            "name_aliases": {(0, 1): "Alias"},
+            "video": (),
+        }
+        with db_session:
+            room = Room.get(id=self.room_id)
+            RoomProgress(room=room, data=pickle.dumps(progress))
+        with db_session:
+            room = Room.get(id=self.room_id)
+            tracker_data = TrackerData(room)
+            self.assertEqual(tracker_data.get_player_checked_locations_count(0, 1), 3)
+            self.assertEqual(tracker_data.get_player_inventory_counts(0, 1)[1], 2)
+            self.assertEqual(tracker_data.get_player_client_status(0, 1), ClientStatus.CLIENT_PLAYING)
+            self.assertEqual(tracker_data.get_player_alias(0, 1), "Alias")
+            self.assertEqual(tracker_data.get_room_videos(), {})
+            self.assertNotIn("_multisave", tracker_data.__dict__)
@@ -0,0 +1,152 @@
+import io
+import pickle
+from pathlib import Path
+from typing import ClassVar
+from unittest import mock
+from uuid import uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+class TestUpload(TestBase):
+    data: ClassVar[bytes]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        with (Path(__file__).parent / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            cls.data = f.read()
+
+    def setUp(self) -> None:
+        super().setUp()
+        with self.client.session_transaction() as session:
+            session["_id"] = uuid4()
+
+    def upload(self, data: bytes) -> str:
+        with self.app.app_context(), self.app.test_request_context():
+            response = self.client.post(url_for("uploads"), data={"file": (io.BytesIO(data), "test.archipelago")})
+        self.assertEqual(response.status_code, 302)
+        return response.headers["Location"]
+
+    def test_sections(self) -> None:
+        """Verify that multidata with sections is stored with only the checksums of its data packages."""
+        from pony.orm import db_session
+        from MultiServer import Context
+        from Utils import MultidataSections, dump_multidata_sections, multidata_has_sections
+        from WebHostLib.models import GameDataPackage, Seed
+
+        multidata = Context.decompress(self.data)
+        buffer = io.BytesIO()
+        dump_multidata_sections(multidata, buffer)
+        location = self.upload(buffer.getvalue())
+        self.assertTrue(location.startswith("/seed/"), location)
+
+        seed_id = self.app.url_map.converters["suuid"].to_python(None, location[6:])  # type: ignore[arg-type]
+        with db_session:
+            seed = Seed.get(id=seed_id)
+            self.assertTrue(multidata_has_sections(seed.multidata))
+            self.assertEqual([path for path in MultidataSections.read(seed.multidata).sections],
+                             [(), ("slot_info",)])
+            stored = Context.decompress(seed.multidata)
+            self.assertEqual(stored["slot_info"], multidata["slot_info"])
+            self.assertEqual({slot.player_id for slot in seed.slots}, set(multidata["slot_info"]))
+            for game, game_data in multidata["datapackage"].items():
+                self.assertEqual(stored["datapackage"][game],
+                                 {"version": game_data.get("version", 0), "checksum": game_data["checksum"]})
+                self.assertIsNotNone(GameDataPackage.get(checksum=game_data["checksum"]))
+
+    def test_sections_invalid(self) -> None:
+        """Verify that multidata with sections is rejected if it does not match its data packages or is too new."""
+        from pony.orm import db_session
+        from MultiServer import Context
+        from Utils import MultidataSections, dump_multidata_sections, version_tuple
+        from WebHostLib.models import Seed
+
+        multidata = Context.decompress(self.data)
+        game = next(iter(multidata["datapackage"]))
+        buffer = io.BytesIO()
+        dump_multidata_sections(multidata, buffer)
+        sections = MultidataSections.read(buffer.getvalue())
+        rest = sections.load(())
+        rest["datapackage"][game]["checksum"] = "0" * 40
+        sections.dump((), rest)
+        mismatched = sections.to_bytes()
+
+        too_new = Context.decompress(self.data)
+        too_new["minimum_versions"]["server"] = (version_tuple.major + 1, 0, 0)
+        buffer = io.BytesIO()
+        dump_multidata_sections(too_new, buffer)
+
+        for data in (mismatched, buffer.getvalue()):
+            with self.subTest(), self.app.app_context(), self.app.test_request_context():
+                with db_session:
+                    seeds = Seed.select().count()
+                response = self.client.post(url_for("uploads"),
+                                            data={"file": (io.BytesIO(data), "test.archipelago")})
+                self.assertEqual(response.status_code, 200)
+                with db_session:
+                    self.assertEqual(Seed.select().count(), seeds)
+
+    def test_job(self) -> None:
+        """Verify that large multidata without sections is queued for the generators, which store it as Seed."""
+        import json
+        from pony.orm import db_session
+        from Utils import restricted_loads
+        from WebHostLib.models import Generation, STATE_QUEUED, Seed
+        from WebHostLib.upload import process_upload
+
+        threshold = self.app.config["UPLOAD_JOB_THRESHOLD"]
+        self.app.config["UPLOAD_JOB_THRESHOLD"] = len(self.data)
+        try:
+            location = self.upload(self.data)
+        finally:
+            self.app.config["UPLOAD_JOB_THRESHOLD"] = threshold
+        self.assertTrue(location.startswith("/wait/"), location)
+
+        sid = self.app.url_map.converters["suuid"].to_python(None, location[6:])  # type: ignore[arg-type]
+        with db_session:
+            generation = Generation.get(id=sid)
+            self.assertEqual(generation.state, STATE_QUEUED)
+            meta = json.loads(generation.meta)
+            self.assertTrue(meta.pop("upload"))
+            upload, owner = restricted_loads(generation.options), generation.owner
+        self.assertEqual(process_upload(upload, meta, owner, sid), sid)
+        with db_session:
+            self.assertIsNone(Generation.get(id=sid))
+            self.assertEqual(Seed.get(id=sid).owner, owner)
+
+    def test_generation(self) -> None:
+        """Verify that the in-memory output of a generation is stored with only the checksums of its data packages."""
+        from pony.orm import db_session
+        from Main import GenerationOutput
+        from MultiServer import Context
+        from Utils import multidata_has_sections
+        from WebHostLib.models import GameDataPackage
+        from WebHostLib.upload import store_generation
+        from settings import get_settings
+
+        generator_settings = get_settings().generator
+        for sections in (False, True):
+            multidata = Context.decompress(self.data)
+            data_package = dict(multidata["datapackage"])
+            for game, game_data in data_package.items():
+                # the generator's key order must not end up in the stored data packages
+                multidata["datapackage"][game] = dict(reversed(game_data.items()))
+            output = GenerationOutput(multidata, "Spoiler", {})
+            with db_session, self.subTest(sections=sections), \
+                    mock.patch.object(generator_settings, "multidata_sections", sections):
+                seed = store_generation(output, uuid4(), {"race": False})
+                self.assertEqual(multidata_has_sections(seed.multidata), sections,
+                                 "the multidata_sections generator setting should be followed")
+                self.assertEqual(seed.spoiler, "Spoiler")
+                self.assertEqual({slot.player_id for slot in seed.slots}, set(multidata["slot_info"]))
+                stored = Context.decompress(seed.multidata)
+                for game, game_data in data_package.items():
+                    self.assertEqual(stored["datapackage"][game],
+                                     {"version": game_data.get("version", 0), "checksum": game_data["checksum"]})
+                    stored_data_package = pickle.loads(GameDataPackage.get(checksum=game_data["checksum"]).data)
+                    self.assertEqual(list(stored_data_package),
+                                     [key for key in sorted(game_data) if key != "checksum"] + ["checksum"])
+                seed.delete()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import collections.abc
+import concurrent.futures
 import hashlib
 import logging
 import pathlib
@@ -7,8 +9,8 @@ import sys
 import time
 from random import Random
 from dataclasses import make_dataclass
-from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, TextIO, Tuple,
-                    TYPE_CHECKING, Type, Union)
+from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Set, TextIO,
+                    Tuple, TYPE_CHECKING, Type, Union)
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
@@ -22,8 +24,56 @@ if TYPE_CHECKING:
 perf_logger = logging.getLogger("performance")
 
 
+class LazyWorldTypes(collections.abc.MutableMapping):
+    """
+    Replaces AutoWorldRegister.world_types with lazy world loading.
+    Games of worlds that aren't imported yet are known by name and their world gets imported on first access,
+    so iterating over names or checking for a game is free, while iterating over the world types imports all worlds.
+    """
+    loaded: Dict[str, Type[World]]
+    """World types that are imported already."""
+    pending: Dict[str, Callable[[], object]]
+    """Function importing the world for each game that isn't imported yet."""
+
+    def __init__(self) -> None:
+        self.loaded = {}
+        self.pending = {}
+
+    def __getitem__(self, game: str) -> Type[World]:
+        if game not in self.loaded and game in self.pending:
+            self.pending[game]()
+        return self.loaded[game]
+
+    def __setitem__(self, game: str, world_type: Type[World]) -> None:
+        self.pending.pop(game, None)
+        self.loaded[game] = world_type
+
+    def __delitem__(self, game: str) -> None:
+        if game in self.loaded:
+            del self.loaded[game]
+        else:
+            del self.pending[game]
+
+    def __contains__(self, game: object) -> bool:
+        return game in self.loaded or game in self.pending
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([*self.loaded, *(game for game in self.pending if game not in self.loaded)])
+
+    def __len__(self) -> int:
+        return len(self.loaded) + len(self.pending)
+
+
+def loaded_world_types() -> Dict[str, Type[World]]:
+    """Returns the world types that are imported already, which is all of them unless worlds are loaded lazily."""
+    world_types = AutoWorldRegister.world_types
+    if isinstance(world_types, LazyWorldTypes):
+        return world_types.loaded
+    return world_types
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: Union[Dict[str, Type[World]], LazyWorldTypes] = {}
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -85,9 +135,9 @@ class AutoWorldRegister(type):
         new_class = super().__new__(mcs, name, bases, dct)
         new_class.__file__ = sys.modules[new_class.__module__].__file__
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
+            if dct["game"] in loaded_world_types():
                 raise RuntimeError(f"""Game {dct["game"]} already registered in 
-                {AutoWorldRegister.world_types[dct["game"]].__file__} when attempting to register from
+                {loaded_world_types()[dct["game"]].__file__} when attempting to register from
                 {new_class.__file__}.""")
             AutoWorldRegister.world_types[dct["game"]] = new_class
         if ".apworld" in new_class.__file__:
@@ -107,6 +157,9 @@ class AutoLogicRegister(type):
         for item_name, function in dct.items():
             if item_name == "copy_mixin":
                 CollectionState.additional_copy_functions.append(function)
+            elif item_name == "lazy_copy_mixin":
+                assert "copy_mixin" in dct, f"{name} defined lazy_copy_mixin without also defining copy_mixin."
+                CollectionState.additional_lazy_copy_functions[dct["copy_mixin"]] = function
             elif item_name == "init_mixin":
                 CollectionState.additional_init_functions.append(function)
             elif not item_name.startswith("__"):
@@ -188,19 +241,68 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
+threadable_stages = frozenset({"generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                               "generate_basic"})
+"""Stages that call_all may run concurrently for worlds with World.thread_safe_stages set."""
+
+
+def _call_threaded(multiworld: "MultiWorld", method_name: str, players: List[int], *args: Any) -> Dict[int, List[Item]]:
+    """Calls method_name of the worlds of players in a thread pool and returns the items each of them added to the
+    itempool, which are removed from it again so call_all can add them back in player order."""
+    prev_items = {id(item) for item in multiworld.itempool}
+    passthrough = getattr(multiworld.random, "passthrough", None)
+    if passthrough is not None:
+        # global random would be consumed in thread scheduling order, so it is blocked for the duration
+        multiworld.random.passthrough = False
+    try:
+        with concurrent.futures.ThreadPoolExecutor(min(multiworld.stage_threads, len(players))) as pool:
+            futures = [pool.submit(call_single, multiworld, method_name, player, *args) for player in players]
+            for future in futures:
+                future.result()
+    finally:
+        if passthrough is not None:
+            multiworld.random.passthrough = passthrough
+    new_items: Dict[int, List[Item]] = {player: [] for player in players}
+    kept_items: List[Item] = []
+    for item in multiworld.itempool:
+        if id(item) in prev_items:
+            kept_items.append(item)
+        else:
+            assert item.player in new_items, \
+                f"{item} was added to the itempool by a world of another player in threaded stage {method_name}."
+            new_items[item.player].append(item)
+    multiworld.itempool[:] = kept_items
+    return new_items
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
+    # consecutive players of thread safe worlds run together, so every other world still runs after all lower and
+    # before all higher player numbers
+    runs: List[List[int]] = []
+    threaded = multiworld.stage_threads > 1 and method_name in threadable_stages
     for player in multiworld.player_ids:
-        prev_item_count = len(multiworld.itempool)
-        world_types.add(multiworld.worlds[player].__class__)
-        call_single(multiworld, method_name, player, *args)
-        if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+        if threaded and multiworld.worlds[player].thread_safe_stages and runs \
+                and multiworld.worlds[runs[-1][-1]].thread_safe_stages:
+            runs[-1].append(player)
+        else:
+            runs.append([player])
+    for run in runs:
+        threaded_items = _call_threaded(multiworld, method_name, run, *args) if len(run) > 1 else {}
+        for player in run:
+            prev_item_count = len(multiworld.itempool)
+            world_types.add(multiworld.worlds[player].__class__)
+            if player in threaded_items:
+                multiworld.itempool += threaded_items[player]
+            else:
+                call_single(multiworld, method_name, player, *args)
+            if __debug__:
+                new_items = multiworld.itempool[prev_item_count:]
+                for i, item in enumerate(new_items):
+                    for other in new_items[i+1:]:
+                        assert item is not other, (
+                            f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                            f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
 
     call_stage(multiworld, method_name, *args)
 
@@ -315,6 +417,13 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    thread_safe_stages: bool = False
+    """If True, generate_early, create_regions, create_items, set_rules, connect_entrances and generate_basic of this
+    world may run in a thread pool, concurrently with other worlds that set this and directly precede or follow it in
+    player order, when the generator is configured to use more than one stage thread. These methods must then only use
+    self.random for randomization, only add items of this player to the itempool and not touch data of other players
+    or mutable class level state."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -572,19 +681,7 @@ class World(metaclass=AutoWorldRegister):
 
     @classmethod
     def get_data_package_data(cls) -> "GamesPackage":
-        sorted_item_name_groups = {
-            name: sorted(cls.item_name_groups[name]) for name in sorted(cls.item_name_groups)
-        }
-        sorted_location_name_groups = {
-            name: sorted(cls.location_name_groups[name]) for name in sorted(cls.location_name_groups)
-        }
-        res: "GamesPackage" = {
-            # sorted alphabetically
-            "item_name_groups": sorted_item_name_groups,
-            "item_name_to_id": cls.item_name_to_id,
-            "location_name_groups": sorted_location_name_groups,
-            "location_name_to_id": cls.location_name_to_id,
-        }
+        res = data_package_contents(cls)
         res["checksum"] = data_package_checksum(res)
         return res
 
@@ -595,6 +692,23 @@ class LogicMixin(metaclass=AutoLogicRegister):
     pass
 
 
+def data_package_contents(world_type: Type[World]) -> "GamesPackage":
+    """Returns the data package of a world type without its checksum"""
+    sorted_item_name_groups = {
+        name: sorted(world_type.item_name_groups[name]) for name in sorted(world_type.item_name_groups)
+    }
+    sorted_location_name_groups = {
+        name: sorted(world_type.location_name_groups[name]) for name in sorted(world_type.location_name_groups)
+    }
+    return {
+        # sorted alphabetically
+        "item_name_groups": sorted_item_name_groups,
+        "item_name_to_id": world_type.item_name_to_id,
+        "location_name_groups": sorted_location_name_groups,
+        "location_name_to_id": world_type.location_name_to_id,
+    }
+
+
 def data_package_checksum(data: "GamesPackage") -> str:
     """Calculates the data package checksum for a game from a dict"""
     assert "checksum" not in data, "Checksum already in data"
@@ -1,5 +1,7 @@
+import hashlib
 import importlib
 import importlib.util
+import json
 import logging
 import os
 import sys
@@ -7,9 +9,10 @@ import warnings
 import zipimport
 import time
 import dataclasses
-from typing import Dict, List, TypedDict
+import functools
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
-from Utils import local_path, user_path
+from Utils import __version__, cache_path, local_path, user_path
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -27,6 +30,9 @@ __all__ = {
     "GamesPackage",
     "DataPackage",
     "failed_world_loads",
+    "load_all_worlds",
+    "load_worlds_for_component",
+    "pending_world_settings",
 }
 
 
@@ -61,6 +67,30 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        return os.path.basename(self.path).rsplit(".", 1)[0] if self.is_zip else os.path.basename(self.path)
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the modification times and sizes of all files of this world, changes whenever the world does."""
+        if self.is_zip:
+            stat = os.stat(self.resolved_path)
+            files = [(self.path, stat.st_mtime_ns, stat.st_size)]
+        else:
+            files = []
+            folders = [self.resolved_path]
+            while folders:
+                for entry in os.scandir(folders.pop()):
+                    if entry.is_dir():
+                        if entry.name != "__pycache__":
+                            folders.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        files.append((os.path.relpath(entry.path, self.resolved_path), stat.st_mtime_ns, stat.st_size))
+            files.sort()
+        return hashlib.sha1(repr(files).encode()).hexdigest()
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -115,15 +145,192 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
 world_sources.sort()
-for world_source in world_sources:
-    world_source.load()
 
-# Build the data package for each game.
-from .AutoWorld import AutoWorldRegister
+import settings
+from .AutoWorld import AutoWorldRegister, LazyWorldTypes, data_package_checksum, data_package_contents, \
+    loaded_world_types
+from .LauncherComponents import Component, SuffixIdentifier, components
+
+_manifest_path = cache_path("world_manifest.json")
+_pending_sources: Dict[str, WorldSource] = {}
+pending_world_settings: Dict[str, str] = {}
+"""Settings key to game of the worlds that lazy world loading didn't import yet."""
+
+
+def _read_manifest() -> Dict[str, Dict[str, Any]]:
+    """
+    Reads the world manifest, which describes every world source that loaded successfully before: its games,
+    launcher components and the checksums of its data packages, keyed by source path.
+    """
+    try:
+        with open(_manifest_path, "r", encoding="utf-8-sig") as f:
+            stored = json.load(f)
+        if stored.get("core") == _core_fingerprint:
+            return stored["worlds"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.debug(f"Could not load world manifest: {e}")
+    return {}
+
+
+def _write_manifest(manifest: Dict[str, Dict[str, Any]]) -> None:
+    try:
+        os.makedirs(os.path.dirname(_manifest_path), exist_ok=True)
+        temp_path = f"{_manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8-sig") as f:
+            json.dump({"core": _core_fingerprint, "worlds": manifest}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, _manifest_path)
+    except Exception as e:
+        logging.debug(f"Could not store world manifest: {e}")
+
+
+def _settings_key(world_type: Any) -> Optional[str]:
+    annotation = world_type.__annotations__.get("settings", None)
+    if annotation is None or annotation == "ClassVar[Optional['Group']]":
+        return None
+    return world_type.settings_key
+
+
+def _component_manifest(component: Component) -> Dict[str, Any]:
+    file_identifier = component.file_identifier
+    return {
+        "display_name": component.display_name,
+        "script_name": component.script_name,
+        "game_name": component.game_name,
+        # other file identifiers can only be asked after importing the world
+        "suffixes": list(file_identifier.suffixes) if isinstance(file_identifier, SuffixIdentifier) else None,
+        "file_identifier": file_identifier is not None,
+    }
+
+
+def _build_data_package(world_type: Any, cached: Optional[Dict[str, Any]]) -> Tuple[GamesPackage, Dict[str, Any]]:
+    """
+    Builds the data package of a world, reusing the checksum of its manifest entry if the contents are unchanged.
+    Returns the data package and its manifest entry.
+    """
+    data_package = data_package_contents(world_type)
+    # Contents are always read from the imported world class, as they may depend on code outside the world's folder.
+    # Encoding them for the checksum takes most of the time of building a data package, a digest of them much less.
+    digest = hashlib.sha1(repr(data_package).encode()).hexdigest()
+    if cached and cached.get("digest") == digest:
+        data_package["checksum"] = cached["checksum"]
+    else:
+        data_package["checksum"] = data_package_checksum(data_package)
+    return data_package, {
+        "checksum": data_package["checksum"],
+        "digest": digest,
+        "settings_key": _settings_key(world_type),
+    }
+
 
+def _load_world_source(source: WorldSource, fingerprint: Optional[str],
+                       cached: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Imports a world source, returning its manifest entry if it loaded."""
+    # games of other sources the import pulls in along the way stay with their source
+    known_games = set(AutoWorldRegister.world_types)
+    component_count = len(components)
+    if not source.load():
+        return None
+    games: Dict[str, Dict[str, Any]] = {}
+    for game in [game for game in loaded_world_types() if game not in known_games]:
+        data_package, games[game] = _build_data_package(loaded_world_types()[game], cached.get(game))
+        network_data_package["games"][game] = data_package
+    return {
+        "fingerprint": fingerprint,
+        "games": games,
+        "components": [_component_manifest(component) for component in components[component_count:]],
+    }
+
+
+def _load_pending_source(source: WorldSource) -> None:
+    """Imports a world source that lazy world loading skipped so far."""
+    if _pending_sources.pop(source.path, None) is None:
+        return
+    for game in _manifest[source.path]["games"]:
+        AutoWorldRegister.world_types.pending.pop(game, None)
+    if f"worlds.{source.module_name}" in sys.modules:
+        return  # imported directly by something else already
+    source.load()
+
+
+def load_all_worlds() -> None:
+    """Imports all worlds that lazy world loading didn't import yet."""
+    for source in list(_pending_sources.values()):
+        _load_pending_source(source)
+
+
+def load_worlds_for_component(name: str) -> None:
+    """
+    Imports the worlds that lazy world loading didn't import yet and that may provide a launcher component for name,
+    which is either a file, a component's display or script name, or the game of a launch link.
+    """
+    for source in list(_pending_sources.values()):
+        for component in _manifest[source.path]["components"]:
+            if name in (component["display_name"], component["script_name"], component["game_name"]) or (
+                    component["suffixes"] is None and component["file_identifier"]) or (
+                    component["suffixes"] and name.endswith(tuple(component["suffixes"]))):
+                _load_pending_source(source)
+                break
+
+
+class _LazyGamesPackages(Dict[str, GamesPackage]):
+    """network_data_package games with lazy world loading, building the data package of a game on first access."""
+
+    def __missing__(self, game: str) -> GamesPackage:
+        world_type = AutoWorldRegister.world_types[game]
+        self[game], _ = _build_data_package(world_type, _cached_games.get(game))
+        return self[game]
+
+
+# the checksum calculation lives in AutoWorld, so changes to it invalidate the whole manifest
+_core_fingerprint = __version__
+try:
+    _core_fingerprint += f"-{os.stat(sys.modules[AutoWorldRegister.__module__].__file__).st_mtime_ns}"
+except (OSError, TypeError):
+    pass
+
+_stored_manifest = _read_manifest()
+_manifest: Dict[str, Dict[str, Any]] = {}
+_cached_games: Dict[str, Dict[str, Any]] = {}
 network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
+    "games": _LazyGamesPackages() if settings.lazy_world_loading else {},
 }
+if settings.lazy_world_loading:
+    AutoWorldRegister.world_types = LazyWorldTypes()
+
+# import all submodules to trigger AutoWorldRegister, unless they can be imported later on demand
+for world_source in world_sources:
+    try:
+        source_fingerprint: Optional[str] = world_source.fingerprint
+    except OSError:
+        source_fingerprint = None
+    stored_entry = _stored_manifest.get(world_source.path, {})
+    # cached checksums are checked against the contents of the data package, so they are kept even if the world changed
+    stored_games = stored_entry.get("games", {})
+    if source_fingerprint is None or stored_entry.get("fingerprint") != source_fingerprint:
+        stored_entry = {}
+    if stored_entry and settings.lazy_world_loading:
+        _manifest[world_source.path] = stored_entry
+        _pending_sources[world_source.path] = world_source
+        for pending_game, pending_game_entry in stored_entry["games"].items():
+            _cached_games[pending_game] = pending_game_entry
+            AutoWorldRegister.world_types.pending[pending_game] = \
+                functools.partial(_load_pending_source, world_source)
+            if pending_game_entry["settings_key"]:
+                pending_world_settings[pending_game_entry["settings_key"]] = pending_game
+        continue
+    source_entry = _load_world_source(world_source, source_fingerprint, stored_games)
+    if source_entry and source_fingerprint:
+        _manifest[world_source.path] = source_entry
+
+if _manifest != _stored_manifest:
+    _write_manifest(_manifest)
 
+# worlds registered outside of world_sources are not in the manifest, keep the order of world_types either way
+if not settings.lazy_world_loading:
+    network_data_package["games"] = {
+        world_name: network_data_package["games"][world_name] if world_name in network_data_package["games"]
+        else world_type.get_data_package_data() for world_name, world_type in AutoWorldRegister.world_types.items()
+    }
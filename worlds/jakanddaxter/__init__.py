@@ -454,6 +454,9 @@ class JakAndDaxterWorld(World):
     def collect(self, state: CollectionState, item: JakAndDaxterItem) -> bool:
         change = super().collect(state, item)
         if change:
+            # The counts below are changed on prog_items directly, which copy-on-write states have to own first.
+            state.own_player_containers(self.player)
+
             # Orbsanity as an option is no-factor to these conditions. Matching the item name implies Orbsanity is ON,
             # so we don't need to check the option. When Orbsanity is OFF, there won't even be any orb bundle items
             # to collect.
@@ -478,6 +481,8 @@ class JakAndDaxterWorld(World):
     def remove(self, state: CollectionState, item: JakAndDaxterItem) -> bool:
         change = super().remove(state, item)
         if change:
+            # Same as in collect, prog_items is changed directly below.
+            state.own_player_containers(self.player)
 
             # Do the same thing we did in collect, except subtract trade orbs instead of add.
             if item.orb_amount > 0:
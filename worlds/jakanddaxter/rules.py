@@ -35,6 +35,7 @@ def recalculate_reachable_orbs(state: CollectionState, player: int, world: "JakA
 
     # Recalculate every level, every time the cache is stale, because you don't know
     # when a specific bundle of orbs in one level may unlock access to another.
+    state.own_player_containers(player)
     accessible_total_orbs = 0
     for level in level_table:
         accessible_level_orbs = count_reachable_orbs_level(state, world, level)